@@ -0,0 +1,293 @@
+"""
+Cached Ray actor handles (and replica pools) for experiment routes.
+
+Experiments used to call `ray.get_actor(f"{slug}-actor", namespace="modular_labs")`
+on every request, which is a GCS round-trip each time. ActorRegistry keeps the
+handles per slug in this process instead:
+
+- `_register_experiments` registers the handles it just created (reloads overwrite them).
+- A miss (e.g. a worker that did not run the registration) resolves once via
+  ray.get_actor and caches the result. It resolves exactly the manifest's replica
+  count: a missing replica makes the pool unavailable rather than smaller, since a
+  smaller pool would change every sticky key's replica.
+- Handles are dropped when the experiment is deleted or its config changes (the
+  config watcher invalidates the slug in every worker), and when any call reports the
+  actor as dead (ActorDiedError), so the next request re-resolves them. Restarts of
+  a `max_restarts=-1` actor keep the same handle, so transient ActorUnavailableError
+  does not evict it.
+
+Request code gets PooledActorHandle proxies rather than raw handles. Their
+`.remote()` calls still return plain ObjectRefs, but each ref is watched: an
+ActorDiedError evicts the pool even when the endpoint catches the error itself.
+
+Replica pools
+-------------
+A manifest can ask for several identical actors:
+
+    "actor_pool": {"replicas": 4, "sticky_key": "game_id"}
+
+Replica 0 keeps the classic `{slug}-actor` name, replica i is `{slug}-actor-{i}`.
+Each request is dispatched to the replica with the fewest outstanding requests from
+this process. When the request carries the sticky key (path or query parameter), it
+always goes to the same replica (stable crc32 hash, identical in every worker), so
+per-key in-memory state such as a game stays on one actor. The sticky key comes from
+the manifest, so a pool re-resolved after a miss is given it by the caller
+(core_deps reads it from app.state.experiments).
+
+core_deps.get_actor_handle is the shared FastAPI dependency built on this registry.
+"""
+import zlib
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import ray
+    RAY_AVAILABLE = True
+except ImportError:
+    # Imported without config.py in standalone exports, so probe Ray directly
+    RAY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ACTOR_NAMESPACE = "modular_labs"
+# Upper bound when discovering replicas by name (matches manifest_schema's actor_pool.replicas maximum)
+MAX_ACTOR_REPLICAS = 32
+
+
+def actor_name_for(slug: str, replica: int = 0) -> str:
+    """Detached actor name used for an experiment replica (see _register_experiments)."""
+    return f"{slug}-actor" if replica == 0 else f"{slug}-actor-{replica}"
+
+
+def retire_actor_replicas(slug: str, keep: int) -> int:
+    """Kills `{slug}-actor-{i}` replicas for i >= keep left over from a larger pool. Returns the count."""
+    if not RAY_AVAILABLE:
+        return 0
+    retired = 0
+    # No early exit: a dead replica in the middle must not hide the ones after it
+    for replica in range(max(keep, 1), MAX_ACTOR_REPLICAS):
+        try:
+            handle = ray.get_actor(actor_name_for(slug, replica), namespace=ACTOR_NAMESPACE)
+        except ValueError:
+            continue
+        ray.kill(handle, no_restart=True)
+        retired += 1
+    if retired:
+        logger.info(f"[{slug}] Retired {retired} surplus actor replica(s).")
+    return retired
+
+
+class _PooledMethod:
+    """An actor method whose calls are watched by the owning pool."""
+
+    __slots__ = ("_method", "_owner")
+
+    def __init__(self, method: Any, owner: "PooledActorHandle"):
+        self._method = method
+        self._owner = owner
+
+    def options(self, *args, **kwargs) -> "_PooledMethod":
+        return _PooledMethod(self._method.options(*args, **kwargs), self._owner)
+
+    def remote(self, *args, **kwargs) -> Any:
+        owner = self._owner
+        replica = owner._replica if owner._track else None
+        if replica is not None:
+            owner._pool.outstanding[replica] += 1
+            owner._pool.dispatched[replica] += 1
+        try:
+            ref = self._method.remote(*args, **kwargs)
+        except BaseException:
+            if replica is not None:
+                owner._pool.release(replica)
+            raise
+        owner._pool.watch(ref, replica)
+        return ref
+
+
+class PooledActorHandle:
+    """
+    One replica's actor handle as given to request code. Attribute access forwards
+    to the Ray handle; `.remote()` calls are watched by the pool (dead-actor eviction)
+    and, with `track=True`, count as outstanding on the replica until they finish.
+    """
+
+    __slots__ = ("_pool", "_replica", "_handle", "_track")
+
+    def __init__(self, pool: "ActorPool", replica: int, track: bool):
+        self._pool = pool
+        self._replica = replica
+        self._handle = pool.handles[replica]
+        self._track = track
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._handle, name)
+        if hasattr(attr, "remote"):
+            return _PooledMethod(attr, self)
+        return attr
+
+    def __repr__(self) -> str:
+        return f"PooledActorHandle({actor_name_for(self._pool.slug, self._replica)})"
+
+
+def untracked(handle: Any) -> Any:
+    """
+    The same replica without outstanding-call tracking, for long polls that would
+    otherwise count as load for their whole wait. Raw handles are returned as-is.
+    """
+    if isinstance(handle, PooledActorHandle):
+        return PooledActorHandle(handle._pool, handle._replica, False)
+    return handle
+
+
+class ActorPool:
+    """Replicas of one experiment actor with least-outstanding and sticky dispatch."""
+
+    def __init__(self, slug: str, handles: Sequence[Any], sticky_key: Optional[str] = None):
+        self.slug = slug
+        self.handles: List[Any] = list(handles)
+        self.sticky_key = sticky_key
+        self.outstanding = [0] * len(self.handles)
+        self.dispatched = [0] * len(self.handles)
+        # Set by the registry: called with the error when a watched call finds the actor dead
+        self.on_actor_died: Optional[Callable[[BaseException], None]] = None
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def pick(self, sticky_value: Optional[str] = None) -> int:
+        if len(self.handles) == 1:
+            return 0
+        if sticky_value is not None:
+            return zlib.crc32(str(sticky_value).encode()) % len(self.handles)
+        outstanding = self.outstanding
+        return min(range(len(outstanding)), key=outstanding.__getitem__)
+
+    def acquire(self, sticky_value: Optional[str] = None) -> Tuple[int, Any]:
+        """Picks a replica and counts the request as outstanding on it until release()."""
+        replica = self.pick(sticky_value)
+        self.outstanding[replica] += 1
+        self.dispatched[replica] += 1
+        return replica, self.handles[replica]
+
+    def release(self, replica: int) -> None:
+        self.outstanding[replica] -= 1
+
+    def handle(self, replica: int, track: bool = False) -> PooledActorHandle:
+        """Request-facing proxy for `replica` (see PooledActorHandle)."""
+        return PooledActorHandle(self, replica, track)
+
+    def watch(self, ref: Any, replica: Optional[int] = None) -> None:
+        """
+        Settles a call once `ref` is ready: releases `replica` (if the call was
+        tracked) and reports an ActorDiedError. Ray completes the future on its own
+        thread, so settling is handed back to the calling event loop.
+        """
+        if not isinstance(ref, ray.ObjectRef):
+            # num_returns=0 / streaming calls: nothing to wait on
+            if replica is not None:
+                self.release(replica)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        def on_done(future) -> None:
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._settle, future, replica)
+            else:
+                self._settle(future, replica)
+
+        ref.future().add_done_callback(on_done)
+
+    def _settle(self, future, replica: Optional[int]) -> None:
+        if replica is not None:
+            self.release(replica)
+        if future.cancelled() or self.on_actor_died is None:
+            return
+        exc = future.exception()
+        if isinstance(exc, ray.exceptions.ActorDiedError):
+            self.on_actor_died(exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": len(self.handles),
+            "sticky_key": self.sticky_key,
+            "outstanding": list(self.outstanding),
+            "dispatched": list(self.dispatched),
+        }
+
+
+class ActorRegistry:
+    """Per-process slug -> ActorPool cache. Lookups are a dict access."""
+
+    def __init__(self):
+        self._pools: Dict[str, ActorPool] = {}
+        self.hits = 0
+        self.resolves = 0
+        self.invalidations = 0
+
+    def _new_pool(self, slug: str, handles: Sequence[Any], sticky_key: Optional[str]) -> ActorPool:
+        pool = self._pools[slug] = ActorPool(slug, handles, sticky_key)
+        pool.on_actor_died = lambda exc: self._evict(pool, exc)
+        return pool
+
+    def register(self, slug: str, handles: Any, sticky_key: Optional[str] = None) -> None:
+        """Registers a single handle or a list of replica handles for `slug`."""
+        if not isinstance(handles, (list, tuple)):
+            handles = [handles]
+        self._new_pool(slug, handles, sticky_key)
+
+    def invalidate(self, slug: str) -> None:
+        if self._pools.pop(slug, None) is not None:
+            self.invalidations += 1
+            logger.info(f"[{slug}] Actor handles invalidated; next request re-resolves them.")
+
+    def clear(self) -> None:
+        self._pools.clear()
+
+    def pool(self, slug: str, sticky_key: Optional[str] = None, replicas: int = 1) -> Optional[ActorPool]:
+        """
+        Cached pool for `slug`, resolving it from Ray on a miss (with the manifest's
+        `sticky_key` and `replicas`). None if any of the replicas doesn't exist.
+        """
+        pool = self._pools.get(slug)
+        if pool is not None:
+            self.hits += 1
+            return pool
+        if not RAY_AVAILABLE:
+            return None
+        self.resolves += 1
+        handles = []
+        for replica in range(max(1, replicas)):
+            try:
+                handles.append(ray.get_actor(actor_name_for(slug, replica), namespace=ACTOR_NAMESPACE))
+            except ValueError:
+                # Not cached, so the next request retries once the replica is back
+                logger.error(f"[{slug}] Actor replica '{actor_name_for(slug, replica)}' not found.")
+                return None
+        return self._new_pool(slug, handles, sticky_key)
+
+    def report_failure(self, slug: str, exc: BaseException) -> None:
+        """Evicts the pool if `exc` says one of its actors is permanently gone (for raw `pool.handles` calls)."""
+        if RAY_AVAILABLE and isinstance(exc, ray.exceptions.ActorDiedError):
+            self.invalidate(slug)
+
+    def _evict(self, pool: ActorPool, exc: BaseException) -> None:
+        # Late failures from a pool that was already replaced must not evict its successor
+        if self._pools.get(pool.slug) is pool:
+            logger.warning(f"[{pool.slug}] Actor call failed with {type(exc).__name__}.")
+            self.invalidate(pool.slug)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pools": {slug: pool.stats() for slug, pool in self._pools.items()},
+            "hits": self.hits,
+            "resolves": self.resolves,
+            "invalidations": self.invalidations,
+        }
+
+
+actor_registry = ActorRegistry()
@@ -18,10 +18,15 @@ Core Features:
 - `AutoIndexManager`: ✨ Magical automatic index management! Automatically
   creates indexes based on query patterns, making it easy to use collections
   without manual index configuration. Enabled by default for all experiments.
+- `QueryProfiler`: Opt-in profiler (`QUERY_PROFILER_ENABLED`) that records
+  normalized read shapes with latency and result sizes per scoped collection
+  and suggests the compound index each shape needs.
 
 This design ensures data isolation between experiments while providing
 a familiar (Motor-like) developer experience with automatic index optimization.
 """
+import os
+import json
 import time
 import logging
 import asyncio
@@ -57,6 +62,40 @@ except ImportError:
     GEO2DSPHERE = "2dsphere"
 # --- END FIX ---
 
+# --- COMPILED SCOPE FILTER MODE ---
+# When enabled, each ScopedCollectionWrapper builds its experiment_id scope
+# clause once, collapses it to a plain equality for single-scope wrappers, and
+# merges it into simple top-level filters instead of nesting under $and.
+# Set MONGO_COMPILED_SCOPE_FILTER=false to restore the legacy $and/$in shape.
+COMPILED_SCOPE_FILTER = os.getenv("MONGO_COMPILED_SCOPE_FILTER", "true").lower() in {"true", "1", "yes"}
+# --- END COMPILED SCOPE FILTER MODE ---
+
+# --- INDEX CATALOG TTL ---
+# How long (seconds) the process-wide IndexCatalog trusts its view of a
+# collection's index names before re-listing them in the background. Local
+# creates/drops through AsyncAtlasIndexManager update the catalog immediately;
+# the TTL only bounds staleness for changes made by other processes.
+INDEX_CATALOG_TTL = float(os.getenv("AUTO_INDEX_CATALOG_TTL", "300"))
+# --- END INDEX CATALOG TTL ---
+
+# --- AUTO-INDEX ANALYSIS QUEUE ---
+# Reads hand their (filter, sort) to one bounded queue per process instead of
+# spawning a task each. Above the sampling watermark only 1 in N submissions
+# is accepted (and weighted by N); when the queue is full, submissions drop.
+AUTO_INDEX_QUEUE_MAXSIZE = int(os.getenv("AUTO_INDEX_QUEUE_MAXSIZE", "1000"))
+AUTO_INDEX_QUEUE_SAMPLE_WATERMARK = float(os.getenv("AUTO_INDEX_QUEUE_SAMPLE_WATERMARK", "0.5"))
+AUTO_INDEX_QUEUE_SAMPLE_RATE = int(os.getenv("AUTO_INDEX_QUEUE_SAMPLE_RATE", "10"))
+AUTO_INDEX_QUEUE_BATCH_SIZE = int(os.getenv("AUTO_INDEX_QUEUE_BATCH_SIZE", "200"))
+# --- END AUTO-INDEX ANALYSIS QUEUE ---
+
+# --- QUERY SHAPE PROFILER ---
+# Opt-in: records normalized read shapes with latency and result sizes per
+# scoped collection (see QueryProfiler). Can also be toggled at runtime via
+# `query_profiler.enabled`.
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() in {"true", "1", "yes"}
+QUERY_PROFILER_MAX_SHAPES = int(os.getenv("QUERY_PROFILER_MAX_SHAPES", "500"))
+# --- END QUERY SHAPE PROFILER ---
+
 # --- TASK MANAGER IMPORT ---
 # Import task manager from main to prevent task accumulation
 try:
@@ -438,6 +477,7 @@ class AsyncAtlasIndexManager:
             # Create the index
             name = await self._collection.create_index(keys, **kwargs)
             logger.info(f"Successfully created regular index '{name}'.")
+            IndexCatalog.note_created(self._collection, name)
             return name
         except OperationFailure as e:
             logger.error(f"OperationFailure creating regular index '{index_name}': {e.details}")
@@ -473,10 +513,12 @@ class AsyncAtlasIndexManager:
         try:
             await self._collection.drop_index(name)
             logger.info(f"Successfully dropped regular index '{name}'.")
+            IndexCatalog.note_dropped(self._collection, name)
         except OperationFailure as e:
             # Handle case where index is already gone
             if "index not found" in str(e).lower():
                 logger.info(f"Regular index '{name}' does not exist. Nothing to drop.")
+                IndexCatalog.note_dropped(self._collection, name)
             else:
                 logger.error(f"Failed to drop regular index '{name}': {e.details}")
                 raise
@@ -487,7 +529,10 @@ class AsyncAtlasIndexManager:
     async def list_indexes(self) -> List[Dict[str, Any]]:
         """Lists all standard (non-search) indexes on the collection."""
         try:
-            return await self._collection.list_indexes().to_list(None)
+            indexes = await self._collection.list_indexes().to_list(None)
+            # Free refresh: any explicit listing also refreshes the shared catalog
+            IndexCatalog.note_listing(self._collection, indexes)
+            return indexes
         except Exception as e:
             logger.error(f"Error listing regular indexes: {e}")
             return []
@@ -502,6 +547,147 @@ class AsyncAtlasIndexManager:
 # AUTOMATIC INDEX MANAGEMENT
 # ##########################################################################
 
+class _CollectionIndexState:
+    """Per-collection entry in the IndexCatalog (index names + shared query counts)."""
+
+    __slots__ = ('index_names', 'loaded_at', 'loading', 'query_counts', 'attempted')
+
+    def __init__(self):
+        # Names of indexes known to exist (None until the first listing lands)
+        self.index_names: Optional[set] = None
+        self.loaded_at: float = 0.0
+        # True while a background listing is in flight (one at a time)
+        self.loading: bool = False
+        # Query pattern (auto index name) -> times seen, shared by all wrappers
+        self.query_counts: Dict[str, int] = {}
+        # Auto index name -> creation outcome (True created/pending, False failed)
+        self.attempted: Dict[str, bool] = {}
+
+
+class IndexCatalog:
+    """
+    Process-wide catalog of standard index names and query-pattern counts,
+    keyed by the collection's full name (`db.collection`).
+
+    `ScopedMongoWrapper` builds fresh collection wrappers for every request, so
+    anything cached on an `AutoIndexManager` instance is thrown away almost
+    immediately. The catalog lives at class level instead, so every wrapper in
+    the process shares one view:
+
+    - Index names are listed once per collection, in the background, and
+      re-listed when older than `INDEX_CATALOG_TTL`.
+    - Local creates/drops via `AsyncAtlasIndexManager` update it immediately.
+    - All hot-path lookups are plain dict/set operations; no server round-trips.
+
+    Like `ScopedMongoWrapper._experiment_id_index_cache`, all mutations happen
+    on the event loop thread between awaits, so no lock is needed.
+    """
+
+    _states: ClassVar[Dict[str, _CollectionIndexState]] = {}
+    # Cap distinct patterns tracked per collection so ad-hoc queries can't grow it unbounded
+    MAX_PATTERNS_PER_COLLECTION: ClassVar[int] = 1000
+
+    @staticmethod
+    def _key(collection: AsyncIOMotorCollection) -> str:
+        return collection.full_name
+
+    @classmethod
+    def _state(cls, collection: AsyncIOMotorCollection) -> _CollectionIndexState:
+        key = cls._key(collection)
+        state = cls._states.get(key)
+        if state is None:
+            state = cls._states[key] = _CollectionIndexState()
+        return state
+
+    @classmethod
+    def record_query(cls, collection: AsyncIOMotorCollection, pattern: str, hits: int = 1) -> int:
+        """Counts `hits` uses of a query pattern and returns the shared total."""
+        counts = cls._state(collection).query_counts
+        count = counts.get(pattern)
+        if count is None:
+            if len(counts) >= cls.MAX_PATTERNS_PER_COLLECTION:
+                return 0
+            count = 0
+        counts[pattern] = count + hits
+        return count + hits
+
+    @classmethod
+    def needs_refresh(cls, collection: AsyncIOMotorCollection) -> bool:
+        """True if the index names were never loaded or are older than the TTL."""
+        state = cls._state(collection)
+        if state.loading:
+            return False
+        return state.index_names is None or (time.monotonic() - state.loaded_at) > INDEX_CATALOG_TTL
+
+    @classmethod
+    def is_loaded(cls, collection: AsyncIOMotorCollection) -> bool:
+        return cls._state(collection).index_names is not None
+
+    @classmethod
+    def has_index(cls, collection: AsyncIOMotorCollection, name: str) -> bool:
+        names = cls._state(collection).index_names
+        return bool(names) and name in names
+
+    @classmethod
+    def attempted(cls, collection: AsyncIOMotorCollection, name: str) -> bool:
+        return name in cls._state(collection).attempted
+
+    @classmethod
+    def mark_attempt(cls, collection: AsyncIOMotorCollection, name: str, ok: bool):
+        cls._state(collection).attempted[name] = ok
+
+    @classmethod
+    async def refresh(cls, collection: AsyncIOMotorCollection):
+        """Re-lists the collection's indexes (at most one listing in flight per collection)."""
+        state = cls._state(collection)
+        if state.loading:
+            return
+        state.loading = True
+        try:
+            indexes = await collection.list_indexes().to_list(None)
+            cls.note_listing(collection, indexes)
+        except Exception as e:
+            logger.debug(f"IndexCatalog refresh failed for {cls._key(collection)} (non-critical): {e}")
+        finally:
+            state.loading = False
+
+    @classmethod
+    def note_listing(cls, collection: AsyncIOMotorCollection, indexes: List[Dict[str, Any]]):
+        """Replaces the known index names with a fresh server listing."""
+        state = cls._state(collection)
+        state.index_names = {idx.get("name") for idx in indexes if idx.get("name")}
+        state.loaded_at = time.monotonic()
+        # Give failed auto-index attempts another chance once per TTL window
+        state.attempted = {name: ok for name, ok in state.attempted.items() if ok}
+
+    @classmethod
+    def note_created(cls, collection: AsyncIOMotorCollection, name: str):
+        state = cls._state(collection)
+        if state.index_names is not None:
+            state.index_names.add(name)
+
+    @classmethod
+    def note_dropped(cls, collection: AsyncIOMotorCollection, name: str):
+        state = cls._state(collection)
+        if state.index_names is not None:
+            state.index_names.discard(name)
+        state.attempted.pop(name, None)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of catalog contents for debugging/admin views."""
+        now = time.monotonic()
+        return {
+            key: {
+                "index_names": sorted(state.index_names) if state.index_names is not None else None,
+                "age_seconds": round(now - state.loaded_at, 1) if state.index_names is not None else None,
+                "query_patterns": dict(state.query_counts),
+                "auto_index_attempts": dict(state.attempted),
+            }
+            for key, state in cls._states.items()
+        }
+
+
 class AutoIndexManager:
     """
     Magical index manager that automatically creates indexes based on query patterns.
@@ -514,20 +700,15 @@ class AutoIndexManager:
     - Automatically detects query patterns (equality, range, sorting)
     - Creates indexes on-demand based on usage
     - Uses intelligent heuristics to avoid over-indexing
-    - Thread-safe with async locks
+    - Query counts and known index names live in the process-wide `IndexCatalog`,
+      so they survive the per-request wrapper churn and cost no round-trips
     """
     
-    __slots__ = ('_collection', '_index_manager', '_creation_cache', '_lock', '_query_counts')
+    __slots__ = ('_collection', '_index_manager')
     
     def __init__(self, collection: AsyncIOMotorCollection, index_manager: AsyncAtlasIndexManager):
         self._collection = collection
         self._index_manager = index_manager
-        # Cache of index creation decisions (index_name -> bool)
-        self._creation_cache: Dict[str, bool] = {}
-        # Async lock to prevent race conditions during index creation
-        self._lock = asyncio.Lock()
-        # Track query patterns to determine which indexes to create
-        self._query_counts: Dict[str, int] = {}
     
     def _extract_index_fields_from_filter(self, filter: Optional[Mapping[str, Any]]) -> List[Tuple[str, int]]:
         """
@@ -614,9 +795,21 @@ class AutoIndexManager:
         This method:
         1. Extracts potential index fields from filter and sort
         2. Combines them into a composite index if needed
-        3. Creates the index if it doesn't exist and usage threshold is met
-        4. Uses async lock to prevent race conditions
+        3. Counts the pattern in the shared IndexCatalog and, once the usage
+           threshold is met and the catalog says the index is missing,
+           schedules its creation as a background task
+        4. Never awaits the server itself, so it is cheap on the query path
         """
+        planned = self._plan_index(filter, sort)
+        if planned:
+            self._apply_pattern(planned[0], planned[1], hits=1, hint_threshold=hint_threshold)
+    
+    def _plan_index(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        sort: Optional[Union[List[Tuple[str, int]], Dict[str, int]]] = None
+    ) -> Optional[Tuple[str, List[Tuple[str, int]]]]:
+        """Returns (index_name, fields) for the index a query would need, or None."""
         # Extract fields from filter and sort
         filter_fields = self._extract_index_fields_from_filter(filter)
         sort_fields = self._extract_sort_fields(sort)
@@ -635,45 +828,585 @@ class AutoIndexManager:
                 all_fields.append((field, direction))
         
         if not all_fields:
-            return  # No index needed
+            return None  # No index needed
         
         # Limit to first 4 fields (MongoDB compound index best practice)
         all_fields = all_fields[:4]
-        
-        # Generate index name
-        index_name = self._generate_index_name(all_fields)
-        
-        # Track query pattern usage
+        return self._generate_index_name(all_fields), all_fields
+    
+    def _apply_pattern(
+        self,
+        index_name: str,
+        all_fields: List[Tuple[str, int]],
+        hits: int = 1,
+        hint_threshold: int = 3
+    ):
+        """Counts `hits` uses of a pattern and schedules index creation once it is hot."""
+        # Track query pattern usage (shared across all wrappers in the process)
         pattern_key = index_name
-        self._query_counts[pattern_key] = self._query_counts.get(pattern_key, 0) + 1
-        
-        # Only create index if usage threshold is met
-        if self._query_counts[pattern_key] < hint_threshold:
+        if IndexCatalog.record_query(self._collection, pattern_key, hits) < hint_threshold:
             return
         
-        # Check cache to avoid redundant creation attempts
-        async with self._lock:
-            if index_name in self._creation_cache:
-                return  # Already attempted or created
-            
-            try:
-                # Check if index already exists
-                existing_indexes = await self._index_manager.list_indexes()
-                for idx in existing_indexes:
-                    if idx.get("name") == index_name:
-                        self._creation_cache[index_name] = True
-                        return  # Index already exists
-                
-                # Create the index
-                keys = all_fields
-                await self._index_manager.create_index(keys, name=index_name, background=True)
-                self._creation_cache[index_name] = True
-                logger.info(f"✨ Auto-created index '{index_name}' on {self._collection.name} for fields: {[f[0] for f in all_fields]}")
-            
-            except Exception as e:
-                # Don't fail the query if index creation fails
-                logger.warning(f"Failed to auto-create index '{index_name}': {e}")
-                self._creation_cache[index_name] = False
+        # Everything below is in-memory; server work is pushed to background tasks
+        if IndexCatalog.needs_refresh(self._collection):
+            _create_managed_task(IndexCatalog.refresh(self._collection), task_name="index_catalog_refresh")
+        if not IndexCatalog.is_loaded(self._collection):
+            return  # Decide once the first listing lands
+        if IndexCatalog.has_index(self._collection, index_name) or IndexCatalog.attempted(self._collection, index_name):
+            return  # Already exists, being created, or failed this TTL window
+        
+        # Claim the creation synchronously so concurrent queries don't duplicate it
+        IndexCatalog.mark_attempt(self._collection, index_name, True)
+        _create_managed_task(self._create_auto_index(index_name, all_fields), task_name="auto_index_create")
+    
+    async def _create_auto_index(self, index_name: str, keys: List[Tuple[str, int]]):
+        """Creates an auto index in the background and records the outcome in the catalog."""
+        try:
+            # The catalog already knows the index is missing, so skip the
+            # list_indexes() pre-check in AsyncAtlasIndexManager.create_index
+            name = await self._collection.create_index(keys, name=index_name, background=True)
+            IndexCatalog.note_created(self._collection, name)
+            logger.info(f"✨ Auto-created index '{index_name}' on {self._collection.name} for fields: {[f[0] for f in keys]}")
+        except Exception as e:
+            # Don't fail the query if index creation fails
+            logger.warning(f"Failed to auto-create index '{index_name}': {e}")
+            IndexCatalog.mark_attempt(self._collection, index_name, False)
+
+
+class AutoIndexAnalysisQueue:
+    """
+    Single bounded queue that feeds query shapes to `AutoIndexManager` from one
+    background consumer, instead of one short-lived task per read.
+
+    - `submit()` is synchronous and never blocks: it either enqueues, samples
+      the submission out (above the watermark), or drops it (queue full).
+    - The consumer drains up to `AUTO_INDEX_QUEUE_BATCH_SIZE` items at a time
+      and coalesces identical shapes per collection, so a burst of N identical
+      queries costs one analysis.
+    - Sampled submissions are weighted by the sampling rate so pattern counts
+      in the `IndexCatalog` stay roughly proportional to real traffic.
+
+    One instance per process (`auto_index_queue`); the consumer is started
+    lazily on the running loop and restarted if that loop changes.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = AUTO_INDEX_QUEUE_MAXSIZE,
+        sample_watermark: float = AUTO_INDEX_QUEUE_SAMPLE_WATERMARK,
+        sample_rate: int = AUTO_INDEX_QUEUE_SAMPLE_RATE,
+        batch_size: int = AUTO_INDEX_QUEUE_BATCH_SIZE
+    ):
+        self.maxsize = max(1, maxsize)
+        self.sample_threshold = int(self.maxsize * sample_watermark)
+        self.sample_rate = max(1, sample_rate)
+        self.batch_size = max(1, batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sample_tick = 0
+        # Counters (exposed via stats())
+        self.submitted = 0
+        self.enqueued = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.processed = 0
+        self.analyses = 0
+        self.batches = 0
+
+    def _ensure_consumer(self) -> Optional[asyncio.Queue]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None  # No loop (sync context): nothing to do
+        if self._loop is not loop or self._queue is None:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._consumer = None
+        if self._consumer is None or self._consumer.done():
+            self._consumer = loop.create_task(self._run())
+        return self._queue
+
+    def submit(
+        self,
+        manager: "AutoIndexManager",
+        filter: Optional[Mapping[str, Any]] = None,
+        sort: Optional[Union[List[Tuple[str, int]], Dict[str, int]]] = None
+    ):
+        """Hands a query shape to the consumer without blocking the caller."""
+        self.submitted += 1
+        queue = self._ensure_consumer()
+        if queue is None:
+            self.dropped += 1
+            return
+
+        weight = 1
+        if queue.qsize() >= self.sample_threshold:
+            # Heavy load: keep 1 in sample_rate, weighted to preserve counts
+            self._sample_tick += 1
+            if self._sample_tick % self.sample_rate:
+                self.sampled_out += 1
+                return
+            weight = self.sample_rate
+
+        try:
+            queue.put_nowait((manager, filter, sort, weight))
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    @staticmethod
+    def _shape_key(filter: Optional[Mapping[str, Any]], sort: Any) -> Tuple:
+        """Cheap structural key: field names plus operator names, values ignored."""
+        if filter:
+            shape = tuple(
+                (k, tuple(sorted(v)) if isinstance(v, dict) else None)
+                for k, v in filter.items()
+            )
+        else:
+            shape = ()
+        if isinstance(sort, dict):
+            sort = tuple(sort.items())
+        elif isinstance(sort, list):
+            sort = tuple(tuple(s) if isinstance(s, list) else s for s in sort)
+        return shape, sort
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            self.batches += 1
+            self.processed += len(batch)
+
+            # Coalesce identical shapes per collection: key -> [manager, filter, sort, hits]
+            coalesced: Dict[Tuple, List[Any]] = {}
+            for manager, filter, sort, weight in batch:
+                try:
+                    key = (manager._collection.full_name, self._shape_key(filter, sort))
+                except Exception:
+                    key = (id(manager), id(filter), id(sort))  # unhashable shape: don't coalesce
+                entry = coalesced.get(key)
+                if entry is None:
+                    coalesced[key] = [manager, filter, sort, weight]
+                else:
+                    entry[3] += weight
+
+            for manager, filter, sort, hits in coalesced.values():
+                self.analyses += 1
+                try:
+                    planned = manager._plan_index(filter, sort)
+                    if planned:
+                        manager._apply_pattern(planned[0], planned[1], hits=hits)
+                except Exception as e:
+                    logger.debug(f"Auto-index analysis failed (non-critical): {e}")
+
+            # Yield so a saturated queue can't starve the request handlers
+            await asyncio.sleep(0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters for sizing/monitoring."""
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "maxsize": self.maxsize,
+            "sample_threshold": self.sample_threshold,
+            "sample_rate": self.sample_rate,
+            "submitted": self.submitted,
+            "enqueued": self.enqueued,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "analyses": self.analyses,
+            "batches": self.batches,
+            "consumer_running": self._consumer is not None and not self._consumer.done(),
+        }
+
+
+# Process-wide analysis queue shared by every ScopedCollectionWrapper
+auto_index_queue = AutoIndexAnalysisQueue()
+
+
+# ##########################################################################
+# QUERY SHAPE PROFILER
+# ##########################################################################
+
+# Operators that constrain a field to a range rather than a single value
+_RANGE_OPERATORS = frozenset(['$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$exists', '$regex', '$not', '$type', '$mod', '$size', '$all'])
+# Logical operators whose value is a list of sub-filters
+_LOGICAL_OPERATORS = frozenset(['$and', '$or', '$nor'])
+
+
+def _normalize_sort(sort: Any) -> List[Tuple[str, int]]:
+    """Normalizes a sort spec (dict, list of pairs, or single key) to a list of pairs."""
+    if not sort:
+        return []
+    if isinstance(sort, str):
+        return [(sort, ASCENDING)]
+    if isinstance(sort, Mapping):
+        return [(k, v) for k, v in sort.items()]
+    return [tuple(pair) for pair in sort]
+
+
+def _normalize_value_shape(value: Any) -> Any:
+    """Replaces literal values with '?' while keeping operator structure."""
+    if isinstance(value, Mapping):
+        if value and all(isinstance(k, str) and k.startswith('$') for k in value):
+            shape = {}
+            for op, operand in value.items():
+                if op == '$elemMatch' and isinstance(operand, Mapping):
+                    shape[op] = normalize_query_shape(operand)
+                elif op == '$not':
+                    shape[op] = _normalize_value_shape(operand)
+                else:
+                    shape[op] = '?'
+            return shape
+        return '?'  # Embedded document equality
+    return '?'
+
+
+def normalize_query_shape(filter: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Returns the shape of a filter: field names and operators with every literal
+    value replaced by '?'. `$and`/`$or`/`$nor` branches are normalized
+    recursively, so `{"$or": [{"a": 1}, {"b": {"$gt": 2}}]}` becomes
+    `{"$or": [{"a": "?"}, {"b": {"$gt": "?"}}]}`.
+    """
+    if not filter:
+        return {}
+    shape: Dict[str, Any] = {}
+    for key, value in filter.items():
+        if key in _LOGICAL_OPERATORS and isinstance(value, list):
+            shape[key] = [normalize_query_shape(sub) if isinstance(sub, Mapping) else '?' for sub in value]
+        elif key.startswith('$'):
+            shape[key] = '?'  # $text, $expr, $where, ...
+        else:
+            shape[key] = _normalize_value_shape(value)
+    return shape
+
+
+def _classify_filter_fields(filter: Optional[Mapping[str, Any]], equality: List[str], ranges: List[str]) -> List[Mapping[str, Any]]:
+    """
+    Sorts a filter's fields into equality and range buckets (flattening $and)
+    and returns any `$or` branch lists found, which need one index per branch.
+    """
+    or_branches: List[Mapping[str, Any]] = []
+    if not filter:
+        return or_branches
+    for key, value in filter.items():
+        if key == '$and' and isinstance(value, list):
+            for sub in value:
+                if isinstance(sub, Mapping):
+                    or_branches.extend(_classify_filter_fields(sub, equality, ranges))
+        elif key == '$or' and isinstance(value, list):
+            or_branches.append(value)
+        elif key.startswith('$'):
+            continue  # $nor/$text/$expr can't use a regular B-tree prefix
+        elif isinstance(value, Mapping) and value and all(isinstance(k, str) and k.startswith('$') for k in value):
+            ops = set(value)
+            if ops & {'$eq', '$in', '$elemMatch'} and not ops & _RANGE_OPERATORS:
+                bucket = equality
+            else:
+                bucket = ranges
+            if key not in equality and key not in ranges:
+                bucket.append(key)
+        elif key not in equality:
+            if key in ranges:
+                ranges.remove(key)
+            equality.append(key)
+    return or_branches
+
+
+def suggest_indexes(
+    filter: Optional[Mapping[str, Any]] = None,
+    sort: Any = None
+) -> List[List[Tuple[str, int]]]:
+    """
+    Suggests the compound index(es) a query needs, ordered by the
+    Equality-Sort-Range rule. A top-level `$or` yields one index per branch
+    (each prefixed with the fields ANDed around it), since the planner
+    answers `$or` with one index scan per clause.
+    """
+    equality: List[str] = []
+    ranges: List[str] = []
+    or_groups = _classify_filter_fields(filter, equality, ranges)
+    sort_pairs = _normalize_sort(sort)
+
+    def _build(eq: List[str], rng: List[str]) -> List[Tuple[str, int]]:
+        keys = [(f, ASCENDING) for f in eq]
+        used = set(eq)
+        for field, direction in sort_pairs:
+            if field not in used:
+                keys.append((field, direction))
+                used.add(field)
+        keys.extend((f, ASCENDING) for f in rng if f not in used)
+        return keys
+
+    if not or_groups:
+        keys = _build(equality, ranges)
+        return [keys] if keys else []
+
+    suggestions: List[List[Tuple[str, int]]] = []
+    for branches in or_groups:
+        for branch in branches:
+            if not isinstance(branch, Mapping):
+                continue
+            branch_eq, branch_rng = list(equality), list(ranges)
+            _classify_filter_fields(branch, branch_eq, branch_rng)
+            keys = _build(branch_eq, branch_rng)
+            if keys and keys not in suggestions:
+                suggestions.append(keys)
+    return suggestions
+
+
+class _ShapeStats:
+    """Aggregated timings for one normalized query shape."""
+
+    __slots__ = ('op', 'shape', 'sort', 'count', 'total_ms', 'max_ms', 'total_docs', 'last_seen', 'suggested')
+
+    def __init__(self, op: str, shape: Dict[str, Any], sort: List[Tuple[str, int]], suggested: List[List[Tuple[str, int]]]):
+        self.op = op
+        self.shape = shape
+        self.sort = sort
+        self.suggested = suggested
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_docs = 0
+        self.last_seen = 0.0
+
+
+class QueryProfiler:
+    """
+    Records normalized read shapes per scoped collection, with latency and
+    result sizes, and turns them into index advice.
+
+    Keys are `(write_scope, collection name)`. Shapes are bounded per
+    collection (`QUERY_PROFILER_MAX_SHAPES`); new shapes beyond the cap are
+    only counted in `overflow`. Data is per process: requests served by the
+    FastAPI worker and queries run inside Ray actors are profiled where they
+    execute. `snapshot()` exports one process's raw stats (actors are asked
+    via `actor_query_profile_snapshot`) and `merge_query_profiles()` turns
+    any number of snapshots into one report.
+    """
+
+    def __init__(self, enabled: bool = QUERY_PROFILER_ENABLED, max_shapes: int = QUERY_PROFILER_MAX_SHAPES):
+        self.enabled = enabled
+        self.max_shapes = max_shapes
+        self.overflow = 0
+        self._shapes: Dict[Tuple[str, str], Dict[str, _ShapeStats]] = {}
+
+    def record(
+        self,
+        scope: str,
+        collection_name: str,
+        op: str,
+        filter: Optional[Mapping[str, Any]],
+        sort: Any,
+        elapsed_ms: float,
+        docs: int
+    ):
+        """Adds one execution to its shape's stats. Never raises into the query path."""
+        try:
+            shape = normalize_query_shape(filter)
+            sort_pairs = _normalize_sort(sort)
+            shape_key = f"{op}|{json.dumps(shape, sort_keys=True)}|{sort_pairs}"
+            shapes = self._shapes.setdefault((scope, collection_name), {})
+            stats = shapes.get(shape_key)
+            if stats is None:
+                if len(shapes) >= self.max_shapes:
+                    self.overflow += 1
+                    return
+                stats = shapes[shape_key] = _ShapeStats(op, shape, sort_pairs, suggest_indexes(filter, sort_pairs))
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.total_docs += docs
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            stats.last_seen = time.time()
+        except Exception as e:
+            logger.debug(f"Query profiler failed to record shape (non-critical): {e}")
+
+    def reset(self, scope: Optional[str] = None):
+        if scope is None:
+            self._shapes.clear()
+            self.overflow = 0
+        else:
+            for key in [k for k in self._shapes if k[0] == scope]:
+                del self._shapes[key]
+
+    def snapshot(self, scope: str) -> Dict[str, Any]:
+        """Raw (summable) stats of every shape recorded for an experiment in this process."""
+        entries = []
+        for (entry_scope, collection_name), shapes in self._shapes.items():
+            if entry_scope != scope:
+                continue
+            for stats in shapes.values():
+                entries.append({
+                    "collection": collection_name,
+                    "op": stats.op,
+                    "shape": stats.shape,
+                    "sort": [[f, d] for f, d in stats.sort],
+                    "count": stats.count,
+                    "total_ms": stats.total_ms,
+                    "max_ms": stats.max_ms,
+                    "total_docs": stats.total_docs,
+                    "last_seen": stats.last_seen,
+                    "suggested": [[[f, d] for f, d in keys] for keys in stats.suggested],
+                })
+        return {"enabled": self.enabled, "overflow": self.overflow, "entries": entries}
+
+    def report(self, scope: str, top: int = 10) -> Dict[str, Any]:
+        """Report for an experiment from this process only (see merge_query_profiles)."""
+        return merge_query_profiles(scope, [self.snapshot(scope)], top=top)
+
+
+def merge_query_profiles(scope: str, snapshots: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """
+    Combines QueryProfiler snapshots (e.g. the FastAPI worker and each actor
+    replica) into the slowest (by average latency) and most frequent shapes
+    for an experiment, each with the compound index(es) it needs, formatted
+    as ready-to-paste `managed_indexes` entries.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for entry in snapshot.get("entries", []):
+            key = f"{entry['collection']}|{entry['op']}|{json.dumps(entry['shape'], sort_keys=True)}|{entry['sort']}"
+            total = merged.get(key)
+            if total is None:
+                merged[key] = dict(entry)
+                continue
+            total["count"] += entry["count"]
+            total["total_ms"] += entry["total_ms"]
+            total["total_docs"] += entry["total_docs"]
+            total["max_ms"] = max(total["max_ms"], entry["max_ms"])
+            total["last_seen"] = max(total["last_seen"], entry["last_seen"])
+
+    entries = []
+    for total in merged.values():
+        collection_name = total["collection"]
+        base_name = collection_name[len(scope) + 1:] if collection_name.startswith(f"{scope}_") else collection_name
+        count = total["count"]
+        entries.append({
+            "collection": collection_name,
+            "op": total["op"],
+            "shape": total["shape"],
+            "sort": total["sort"],
+            "count": count,
+            "avg_ms": round(total["total_ms"] / count, 3) if count else 0.0,
+            "max_ms": round(total["max_ms"], 3),
+            "avg_docs": round(total["total_docs"] / count, 2) if count else 0.0,
+            "last_seen": total["last_seen"],
+            "suggested_indexes": [
+                {
+                    "collection": base_name,
+                    "name": f"{base_name}_{'_'.join(f.replace('.', '_') for f, _ in keys)}_index",
+                    "type": "regular",
+                    "keys": {f: d for f, d in keys},
+                }
+                for keys in total["suggested"]
+            ],
+        })
+    return {
+        "enabled": any(snapshot.get("enabled") for snapshot in snapshots),
+        "shapes_tracked": len(entries),
+        "overflow": sum(snapshot.get("overflow", 0) for snapshot in snapshots),
+        "slowest": sorted(entries, key=lambda e: e["avg_ms"], reverse=True)[:top],
+        "most_frequent": sorted(entries, key=lambda e: e["count"], reverse=True)[:top],
+    }
+
+
+def actor_query_profile_snapshot(actor: Any, scope: str) -> Dict[str, Any]:
+    """
+    Runs inside an experiment actor via `handle.__ray_call__.remote(actor_query_profile_snapshot, slug)`,
+    which every Ray actor supports, so actors need no profiler method of their own.
+    """
+    return query_profiler.snapshot(scope)
+
+
+# Process-wide profiler shared by every ScopedCollectionWrapper
+query_profiler = QueryProfiler()
+
+
+class _ProfiledCursor:
+    """
+    Thin proxy around a Motor cursor that times it from first fetch to the
+    last fetch and reports the shape to `query_profiler` once: on exhaustion,
+    on close(), or when a partially read cursor is garbage-collected. Builder
+    methods (sort, limit, skip, ...) return the proxy so chaining keeps working.
+    """
+
+    __slots__ = ('_cursor', '_scope', '_collection_name', '_filter', '_sort', '_start', '_last', '_docs', '_recorded')
+
+    def __init__(self, cursor: AsyncIOMotorCursor, scope: str, collection_name: str, filter: Optional[Mapping[str, Any]], sort: Any):
+        self._cursor = cursor
+        self._scope = scope
+        self._collection_name = collection_name
+        self._filter = filter
+        self._sort = sort
+        self._start: Optional[float] = None
+        self._last: Optional[float] = None
+        self._docs = 0
+        self._recorded = False
+
+    def _finish(self):
+        if not self._recorded and self._start is not None:
+            self._recorded = True
+            elapsed_ms = ((self._last or time.perf_counter()) - self._start) * 1000
+            query_profiler.record(self._scope, self._collection_name, "find", self._filter, self._sort, elapsed_ms, self._docs)
+
+    def __del__(self):
+        self._finish()
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def _proxy(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if result is self._cursor:
+                if name == "sort" and args:
+                    key_or_list = args[0]
+                    direction = args[1] if len(args) > 1 else kwargs.get("direction", ASCENDING)
+                    self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list
+                return self
+            return result
+        return _proxy
+
+    async def to_list(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        if self._start is None:
+            self._start = time.perf_counter()
+        docs = await self._cursor.to_list(*args, **kwargs)
+        self._last = time.perf_counter()
+        self._docs += len(docs)
+        if not self._cursor.alive:
+            self._finish()
+        return docs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._start is None:
+            self._start = time.perf_counter()
+        try:
+            doc = await self._cursor.__anext__()
+        except StopAsyncIteration:
+            self._last = time.perf_counter()
+            self._finish()
+            raise
+        self._last = time.perf_counter()
+        self._docs += 1
+        return doc
 
 
 # ##########################################################################
@@ -698,20 +1431,33 @@ class ScopedCollectionWrapper:
     Magical Auto-Indexing:
     - Automatically creates indexes based on query patterns
     - Analyzes filter and sort specifications to determine needed indexes
-    - Creates indexes in the background without blocking queries
+    - Feeds query shapes to a single bounded analysis queue (`auto_index_queue`)
+      and creates indexes in the background without blocking queries
     - Enables experiments to use collections without manual index configuration
     - Can be disabled by setting `auto_index=False` in constructor
+
+    Compiled Scope Filter:
+    - The `experiment_id` scope clause is built once per wrapper
+    - A single read scope collapses to a plain equality (`{"experiment_id": slug}`)
+    - Simple top-level dict filters get the scope merged in as a sibling key
+      rather than being nested under `$and`
+    - Can be disabled by setting `compiled_scope_filter=False` (or the
+      `MONGO_COMPILED_SCOPE_FILTER` env var) to restore the legacy shape
     """
     
     # Use __slots__ for memory and speed optimization
-    __slots__ = ('_collection', '_read_scopes', '_write_scope', '_index_manager', '_auto_index_manager', '_auto_index_enabled')
+    __slots__ = (
+        '_collection', '_read_scopes', '_write_scope', '_index_manager', '_auto_index_manager',
+        '_auto_index_enabled', '_compiled_scope', '_scope_value'
+    )
 
     def __init__(
         self,
         real_collection: AsyncIOMotorCollection,
         read_scopes: List[str],
         write_scope: str,
-        auto_index: bool = True
+        auto_index: bool = True,
+        compiled_scope_filter: Optional[bool] = None
     ):
         self._collection = real_collection
         self._read_scopes = read_scopes
@@ -721,6 +1467,14 @@ class ScopedCollectionWrapper:
         self._index_manager: Optional[AsyncAtlasIndexManager] = None
         self._auto_index_manager: Optional[AutoIndexManager] = None
 
+        # Precompile the scope clause once per wrapper (see _inject_read_filter)
+        self._compiled_scope = COMPILED_SCOPE_FILTER if compiled_scope_filter is None else compiled_scope_filter
+        if self._compiled_scope and len(read_scopes) == 1:
+            # Single scope: plain equality gives the planner tight index bounds
+            self._scope_value: Any = read_scopes[0]
+        else:
+            self._scope_value = {"$in": list(read_scopes)}
+
     @property
     def index_manager(self) -> AsyncAtlasIndexManager:
         """
@@ -762,16 +1516,37 @@ class ScopedCollectionWrapper:
         Combines the user's filter with our mandatory scope filter.
         
         Optimization: If the user filter is empty, just return the scope filter.
+        In compiled mode, a plain dict filter that doesn't already constrain
+        `experiment_id` gets the scope merged in as a top-level key (implicit AND).
         Otherwise, combine them robustly with $and.
         """
-        scope_filter = {"experiment_id": {"$in": self._read_scopes}}
-        
+        if not self._compiled_scope:
+            # Legacy mode: fresh $in clause, always nested under $and
+            scope_filter = {"experiment_id": {"$in": self._read_scopes}}
+            if not filter:
+                return scope_filter
+            return {"$and": [filter, scope_filter]}
+
+        # The returned filter ends up in caller filters and pipelines, which may be
+        # mutated later, so hand out copies of the precompiled clause, never the clause
+        scope_value = self._scope_value
+        if type(scope_value) is dict:
+            scope_value = {"$in": list(scope_value["$in"])}
+
         # If filter is None or {}, just return the scope filter
         if not filter:
-            return scope_filter
-            
-        # If filter exists, combine them robustly with $and
-        return {"$and": [filter, scope_filter]}
+            return {"experiment_id": scope_value}
+
+        # Simple top-level filter: merge instead of nesting. Exact dict type
+        # only, since ordered/raw BSON mappings may carry semantics we must keep.
+        if type(filter) is dict and "experiment_id" not in filter:
+            merged = dict(filter)
+            merged["experiment_id"] = scope_value
+            return merged
+
+        # The caller already filters on experiment_id (or passed an exotic
+        # mapping): keep both constraints intact with $and
+        return {"$and": [filter, {"experiment_id": scope_value}]}
 
     async def insert_one(
         self,
@@ -815,15 +1590,22 @@ class ScopedCollectionWrapper:
         Applies the read scope to the filter.
         Automatically ensures appropriate indexes exist for the query.
         """
-        # Magical auto-indexing: ensure indexes exist before querying
+        # Magical auto-indexing: hand the query shape to the shared analysis queue
         # Note: We analyze the user's filter, not the scoped filter, since
         # experiment_id index is always ensured separately
         if self.auto_index_manager:
-            sort = kwargs.get('sort')
-            await self.auto_index_manager.ensure_index_for_query(filter=filter, sort=sort)
+            auto_index_queue.submit(self.auto_index_manager, filter, kwargs.get('sort'))
         
         scoped_filter = self._inject_read_filter(filter)
-        return await self._collection.find_one(scoped_filter, *args, **kwargs)
+        if not query_profiler.enabled:
+            return await self._collection.find_one(scoped_filter, *args, **kwargs)
+        start = time.perf_counter()
+        doc = await self._collection.find_one(scoped_filter, *args, **kwargs)
+        query_profiler.record(
+            self._write_scope, self._collection.name, "find_one", filter, kwargs.get('sort'),
+            (time.perf_counter() - start) * 1000, 1 if doc is not None else 0
+        )
+        return doc
 
     def find(
         self,
@@ -836,20 +1618,16 @@ class ScopedCollectionWrapper:
         Returns an async cursor, just like motor.
         Automatically ensures appropriate indexes exist for the query.
         """
-        # Magical auto-indexing: ensure indexes exist before querying
+        # Magical auto-indexing: hand the query shape to the shared analysis queue
         # Note: This is fire-and-forget, doesn't block cursor creation
         if self.auto_index_manager:
-            sort = kwargs.get('sort')
-            # Create a task to ensure index (fire and forget, managed to prevent accumulation)
-            async def _safe_index_task():
-                try:
-                    await self.auto_index_manager.ensure_index_for_query(filter=filter, sort=sort)
-                except Exception as e:
-                    logger.debug(f"Auto-index creation failed for query (non-critical): {e}")
-            _create_managed_task(_safe_index_task(), task_name="auto_index_check")
+            auto_index_queue.submit(self.auto_index_manager, filter, kwargs.get('sort'))
         
         scoped_filter = self._inject_read_filter(filter)
-        return self._collection.find(scoped_filter, *args, **kwargs)
+        cursor = self._collection.find(scoped_filter, *args, **kwargs)
+        if query_profiler.enabled:
+            return _ProfiledCursor(cursor, self._write_scope, self._collection.name, filter, kwargs.get('sort'))
+        return cursor
 
     async def update_one(
         self,
@@ -909,12 +1687,21 @@ class ScopedCollectionWrapper:
         Applies the read scope to the filter for counting.
         Automatically ensures appropriate indexes exist for the query.
         """
-        # Magical auto-indexing: ensure indexes exist before querying
+        # Magical auto-indexing: hand the query shape to the shared analysis queue
         if self.auto_index_manager:
-            await self.auto_index_manager.ensure_index_for_query(filter=filter)
+            auto_index_queue.submit(self.auto_index_manager, filter)
         
         scoped_filter = self._inject_read_filter(filter)
-        return await self._collection.count_documents(scoped_filter, *args, **kwargs)
+        if not query_profiler.enabled:
+            return await self._collection.count_documents(scoped_filter, *args, **kwargs)
+        start = time.perf_counter()
+        count = await self._collection.count_documents(scoped_filter, *args, **kwargs)
+        # For counts, "docs" is the matched count rather than documents returned
+        query_profiler.record(
+            self._write_scope, self._collection.name, "count_documents", filter, None,
+            (time.perf_counter() - start) * 1000, count
+        )
+        return count
 
     def aggregate(  
         self,  
@@ -930,9 +1717,7 @@ class ScopedCollectionWrapper:
         """  
         if not pipeline:  
             # No stages given, just prepend our $match  
-            scope_match_stage = {  
-                "$match": {"experiment_id": {"$in": self._read_scopes}}  
-            }  
+            scope_match_stage = {"$match": self._inject_read_filter(None)}
             pipeline = [scope_match_stage]  
             return self._collection.aggregate(pipeline, *args, **kwargs)  
     
@@ -945,7 +1730,7 @@ class ScopedCollectionWrapper:
             # Instead, embed our scope in the 'filter' of $vectorSearch.  
             vs_stage = first_stage["$vectorSearch"]  
             existing_filter = vs_stage.get("filter", {})  
-            scope_filter = {"experiment_id": {"$in": self._read_scopes}}  
+            scope_filter = self._inject_read_filter(None)
     
             if existing_filter:  
                 # Combine the user's existing filter with our scope filter via $and  
@@ -959,9 +1744,7 @@ class ScopedCollectionWrapper:
         else:  
             # Normal case: pipeline doesn't start with $vectorSearch,   
             # so we can safely prepend a $match stage for scoping.  
-            scope_match_stage = {  
-                "$match": {"experiment_id": {"$in": self._read_scopes}}  
-            }  
+            scope_match_stage = {"$match": self._inject_read_filter(None)}
             scoped_pipeline = [scope_match_stage] + pipeline  
             return self._collection.aggregate(scoped_pipeline, *args, **kwargs)  
 
@@ -988,19 +1771,22 @@ class ScopedMongoWrapper:
     # Lock to prevent race conditions when multiple requests try to create the same index
     _experiment_id_index_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
     
-    __slots__ = ('_db', '_read_scopes', '_write_scope', '_wrapper_cache', '_auto_index')
+    __slots__ = ('_db', '_read_scopes', '_write_scope', '_wrapper_cache', '_auto_index', '_compiled_scope_filter')
 
     def __init__(
         self,
         real_db: AsyncIOMotorDatabase,
         read_scopes: List[str],
         write_scope: str,
-        auto_index: bool = True
+        auto_index: bool = True,
+        compiled_scope_filter: Optional[bool] = None
     ):
         self._db = real_db
         self._read_scopes = read_scopes
         self._write_scope = write_scope
         self._auto_index = auto_index
+        # None -> follow the module-level COMPILED_SCOPE_FILTER default
+        self._compiled_scope_filter = compiled_scope_filter
         
         # Cache for created collection wrappers.
         self._wrapper_cache: Dict[str, ScopedCollectionWrapper] = {}
@@ -1063,7 +1849,8 @@ class ScopedMongoWrapper:
             real_collection=real_collection,
             read_scopes=self._read_scopes,
             write_scope=self._write_scope,
-            auto_index=self._auto_index
+            auto_index=self._auto_index,
+            compiled_scope_filter=self._compiled_scope_filter
         )
         
         # Magically ensure experiment_id index exists (it's always used in queries)
@@ -1156,7 +1943,8 @@ class ScopedMongoWrapper:
             real_collection=real_collection,
             read_scopes=self._read_scopes,
             write_scope=self._write_scope,
-            auto_index=self._auto_index
+            auto_index=self._auto_index,
+            compiled_scope_filter=self._compiled_scope_filter
         )
         
         # Magically ensure experiment_id index exists (background task)
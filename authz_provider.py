@@ -7,15 +7,188 @@ from __future__ import annotations # MUST be the first import for string type hi
 
 import asyncio
 import logging
+import os
 import time
-from typing import Any, Dict, Optional, Protocol
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
 
 # REMOVED: import casbin  # type: ignore (Avoids module-level dependency)
 
 logger = logging.getLogger(__name__)
 
 # Cache configuration
-AUTHZ_CACHE_TTL = 300  # 5 minutes cache TTL for authorization results
+AUTHZ_CACHE_TTL = int(os.getenv("AUTHZ_CACHE_TTL", "300"))  # 5 minutes cache TTL for authorization results
+AUTHZ_CACHE_MAX_ENTRIES = int(os.getenv("AUTHZ_CACHE_MAX_ENTRIES", "10000"))
+
+DecisionKey = Tuple[str, str, str]
+PermissionPair = Tuple[str, str]  # (resource, action)
+
+
+class DecisionCache:
+    """
+    LRU/TTL cache of (subject, resource, action) -> bool decisions shared by the adapters.
+
+    - Hits are plain dict operations with no await, so no lock is needed on the event loop.
+    - Eviction is O(1): the OrderedDict is kept in recency order and the LRU end is popped.
+    - Concurrent misses for the same key share one in-flight load instead of each
+      paying its own thread hop / provider round trip.
+    - Policy mutations bump a generation counter; entries (and in-flight loads) from an
+      older generation are never served or stored, so invalidation is O(1) too.
+    """
+
+    def __init__(self, ttl: float = AUTHZ_CACHE_TTL, max_entries: int = AUTHZ_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        # {key: (result, expires_at, generation)}
+        self._entries: "OrderedDict[DecisionKey, Tuple[bool, float, int]]" = OrderedDict()
+        # {(key, generation): task}
+        self._inflight: Dict[Tuple[DecisionKey, int], asyncio.Task] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: DecisionKey) -> Optional[bool]:
+        """Returns the cached decision, or None on a miss (expired/stale entries are dropped)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, expires_at, generation = entry
+        if generation != self.generation or expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: DecisionKey, result: bool, generation: int) -> None:
+        if generation != self.generation:
+            return  # policy changed while this decision was being computed
+        self._entries[key] = (result, time.monotonic() + self.ttl, generation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: DecisionKey, loader: Callable[[], Awaitable[bool]]) -> bool:
+        """
+        Returns the cached decision for `key`, or awaits `loader()` exactly once per
+        key/generation however many callers miss concurrently. Loader exceptions are
+        propagated to every waiter and nothing is cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"Authorization cache HIT for {key}")
+            return cached
+
+        generation = self.generation
+        inflight_key = (key, generation)
+        task = self._inflight.get(inflight_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(loader())
+            self._inflight[inflight_key] = task
+            task.add_done_callback(
+                lambda t: self._on_loaded(inflight_key, generation, t)
+            )
+        # shield: a cancelled caller must not cancel the load other callers are awaiting
+        return await asyncio.shield(task)
+
+    async def get_or_load_many(
+        self,
+        subject: str,
+        pairs: Sequence[PermissionPair],
+        batch_loader: Callable[[List[PermissionPair]], Awaitable[List[bool]]],
+    ) -> Dict[PermissionPair, bool]:
+        """
+        Batched get_or_load for one subject: hits are served from the cache, pairs
+        already being loaded by another caller are joined, and every remaining miss
+        is resolved by a single `batch_loader(missing_pairs)` call.
+        """
+        results: Dict[PermissionPair, bool] = {}
+        joined: Dict[PermissionPair, asyncio.Future] = {}
+        missing: List[PermissionPair] = []
+        generation = self.generation
+
+        for pair in dict.fromkeys(pairs):
+            key = (subject, pair[0], pair[1])
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                results[pair] = cached
+                continue
+            inflight = self._inflight.get((key, generation))
+            if inflight is not None:
+                self.coalesced += 1
+                joined[pair] = inflight
+            else:
+                self.misses += 1
+                missing.append(pair)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            batch = asyncio.ensure_future(batch_loader(missing))
+            for pair in missing:
+                inflight_key = ((subject, pair[0], pair[1]), generation)
+                future = loop.create_future()
+                self._inflight[inflight_key] = future
+                future.add_done_callback(
+                    lambda f, k=inflight_key: self._on_loaded(k, generation, f)
+                )
+                joined[pair] = future
+
+            def _fan_out(done: asyncio.Task, pending=list(missing)) -> None:
+                for index, pair in enumerate(pending):
+                    future = joined[pair]
+                    if future.done():
+                        continue
+                    if done.cancelled():
+                        future.cancel()
+                    elif done.exception() is not None:
+                        future.set_exception(done.exception())
+                    else:
+                        future.set_result(bool(done.result()[index]))
+
+            batch.add_done_callback(_fan_out)
+
+        for pair, future in joined.items():
+            results[pair] = await asyncio.shield(future)
+        return results
+
+    def _on_loaded(self, inflight_key, generation: int, task: asyncio.Task) -> None:
+        self._inflight.pop(inflight_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.put(inflight_key[0], bool(task.result()), generation)
+
+    def invalidate(self) -> None:
+        """Drops every cached decision by moving to a new generation."""
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "inflight": len(self._inflight),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
 
 
 class AuthorizationProvider(Protocol):
@@ -35,6 +208,18 @@ class AuthorizationProvider(Protocol):
         """
         ...
 
+    async def check_many(
+        self,
+        subject: str,
+        checks: Sequence[PermissionPair],
+        user_object: Optional[Dict[str, Any]] = None,
+    ) -> Dict[PermissionPair, bool]:
+        """
+        Evaluates several (resource, action) pairs for one subject in a single
+        provider round trip. Returns {(resource, action): allowed}.
+        """
+        ...
+
 
 class CasbinAdapter:
     """
@@ -48,9 +233,7 @@ class CasbinAdapter:
         Initializes the adapter with a pre-configured Casbin AsyncEnforcer.
         """
         self._enforcer = enforcer
-        # Cache for authorization results: {(subject, resource, action): (result, timestamp)}
-        self._cache: Dict[tuple[str, str, str], tuple[bool, float]] = {}
-        self._cache_lock = asyncio.Lock()
+        self._cache = DecisionCache()
         logger.info("✔️  CasbinAdapter initialized with async thread pool execution and caching.")
 
     async def check(
@@ -64,41 +247,13 @@ class CasbinAdapter:
         Performs the authorization check using the wrapped enforcer.
         Uses thread pool execution to prevent blocking the event loop and caches results.
         """
-        cache_key = (subject, resource, action)
-        current_time = time.time()
-        
-        # Check cache first
-        async with self._cache_lock:
-            if cache_key in self._cache:
-                cached_result, cached_time = self._cache[cache_key]
-                # Check if cache entry is still valid
-                if current_time - cached_time < AUTHZ_CACHE_TTL:
-                    logger.debug(
-                        f"Authorization cache HIT for ({subject}, {resource}, {action})"
-                    )
-                    return cached_result
-                # Cache expired, remove it
-                del self._cache[cache_key]
-        
         try:
             # The .enforce() method on AsyncEnforcer is synchronous and blocks the event loop.
-            # Run it in a thread pool to prevent blocking.
-            result = await asyncio.to_thread(
-                self._enforcer.enforce, subject, resource, action
+            # Run it in a thread pool to prevent blocking; concurrent misses share one hop.
+            result = await self._cache.get_or_load(
+                (subject, resource, action),
+                lambda: asyncio.to_thread(self._enforcer.enforce, subject, resource, action),
             )
-            
-            # Cache the result
-            async with self._cache_lock:
-                self._cache[cache_key] = (result, current_time)
-                # Limit cache size to prevent memory issues
-                if len(self._cache) > 1000:
-                    # Remove oldest entries (simple FIFO eviction)
-                    oldest_key = min(
-                        self._cache.items(),
-                        key=lambda x: x[1][1]  # Compare by timestamp
-                    )[0]
-                    del self._cache[oldest_key]
-            
             return result
         except Exception as e:
             logger.error(
@@ -106,14 +261,44 @@ class CasbinAdapter:
                 exc_info=True,
             )
             return False
+
+    async def check_many(
+        self,
+        subject: str,
+        checks: Sequence[PermissionPair],
+        user_object: Optional[Dict[str, Any]] = None,
+    ) -> Dict[PermissionPair, bool]:
+        """
+        Evaluates every uncached (resource, action) pair for `subject` in one thread hop.
+        Uses the enforcer's batch_enforce when available.
+        """
+        def _enforce_all(pairs: List[PermissionPair]) -> List[bool]:
+            batch_enforce = getattr(self._enforcer, "batch_enforce", None)
+            if batch_enforce is not None:
+                return list(batch_enforce([[subject, res, act] for res, act in pairs]))
+            return [self._enforcer.enforce(subject, res, act) for res, act in pairs]
+
+        try:
+            return await self._cache.get_or_load_many(
+                subject, checks, lambda pairs: asyncio.to_thread(_enforce_all, pairs)
+            )
+        except Exception as e:
+            logger.error(
+                f"Casbin batched check failed for {subject} ({len(checks)} checks): {e}",
+                exc_info=True,
+            )
+            return {pair: False for pair in checks}
     
     async def clear_cache(self):
         """
         Clears the authorization cache. Useful when policies are updated.
         """
-        async with self._cache_lock:
-            self._cache.clear()
-            logger.info("Authorization cache cleared.")
+        self._cache.invalidate()
+        logger.info("Authorization cache cleared.")
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for sizing the decision cache."""
+        return self._cache.stats()
 
     async def add_policy(self, *params) -> bool:
         """Helper to pass-through policy additions for seeding."""
@@ -198,9 +383,7 @@ class OsoAdapter:
         Can be either an OSO Cloud client or OSO library client.
         """
         self._oso = oso_client
-        # Cache for authorization results: {(subject, resource, action): (result, timestamp)}
-        self._cache: Dict[tuple[str, str, str], tuple[bool, float]] = {}
-        self._cache_lock = asyncio.Lock()
+        self._cache = DecisionCache()
         logger.info("✔️  OsoAdapter initialized with async thread pool execution and caching.")
 
     async def check(
@@ -216,42 +399,14 @@ class OsoAdapter:
         So we map: subject -> user, action -> permission, resource -> resource
         Uses thread pool execution to prevent blocking the event loop and caches results.
         """
-        cache_key = (subject, resource, action)
-        current_time = time.time()
-        
-        # Check cache first
-        async with self._cache_lock:
-            if cache_key in self._cache:
-                cached_result, cached_time = self._cache[cache_key]
-                # Check if cache entry is still valid
-                if current_time - cached_time < AUTHZ_CACHE_TTL:
-                    logger.debug(
-                        f"Authorization cache HIT for ({subject}, {resource}, {action})"
-                    )
-                    return cached_result
-                # Cache expired, remove it
-                del self._cache[cache_key]
-        
         try:
             # OSO's authorize method signature is: authorize(user, permission, resource)
             # So we map: subject -> user, action -> permission, resource -> resource
             # Run in thread pool to prevent blocking the event loop
-            result = await asyncio.to_thread(
-                self._oso.authorize, subject, action, resource
+            result = await self._cache.get_or_load(
+                (subject, resource, action),
+                lambda: asyncio.to_thread(self._oso.authorize, subject, action, resource),
             )
-            
-            # Cache the result
-            async with self._cache_lock:
-                self._cache[cache_key] = (result, current_time)
-                # Limit cache size to prevent memory issues
-                if len(self._cache) > 1000:
-                    # Remove oldest entries (simple FIFO eviction)
-                    oldest_key = min(
-                        self._cache.items(),
-                        key=lambda x: x[1][1]  # Compare by timestamp
-                    )[0]
-                    del self._cache[oldest_key]
-            
             return result
         except Exception as e:
             logger.error(
@@ -259,14 +414,40 @@ class OsoAdapter:
                 exc_info=True,
             )
             return False
+
+    async def check_many(
+        self,
+        subject: str,
+        checks: Sequence[PermissionPair],
+        user_object: Optional[Dict[str, Any]] = None,
+    ) -> Dict[PermissionPair, bool]:
+        """
+        Evaluates every uncached (resource, action) pair for `subject` in one thread hop.
+        """
+        def _authorize_all(pairs: List[PermissionPair]) -> List[bool]:
+            return [bool(self._oso.authorize(subject, act, res)) for res, act in pairs]
+
+        try:
+            return await self._cache.get_or_load_many(
+                subject, checks, lambda pairs: asyncio.to_thread(_authorize_all, pairs)
+            )
+        except Exception as e:
+            logger.error(
+                f"OSO batched authorize failed for {subject} ({len(checks)} checks): {e}",
+                exc_info=True,
+            )
+            return {pair: False for pair in checks}
     
     async def clear_cache(self):
         """
         Clears the authorization cache. Useful when policies are updated.
         """
-        async with self._cache_lock:
-            self._cache.clear()
-            logger.info("Authorization cache cleared.")
+        self._cache.invalidate()
+        logger.info("Authorization cache cleared.")
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for sizing the decision cache."""
+        return self._cache.stats()
 
     async def add_policy(self, *params) -> bool:
         """
@@ -9,11 +9,12 @@
 
 import os
 import jwt
+import copy
+import time
 import logging
 import asyncio
 from pathlib import Path
 from typing import Optional, Dict, Any, Mapping, List, Tuple
-from datetime import datetime, timedelta
 from collections import OrderedDict
 
 from fastapi import (
@@ -24,9 +25,13 @@ from fastapi import (
     Cookie,
 )
 from fastapi.templating import Jinja2Templates
+from starlette.requests import HTTPConnection
 
 # Import the generic AuthZ interface
 from authz_provider import AuthorizationProvider
+from principal_context import PrincipalContext, decode_token_cached, get_principal
+from actor_registry import ActorPool, actor_registry, actor_name_for
+from middleware import resolve_experiment_scope
 
 # Attempt to import the ScopedMongoWrapper for database sandboxing.
 try:
@@ -58,6 +63,11 @@ if not SECRET_KEY:
     )
     SECRET_KEY = "a_very_bad_dev_secret_key_12345"  # Insecure default
 
+# Platform-level (resource, action) pairs resolved together via authz.check_many
+ADMIN_PERMISSION = ("admin_panel", "access")
+MANAGE_OWN_PERMISSION = ("experiments", "manage_own")
+VIEW_EXPERIMENTS_PERMISSION = ("experiments", "view")
+
 # --- Global Template Loader ---
 
 TEMPLATES_DIR = BASE_DIR / "templates"
@@ -143,17 +153,38 @@ async def get_authz_provider(request: Request) -> AuthorizationProvider:
 
 
 async def get_current_user(
+    request: Request,
     token: Optional[str] = Cookie(default=None),
 ) -> Optional[Dict[str, Any]]:
     """
     FastAPI Dependency: Decodes and validates the JWT stored in the 'token' cookie.
+    The result is memoized on the request's PrincipalContext, and decoded payloads
+    are cached briefly across requests by token hash (see principal_context.py).
     """
+    if not isinstance(token, str):
+        # Called directly as get_current_user(request) the cookie is not injected;
+        # such calls have always resolved to no user, and callers rely on that.
+        return None
+
+    principal = get_principal(request) if request is not None else None
+    if principal is not None:
+        cached = principal.cached_user(token)
+        if cached is not PrincipalContext._UNRESOLVED:
+            return cached
+
+    payload = _decode_current_user(token)
+    if principal is not None:
+        principal.remember_user(token, payload)
+    return payload
+
+
+def _decode_current_user(token: Optional[str]) -> Optional[Dict[str, Any]]:
     if not token:
         logger.debug("get_current_user: No 'token' cookie found.")
         return None
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        payload = decode_token_cached(token, SECRET_KEY)
         logger.debug(
             f"get_current_user: Token successfully decoded for user '{payload.get('email', 'N/A')}'."
         )
@@ -172,6 +203,7 @@ async def get_current_user(
 
 
 async def require_admin(
+    request: Request,
     user: Optional[Mapping[str, Any]] = Depends(get_current_user),
     authz: AuthorizationProvider = Depends(get_authz_provider),
 ) -> Dict[str, Any]:
@@ -183,8 +215,9 @@ async def require_admin(
 
     if user and user.get("email"):
         user_identifier = user.get("email")
-        # Use the generic, async interface method
-        has_perm = await authz.check(
+        # Use the generic, async interface method (memoized for this request)
+        has_perm = await get_principal(request).check(
+            authz,
             subject=user_identifier,
             resource="admin_panel",
             action="access",
@@ -207,6 +240,7 @@ async def require_admin(
 
 
 async def require_admin_or_developer(
+    request: Request,
     user: Optional[Mapping[str, Any]] = Depends(get_current_user),
     authz: AuthorizationProvider = Depends(get_authz_provider),
 ) -> Dict[str, Any]:
@@ -227,14 +261,14 @@ async def require_admin_or_developer(
             detail="Invalid authentication token.",
         )
     
-    # Check if user is an admin
-    is_admin = await authz.check(
-        subject=user_email,
-        resource="admin_panel",
-        action="access",
-        user_object=dict(user)
+    # Resolve admin and developer permissions in one provider round trip
+    perms = await get_principal(request).check_many(
+        authz, user_email, [ADMIN_PERMISSION, MANAGE_OWN_PERMISSION], user_object=dict(user)
     )
     
+    # Check if user is an admin
+    is_admin = perms[ADMIN_PERMISSION]
+    
     if is_admin:
         logger.debug(
             f"require_admin_or_developer: Admin '{user_email}' granted access to upload experiments"
@@ -242,12 +276,7 @@ async def require_admin_or_developer(
         return dict(user)
     
     # Check if user is a developer (has experiments:manage_own permission)
-    is_developer = await authz.check(
-        subject=user_email,
-        resource="experiments",
-        action="manage_own",
-        user_object=dict(user)
-    )
+    is_developer = perms[MANAGE_OWN_PERMISSION]
     
     if is_developer:
         logger.debug(
@@ -299,6 +328,14 @@ async def get_current_user_or_redirect(
     return dict(user)
 
 
+def _parse_permission(permission: str) -> Tuple[str, str]:
+    """Parses an auth_policy permission string ("resource:action" or bare "action")."""
+    if ":" in permission:
+        perm_resource, perm_action = permission.split(":", 1)
+        return perm_resource, perm_action
+    return "experiments", permission
+
+
 async def require_experiment_access(
     request: Request,
     slug_id: str,
@@ -345,18 +382,17 @@ async def require_experiment_access(
             detail="Server configuration error: Database connection not available.",
         )
     
+    # Permission checks are memoized per request (PrincipalContext), so repeated
+    # checks across dependencies cost one provider call each.
+    principal = get_principal(request)
+    
     # GOD-LEVEL ACCESS: Admins bypass ALL checks and get immediate access
     # Check this FIRST before any other checks
     if user:
         user_email = user.get("email")
         if user_email:
             # Check if user is an admin (has admin_panel:access permission)
-            is_admin = await authz.check(
-                subject=user_email,
-                resource="admin_panel",
-                action="access",
-                user_object=dict(user)
-            )
+            is_admin = await principal.check(authz, user_email, *ADMIN_PERMISSION, user_object=dict(user))
             
             if is_admin:
                 logger.debug(
@@ -498,9 +534,9 @@ async def require_experiment_access(
     if allowed_roles:
         has_role = False
         for role in allowed_roles:
-            # Check if user has the role assigned directly via Casbin
+            # Check if user has the role assigned directly via Casbin (memoized for this request)
             if hasattr(authz, "has_role_for_user"):
-                has_role_direct = await authz.has_role_for_user(user_email, role)
+                has_role_direct = await principal.has_role(authz, user_email, role)
                 if has_role_direct:
                     has_role = True
                     logger.debug(
@@ -510,11 +546,8 @@ async def require_experiment_access(
             
             # Also check via permission check for role-based policies (e.g., admin role)
             if not has_role:
-                role_check = await authz.check(
-                    subject=user_email,
-                    resource="experiments",
-                    action=role,  # Some roles are checked as permissions
-                    user_object=dict(user)
+                role_check = await principal.check(
+                    authz, user_email, "experiments", role, user_object=dict(user)  # Some roles are checked as permissions
                 )
                 if role_check:
                     has_role = True
@@ -536,19 +569,8 @@ async def require_experiment_access(
     required_permissions = auth_policy.get("required_permissions", [])
     if required_permissions:
         for permission in required_permissions:
-            # Parse permission as "resource:action"
-            if ":" in permission:
-                perm_resource, perm_action = permission.split(":", 1)
-            else:
-                perm_resource = "experiments"
-                perm_action = permission
-            
-            has_perm = await authz.check(
-                subject=user_email,
-                resource=perm_resource,
-                action=perm_action,
-                user_object=dict(user)
-            )
+            perm_resource, perm_action = _parse_permission(permission)
+            has_perm = await principal.check(authz, user_email, perm_resource, perm_action, user_object=dict(user))
             
             if not has_perm:
                 logger.warning(
@@ -573,12 +595,7 @@ async def require_experiment_access(
     # Check if user has any of the required custom actions
     has_custom_action = False
     for action in custom_actions:
-        has_action = await authz.check(
-            subject=user_email,
-            resource=resource,
-            action=action,
-            user_object=dict(user)
-        )
+        has_action = await principal.check(authz, user_email, resource, action, user_object=dict(user))
         if has_action:
             has_custom_action = True
             logger.debug(
@@ -629,6 +646,7 @@ def require_permission(obj: str, act: str, force_login: bool = True):
     user_dependency = get_current_user_or_redirect if force_login else get_current_user
 
     async def _check_permission(
+        request: Request,
         # 2. The type hint MUST be Optional now
         user: Optional[Dict[str, Any]] = Depends(user_dependency),
         # 3. Ask for the generic INTERFACE
@@ -645,8 +663,9 @@ def require_permission(obj: str, act: str, force_login: bool = True):
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated."
             )
 
-        # 6. Use the generic, async interface method
-        has_perm = await authz.check(
+        # 6. Use the generic, async interface method (memoized for this request)
+        has_perm = await get_principal(request).check(
+            authz,
             subject=user_email,
             resource=obj,
             action=act,
@@ -732,7 +751,7 @@ async def require_experiment_ownership_or_admin(
     """
     # Fetch dependencies if not provided
     if user is None:
-        user_result = await get_current_user()
+        user_result = await get_current_user(request)
         if user_result:
             user = user_result
     
@@ -752,14 +771,14 @@ async def require_experiment_ownership_or_admin(
             detail="Invalid authentication token."
         )
     
-    # Check if user is an admin (full access)
-    is_admin = await authz.check(
-        subject=user_email,
-        resource="admin_panel",
-        action="access",
-        user_object=dict(user)
+    # Resolve admin and developer permissions in one provider round trip
+    perms = await get_principal(request).check_many(
+        authz, user_email, [ADMIN_PERMISSION, MANAGE_OWN_PERMISSION], user_object=dict(user)
     )
     
+    # Check if user is an admin (full access)
+    is_admin = perms[ADMIN_PERMISSION]
+    
     if is_admin:
         logger.debug(
             f"require_experiment_ownership_or_admin: Admin '{user_email}' granted access to experiment '{slug_id}'"
@@ -767,12 +786,7 @@ async def require_experiment_ownership_or_admin(
         return dict(user)
     
     # Check if user is a developer with manage_own permission
-    has_manage_own = await authz.check(
-        subject=user_email,
-        resource="experiments",
-        action="manage_own",
-        user_object=dict(user)
-    )
+    has_manage_own = perms[MANAGE_OWN_PERMISSION]
     
     if not has_manage_own:
         logger.warning(
@@ -877,13 +891,14 @@ async def get_user_experiments(
         logger.error("get_user_experiments: MongoDB connection not available.")
         return []
     
-    # Check if user is an admin (see all experiments)
-    is_admin = await authz.check(
-        subject=user_email,
-        resource="admin_panel",
-        action="access",
-        user_object=dict(user)
+    # Resolve the user's whole permission set in one provider round trip
+    perms = await get_principal(request).check_many(
+        authz,
+        user_email,
+        [ADMIN_PERMISSION, MANAGE_OWN_PERMISSION, VIEW_EXPERIMENTS_PERMISSION],
+        user_object=dict(user),
     )
+    is_admin = perms[ADMIN_PERMISSION]
     
     if is_admin:
         # Admins see all experiments
@@ -895,12 +910,7 @@ async def get_user_experiments(
             return []
     
     # Check if user is a developer (see own experiments only)
-    has_manage_own = await authz.check(
-        subject=user_email,
-        resource="experiments",
-        action="manage_own",
-        user_object=dict(user)
-    )
+    has_manage_own = perms[MANAGE_OWN_PERMISSION]
     
     if has_manage_own:
         # Developers see only their own experiments
@@ -914,12 +924,7 @@ async def get_user_experiments(
             return []
     
     # Check if user has demo role (see all experiments, readonly)
-    has_view = await authz.check(
-        subject=user_email,
-        resource="experiments",
-        action="view",
-        user_object=dict(user)
-    )
+    has_view = perms[VIEW_EXPERIMENTS_PERMISSION]
     
     if has_view:
         # Demo users see all experiments (readonly)
@@ -937,21 +942,174 @@ async def get_user_experiments(
 # --- Request-Scoped Config Caching ---
 
 # Application-level cache for experiment configs with TTL and LRU eviction
-# Format: cache_key -> (config_dict, timestamp)
-# Uses LRU eviction with maximum size to prevent unbounded growth
+# Format: slug_id -> (full config_dict or None, monotonic timestamp)
+# One full document is cached per slug; projections are answered by slicing it in
+# memory, so every projection a request needs costs at most one read per slug.
+# Uses LRU eviction with maximum size to prevent unbounded growth.
+# All cache operations are synchronous dict operations (no awaits), so they are
+# atomic on the event loop and need no lock.
 
 # Cache configuration
 CACHE_TTL_SECONDS = int(os.getenv("EXPERIMENT_CONFIG_CACHE_TTL_SECONDS", "300"))  # 5 minutes TTL
-CACHE_MAX_SIZE = int(os.getenv("EXPERIMENT_CONFIG_CACHE_MAX_SIZE", "100"))  # Maximum number of cache entries
+# TTL used while the change watcher is pushing invalidations into this process
+CACHE_PUSH_TTL_SECONDS = int(os.getenv("EXPERIMENT_CONFIG_CACHE_PUSH_TTL_SECONDS", "3600"))
+CACHE_MAX_SIZE = int(os.getenv("EXPERIMENT_CONFIG_CACHE_MAX_SIZE", "500"))  # Maximum number of cached slugs
+# Polling interval for the fallback watcher (deployments without change streams)
+CACHE_POLL_INTERVAL_SECONDS = float(os.getenv("EXPERIMENT_CONFIG_CACHE_POLL_SECONDS", "10"))
 
-_experiment_config_app_cache: OrderedDict[str, Tuple[Dict[str, Any], datetime]] = OrderedDict()
-_experiment_config_cache_lock = asyncio.Lock()  # Lock for thread-safe cache access
+_experiment_config_app_cache: OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]] = OrderedDict()
+# config _id -> slug, so change-stream delete events (documentKey only) can be mapped to a slug
+_experiment_config_id_slugs: Dict[Any, str] = {}
 
 logger.info(
-    f"Experiment config cache initialized: max_size={CACHE_MAX_SIZE}, ttl={CACHE_TTL_SECONDS}s"
+    f"Experiment config cache initialized: max_size={CACHE_MAX_SIZE}, ttl={CACHE_TTL_SECONDS}s "
+    f"(push ttl={CACHE_PUSH_TTL_SECONDS}s)"
 )
 
 
+def _copy_path(source: Any, target: Dict[str, Any], parts: List[str]) -> None:
+    """Copies source[parts...] into target, following MongoDB inclusion rules for dotted paths."""
+    head, rest = parts[0], parts[1:]
+    if not isinstance(source, Mapping) or head not in source:
+        return
+    value = source[head]
+    if not rest:
+        target[head] = value
+    elif isinstance(value, Mapping):
+        _copy_path(value, target.setdefault(head, {}), rest)
+    elif isinstance(value, list):
+        projected = []
+        for item in value:
+            if isinstance(item, Mapping):
+                sub: Dict[str, Any] = {}
+                _copy_path(item, sub, rest)
+                projected.append(sub)
+        target[head] = projected
+
+
+def _drop_path(doc: Dict[str, Any], parts: List[str]) -> None:
+    """Removes doc[parts...], copying nested dicts on the way so the cached original is untouched."""
+    head, rest = parts[0], parts[1:]
+    if head not in doc:
+        return
+    if not rest:
+        del doc[head]
+    elif isinstance(doc[head], Mapping):
+        doc[head] = dict(doc[head])
+        _drop_path(doc[head], rest)
+
+
+def _project_config(
+    config: Optional[Dict[str, Any]], projection: Optional[Dict[str, int]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Applies a MongoDB-style projection (inclusion or exclusion, dotted paths allowed)
+    to a cached full config. Always returns a deep copy, so callers can't mutate the cache.
+    """
+    if config is None:
+        return None
+    if not projection:
+        return copy.deepcopy(config)
+    include_id = bool(projection.get("_id", 1))
+    fields = [path for path in projection if path != "_id"]
+    if fields and not any(projection[path] for path in fields):
+        # Exclusion projection
+        result = dict(config)
+        for path in fields:
+            _drop_path(result, path.split("."))
+    else:
+        result = {"_id": config["_id"]} if "_id" in config else {}
+        for path in fields:
+            _copy_path(config, result, path.split("."))
+    if not include_id:
+        result.pop("_id", None)
+    return copy.deepcopy(result)
+
+
+def _config_cache_ttl() -> int:
+    return CACHE_PUSH_TTL_SECONDS if experiment_config_watcher.is_pushing else CACHE_TTL_SECONDS
+
+
+def _config_cache_lookup(slug_id: str) -> Tuple[bool, Optional[Dict[str, Any]], float]:
+    """Returns (hit, full_config, age_seconds); expired entries are dropped."""
+    entry = _experiment_config_app_cache.get(slug_id)
+    if entry is None:
+        return False, None, 0.0
+    config, timestamp = entry
+    age = time.monotonic() - timestamp
+    if age >= _config_cache_ttl():
+        _experiment_config_app_cache.pop(slug_id, None)
+        return False, None, age
+    # Move to end for LRU ordering
+    _experiment_config_app_cache.move_to_end(slug_id)
+    return True, config, age
+
+
+def _config_cache_store(slug_id: str, config: Optional[Dict[str, Any]]) -> None:
+    _experiment_config_app_cache[slug_id] = (config, time.monotonic())
+    _experiment_config_app_cache.move_to_end(slug_id)
+    if config and config.get("_id") is not None:
+        _experiment_config_id_slugs[config["_id"]] = slug_id
+    
+    # Evict oldest entries if cache exceeds max size (LRU eviction)
+    while len(_experiment_config_app_cache) > CACHE_MAX_SIZE:
+        oldest_slug, _ = _experiment_config_app_cache.popitem(last=False)
+        logger.debug(
+            f"get_experiment_config: LRU cache evicted oldest entry '{oldest_slug}' "
+            f"(cache_size exceeded {CACHE_MAX_SIZE})"
+        )
+
+
+def _invalidate_experiment_config_slug(slug_id: str) -> int:
+    """Drops the cached config for one slug. Returns the number of entries removed."""
+    removed = _experiment_config_app_cache.pop(slug_id, None) is not None
+    if removed:
+        logger.debug(
+            f"Invalidated cache entry for '{slug_id}' "
+            f"(remaining cache_size={len(_experiment_config_app_cache)})"
+        )
+    return int(removed)
+
+
+def _clear_experiment_config_cache() -> None:
+    _experiment_config_app_cache.clear()
+    _experiment_config_id_slugs.clear()
+
+
+def _request_config_cache(request: Request) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Request-scoped slug -> full config map."""
+    if not hasattr(request.state, "experiment_config_cache"):
+        request.state.experiment_config_cache = {}
+    return request.state.experiment_config_cache
+
+
+def warm_experiment_config_cache(configs: List[Dict[str, Any]], generation: Optional[int] = None) -> int:
+    """
+    Bulk-loads full experiment configs (e.g. the documents reload_active_experiments
+    already fetched) into the application cache so the first requests don't read Mongo.
+    Copies are cached: the caller goes on to mutate and keep its documents.
+
+    Args:
+        configs: Full experiment_config documents (no projection).
+        generation: experiment_config_watcher.generation captured before the documents
+            were read; if an invalidation has arrived since, nothing is stored.
+
+    Returns:
+        Number of configs cached.
+    """
+    if generation is not None and generation != experiment_config_watcher.generation:
+        logger.debug("warm_experiment_config_cache: configs changed during load; skipping warm-up.")
+        return 0
+    warmed = 0
+    for config in configs:
+        slug_id = config.get("slug")
+        if slug_id:
+            _config_cache_store(slug_id, copy.deepcopy(config))
+            warmed += 1
+    logger.debug(f"warm_experiment_config_cache: cached {warmed} experiment config(s).")
+    return warmed
+
+
 async def get_experiment_config(
     request: Request,
     slug_id: str,
@@ -971,54 +1129,35 @@ async def get_experiment_config(
     
     Returns:
         The experiment config dict, or None if not found.
-        
+    
     Cache Key:
-        Uses `request.state.experiment_config_cache` as a dict with slug_id as key.
-        Also uses application-level cache with TTL (5 minutes).
+        Both levels hold one full document per slug_id; `projection` is applied
+        in memory, so different projections share a single read.
+        The application-level cache uses a TTL (5 minutes, or
+        EXPERIMENT_CONFIG_CACHE_PUSH_TTL_SECONDS while ExperimentConfigWatcher
+        is pushing invalidations into this process).
     """
-    # Check if config cache exists in request.state
-    if not hasattr(request.state, "experiment_config_cache"):
-        request.state.experiment_config_cache = {}
-    
-    # Create deterministic cache key for projections
-    if projection:
-        # Sort projection keys for consistent cache key generation
-        sorted_projection = ",".join(f"{k}:{v}" for k, v in sorted(projection.items()))
-        cache_key = f"{slug_id}:{sorted_projection}"
-    else:
-        cache_key = slug_id
+    request_cache = _request_config_cache(request)
     
     # 1. Return cached config if available in request-scoped cache
-    if cache_key in request.state.experiment_config_cache:
+    if slug_id in request_cache:
         logger.debug(
             f"get_experiment_config: Using request-scoped cached config for '{slug_id}' (projection: {projection})"
         )
-        return request.state.experiment_config_cache[cache_key]
-    
-    # 2. Check application-level cache with TTL and LRU eviction (thread-safe)
-    async with _experiment_config_cache_lock:
-        if cache_key in _experiment_config_app_cache:
-            config, timestamp = _experiment_config_app_cache[cache_key]
-            age = datetime.now() - timestamp
-            if age < timedelta(seconds=CACHE_TTL_SECONDS):
-                # Cache hit - still valid, move to end (most recently used)
-                # Move to end for LRU ordering
-                _experiment_config_app_cache.move_to_end(cache_key)
-                logger.debug(
-                    f"get_experiment_config: Using application-level cached config for '{slug_id}' "
-                    f"(projection: {projection}, age: {age.total_seconds():.1f}s, cache_size={len(_experiment_config_app_cache)})"
-                )
-                # Also cache in request-scoped cache for this request
-                request.state.experiment_config_cache[cache_key] = config
-                return config
-            else:
-                # Cache expired - remove it
-                logger.debug(
-                    f"get_experiment_config: Application cache expired for '{slug_id}' (age: {age.total_seconds():.1f}s)"
-                )
-                del _experiment_config_app_cache[cache_key]
+        return _project_config(request_cache[slug_id], projection)
+    
+    # 2. Check application-level cache with TTL and LRU eviction
+    hit, config, age = _config_cache_lookup(slug_id)
+    if hit:
+        logger.debug(
+            f"get_experiment_config: Using application-level cached config for '{slug_id}' "
+            f"(projection: {projection}, age: {age:.1f}s, cache_size={len(_experiment_config_app_cache)})"
+        )
+        # Also cache in request-scoped cache for this request
+        request_cache[slug_id] = config
+        return _project_config(config, projection)
     
-    # 3. Fetch from database
+    # 3. Fetch the full document from database (projections are sliced from it)
     db = getattr(request.app.state, "mongo_db", None)
     if db is None:
         logger.error("get_experiment_config: MongoDB connection not available.")
@@ -1028,32 +1167,14 @@ async def get_experiment_config(
         )
     
     try:
-        if projection:
-            config = await db.experiments_config.find_one({"slug": slug_id}, projection)
-        else:
-            config = await db.experiments_config.find_one({"slug": slug_id})
+        generation = experiment_config_watcher.generation
+        config = await db.experiments_config.find_one({"slug": slug_id})
         
         # Cache the result in both request-scoped and application-level caches
-        request.state.experiment_config_cache[cache_key] = config
-        
-        # Update application-level cache with LRU eviction (thread-safe)
-        async with _experiment_config_cache_lock:
-            # Remove old entry if it exists (for updates)
-            if cache_key in _experiment_config_app_cache:
-                del _experiment_config_app_cache[cache_key]
-            
-            # Add new entry at end (most recently used)
-            _experiment_config_app_cache[cache_key] = (config, datetime.now())
-            
-            # Evict oldest entries if cache exceeds max size (LRU eviction)
-            while len(_experiment_config_app_cache) > CACHE_MAX_SIZE:
-                # Remove oldest entry (first item in OrderedDict)
-                oldest_key = next(iter(_experiment_config_app_cache))
-                del _experiment_config_app_cache[oldest_key]
-                logger.debug(
-                    f"get_experiment_config: LRU cache evicted oldest entry '{oldest_key}' "
-                    f"(cache_size exceeded {CACHE_MAX_SIZE})"
-                )
+        request_cache[slug_id] = config
+        # Skip the app cache if an invalidation arrived while we were reading
+        if generation == experiment_config_watcher.generation:
+            _config_cache_store(slug_id, config)
         
         if config:
             logger.debug(
@@ -1064,7 +1185,7 @@ async def get_experiment_config(
                 f"get_experiment_config: No config found for '{slug_id}' (projection: {projection})"
             )
         
-        return config
+        return _project_config(config, projection)
     except Exception as e:
         logger.error(
             f"get_experiment_config: Error fetching config for '{slug_id}': {e}",
@@ -1098,37 +1219,27 @@ async def get_experiment_configs_batch(
     if not slug_ids:
         return {}
     
-    # Check request-scoped cache first
-    if not hasattr(request.state, "experiment_config_cache"):
-        request.state.experiment_config_cache = {}
-    
-    # Create cache key for batch lookup
-    sorted_slugs = sorted(slug_ids)
-    batch_cache_key = f"batch:{','.join(sorted_slugs)}:{projection or 'all'}"
+    request_cache = _request_config_cache(request)
     
-    # Check if all requested configs are in request-scoped cache
+    # Check the request-scoped cache, then the application-level cache
     cached_results = {}
     missing_slugs = []
     
-    if projection:
-        sorted_projection = ",".join(f"{k}:{v}" for k, v in sorted(projection.items()))
-        for slug_id in slug_ids:
-            cache_key = f"{slug_id}:{sorted_projection}"
-            if cache_key in request.state.experiment_config_cache:
-                cached_results[slug_id] = request.state.experiment_config_cache[cache_key]
-            else:
-                missing_slugs.append(slug_id)
-    else:
-        for slug_id in slug_ids:
-            if slug_id in request.state.experiment_config_cache:
-                cached_results[slug_id] = request.state.experiment_config_cache[slug_id]
-            else:
-                missing_slugs.append(slug_id)
+    for slug_id in dict.fromkeys(slug_ids):
+        if slug_id in request_cache:
+            cached_results[slug_id] = _project_config(request_cache[slug_id], projection)
+            continue
+        hit, config, _ = _config_cache_lookup(slug_id)
+        if hit:
+            request_cache[slug_id] = config
+            cached_results[slug_id] = _project_config(config, projection)
+        else:
+            missing_slugs.append(slug_id)
     
     # If all configs are cached, return them
     if not missing_slugs:
         logger.debug(
-            f"get_experiment_configs_batch: All {len(slug_ids)} configs found in request-scoped cache"
+            f"get_experiment_configs_batch: All {len(slug_ids)} configs found in cache"
         )
         return cached_results
     
@@ -1142,46 +1253,24 @@ async def get_experiment_configs_batch(
         )
     
     try:
-        # Use $in operator to fetch multiple configs in one query
+        generation = experiment_config_watcher.generation
+        # Use $in operator to fetch multiple full configs in one query
         query = {"slug": {"$in": missing_slugs}}
-        cursor = db.experiments_config.find(query, projection)
+        cursor = db.experiments_config.find(query)
         fetched_configs = await cursor.to_list(length=len(missing_slugs))
         
         # Create mapping of slug to config
         fetched_map = {cfg.get("slug"): cfg for cfg in fetched_configs if cfg.get("slug")}
+        store_in_app_cache = generation == experiment_config_watcher.generation
         
         # Cache results and build final result dictionary
-        results = {}
-        async with _experiment_config_cache_lock:
-            for slug_id in slug_ids:
-                if slug_id in cached_results:
-                    results[slug_id] = cached_results[slug_id]
-                    continue
-                
-                config = fetched_map.get(slug_id)
-                
-                # Cache in request-scoped cache
-                if projection:
-                    sorted_projection = ",".join(f"{k}:{v}" for k, v in sorted(projection.items()))
-                    cache_key = f"{slug_id}:{sorted_projection}"
-                else:
-                    cache_key = slug_id
-                
-                request.state.experiment_config_cache[cache_key] = config
-                
-                # Update application-level cache
-                if cache_key in _experiment_config_app_cache:
-                    del _experiment_config_app_cache[cache_key]
-                
-                _experiment_config_app_cache[cache_key] = (config, datetime.now())
-                _experiment_config_app_cache.move_to_end(cache_key)
-                
-                # Evict oldest entries if cache exceeds max size
-                while len(_experiment_config_app_cache) > CACHE_MAX_SIZE:
-                    oldest_key = next(iter(_experiment_config_app_cache))
-                    del _experiment_config_app_cache[oldest_key]
-                
-                results[slug_id] = config
+        results = dict(cached_results)
+        for slug_id in missing_slugs:
+            config = fetched_map.get(slug_id)
+            request_cache[slug_id] = config
+            if store_in_app_cache:
+                _config_cache_store(slug_id, config)
+            results[slug_id] = _project_config(config, projection)
         
         logger.debug(
             f"get_experiment_configs_batch: Loaded {len(fetched_map)} configs from DB "
@@ -1242,19 +1331,7 @@ async def _invalidate_experiment_config_cache_async(slug_id: str):
     Args:
         slug_id: The experiment slug to invalidate cache for
     """
-    async with _experiment_config_cache_lock:
-        # Remove all cache entries for this slug_id (including projections)
-        keys_to_remove = [
-            key for key in _experiment_config_app_cache.keys()
-            if key.startswith(f"{slug_id}:") or key == slug_id
-        ]
-        for key in keys_to_remove:
-            _experiment_config_app_cache.pop(key, None)
-        if keys_to_remove:
-            logger.debug(
-                f"Invalidated {len(keys_to_remove)} cache entry(ies) for '{slug_id}' "
-                f"(remaining cache_size={len(_experiment_config_app_cache)})"
-            )
+    _invalidate_experiment_config_slug(slug_id)
 
 
 async def get_cache_metrics() -> Dict[str, Any]:
@@ -1265,36 +1342,36 @@ async def get_cache_metrics() -> Dict[str, Any]:
         Dictionary with cache metrics including:
         - cache_size: Current number of entries
         - max_size: Maximum cache size
-        - ttl_seconds: Cache TTL in seconds
+        - ttl_seconds: Effective cache TTL in seconds
         - oldest_entry_age: Age of oldest entry in seconds (if any)
+        - watcher: Invalidation watcher mode and counters
     """
-    async with _experiment_config_cache_lock:
-        cache_size = len(_experiment_config_app_cache)
-        
-        metrics = {
-            "cache_size": cache_size,
-            "max_size": CACHE_MAX_SIZE,
-            "ttl_seconds": CACHE_TTL_SECONDS,
-            "usage_percent": (cache_size / CACHE_MAX_SIZE * 100) if CACHE_MAX_SIZE > 0 else 0,
-        }
-        
-        # Get oldest entry age if cache has entries
-        if _experiment_config_app_cache:
-            oldest_key = next(iter(_experiment_config_app_cache))
-            _, oldest_timestamp = _experiment_config_app_cache[oldest_key]
-            oldest_age = (datetime.now() - oldest_timestamp).total_seconds()
-            metrics["oldest_entry_age_seconds"] = round(oldest_age, 2)
-        else:
-            metrics["oldest_entry_age_seconds"] = None
-        
-        # Warn if cache usage is high
-        if metrics["usage_percent"] > 80:
-            logger.warning(
-                f"Experiment config cache usage is HIGH: {metrics['usage_percent']:.1f}% "
-                f"({cache_size}/{CACHE_MAX_SIZE}). Consider increasing CACHE_MAX_SIZE."
-            )
-        
-        return metrics
+    cache_size = len(_experiment_config_app_cache)
+    
+    metrics = {
+        "cache_size": cache_size,
+        "max_size": CACHE_MAX_SIZE,
+        "ttl_seconds": _config_cache_ttl(),
+        "usage_percent": (cache_size / CACHE_MAX_SIZE * 100) if CACHE_MAX_SIZE > 0 else 0,
+        "watcher": experiment_config_watcher.stats(),
+    }
+    
+    # Get oldest entry age if cache has entries
+    if _experiment_config_app_cache:
+        oldest_key = next(iter(_experiment_config_app_cache))
+        _, oldest_timestamp = _experiment_config_app_cache[oldest_key]
+        metrics["oldest_entry_age_seconds"] = round(time.monotonic() - oldest_timestamp, 2)
+    else:
+        metrics["oldest_entry_age_seconds"] = None
+    
+    # Warn if cache usage is high
+    if metrics["usage_percent"] > 80:
+        logger.warning(
+            f"Experiment config cache usage is HIGH: {metrics['usage_percent']:.1f}% "
+            f"({cache_size}/{CACHE_MAX_SIZE}). Consider increasing CACHE_MAX_SIZE."
+        )
+    
+    return metrics
 
 
 def invalidate_experiment_config_cache(slug_id: str):
@@ -1302,34 +1379,181 @@ def invalidate_experiment_config_cache(slug_id: str):
     Invalidate application-level cache for an experiment config.
     
     This should be called when an experiment config is updated to ensure
-    subsequent requests get the fresh config.
-    Uses the background task manager to prevent task accumulation.
+    subsequent requests in this process get the fresh config immediately.
+    Other processes are invalidated by their ExperimentConfigWatcher.
     
     Args:
         slug_id: The experiment slug to invalidate cache for
     """
-    # Lazy import to avoid circular dependency issues
-    try:
-        from main import _task_manager
-        # Use background task manager (fire and forget)
-        # The task manager's create_task() is async, so wrap it in a task
-        async def _wrapper():
-            await _task_manager.create_task(
-                _invalidate_experiment_config_cache_async(slug_id),
-                task_name=f"invalidate_cache_{slug_id}"
-            )
-        asyncio.create_task(_wrapper())
-    except (ImportError, AttributeError):
-        # Fallback to raw task creation if task manager not available
+    experiment_config_watcher.generation += 1
+    _invalidate_experiment_config_slug(slug_id)
+
+
+class ExperimentConfigWatcher:
+    """
+    Pushes experiment_config invalidations into this process.
+    
+    Prefers a MongoDB change stream on `experiments_config` (replica sets / Atlas).
+    When change streams are unavailable (standalone mongod, local stand-ins) it falls
+    back to polling per-slug change markers (_id + config_version) every
+    CACHE_POLL_INTERVAL_SECONDS; polling therefore only sees writes that bump config_version.
+    While either mode is running the cache uses CACHE_PUSH_TTL_SECONDS.
+    """
+    
+    def __init__(self, poll_interval: float = CACHE_POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None  # "change_stream" | "polling" | None
+        # Bumped on every invalidation so in-flight reads don't cache stale results
+        self.generation = 0
+        self.events = 0
+        self.invalidations = 0
+        self.restarts = 0
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+    
+    @property
+    def is_pushing(self) -> bool:
+        return self.mode is not None and self._task is not None and not self._task.done()
+    
+    def start(self, db) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(db))
+    
+    async def wait_ready(self, timeout: float = 5.0) -> bool:
+        """Waits until the first stream open / poll baseline, so later cache warm-ups aren't cleared by it."""
+        if self._ready is None:
+            return False
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(_invalidate_experiment_config_cache_async(slug_id))
-            else:
-                loop.run_until_complete(_invalidate_experiment_config_cache_async(slug_id))
-        except RuntimeError:
-            # No event loop available, cache will expire naturally
-            logger.debug(f"Could not invalidate cache for '{slug_id}' (no event loop or task manager)")
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self.mode = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode if self.is_pushing else None,
+            "generation": self.generation,
+            "events": self.events,
+            "invalidations": self.invalidations,
+            "restarts": self.restarts,
+            "poll_interval_seconds": self.poll_interval,
+        }
+    
+    def _invalidate(self, slug_id: Optional[str]) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        # A config change (reload, delete, replica count) may have replaced the actors too
+        if slug_id is None:
+            _clear_experiment_config_cache()
+            actor_registry.clear()
+        else:
+            _invalidate_experiment_config_slug(slug_id)
+            actor_registry.invalidate(slug_id)
+    
+    async def _run(self, db) -> None:
+        try:
+            await self._watch_change_stream(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(
+                f"ExperimentConfigWatcher: change streams unavailable ({e}); "
+                f"falling back to polling every {self.poll_interval}s."
+            )
+        await self._poll(db)
+    
+    async def _watch_change_stream(self, db) -> None:
+        resume_token = None
+        opened_once = False
+        while True:
+            try:
+                async with db.experiments_config.watch(
+                    full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    # Anything cached before the stream opened may have missed events
+                    self._invalidate(None)
+                    if not opened_once:
+                        logger.info("ExperimentConfigWatcher: listening to experiments_config change stream.")
+                    opened_once = True
+                    self.mode = "change_stream"
+                    self._ready.set()
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._handle_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not opened_once:
+                    raise
+                self.mode = None
+                self.restarts += 1
+                logger.warning(f"ExperimentConfigWatcher: change stream interrupted ({e}); reopening.")
+                await asyncio.sleep(1)
+    
+    def _handle_change(self, change: Mapping[str, Any]) -> None:
+        self.events += 1
+        op = change.get("operationType")
+        if op in ("invalidate", "drop", "rename", "dropDatabase"):
+            self._invalidate(None)
+            return
+        full_document = change.get("fullDocument") or {}
+        doc_id = (change.get("documentKey") or {}).get("_id")
+        # Drop both the slug the _id was cached under and its current slug (slugs can change)
+        slugs = {_experiment_config_id_slugs.pop(doc_id, None), full_document.get("slug")} - {None}
+        if not slugs:
+            self._invalidate(None)
+            return
+        for slug_id in slugs:
+            self._invalidate(slug_id)
+    
+    async def _poll(self, db) -> None:
+        # Only the change marker is read: writers `$inc` config_version, and a
+        # re-created document gets a new _id, so (_id, config_version) moves on any edit.
+        fingerprints: Optional[Dict[str, Tuple[str, Any]]] = None
+        self.mode = "polling"
+        while True:
+            try:
+                docs = await db.experiments_config.find(
+                    {}, {"slug": 1, "config_version": 1}
+                ).to_list(length=None)
+                current = {
+                    doc.get("slug"): (str(doc.get("_id")), doc.get("config_version"))
+                    for doc in docs if doc.get("slug")
+                }
+                if fingerprints is None:
+                    # Baseline: anything cached before the first poll is suspect
+                    self._invalidate(None)
+                else:
+                    for slug_id in set(fingerprints) | set(current):
+                        if fingerprints.get(slug_id) != current.get(slug_id):
+                            self.events += 1
+                            self._invalidate(slug_id)
+                fingerprints = current
+                self.mode = "polling"
+                self._ready.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Without a fresh baseline we can't trust pushed invalidation; use the short TTL
+                self.mode = None
+                fingerprints = None
+                logger.warning(f"ExperimentConfigWatcher: poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+experiment_config_watcher = ExperimentConfigWatcher()
 
 
 # --- Experiment-Scoped DB Dependency ---
@@ -1390,4 +1614,94 @@ async def get_scoped_db(request: Request) -> ScopedMongoWrapper:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected server error occurred while initializing database access.",
-        )
\ No newline at end of file
+        )
+
+# --- Experiment Actor Dependency ---
+
+
+def _experiment_slug(connection: HTTPConnection) -> Optional[str]:
+    # WebSocket scopes bypass the HTTP middleware, so fall back to the path
+    return getattr(connection.state, "slug_id", None) or resolve_experiment_scope(connection.scope)[0]
+
+
+def experiment_actor_pool(app: Any, slug_id: str) -> Optional[ActorPool]:
+    """
+    The registry pool of `slug_id`. A re-resolved pool needs the manifest's sticky
+    key and replica count, which only app.state knows.
+    """
+    experiment = (getattr(app.state, "experiments", None) or {}).get(slug_id) or {}
+    pool_cfg = experiment.get("actor_pool") or {}
+    return actor_registry.pool(
+        slug_id, sticky_key=pool_cfg.get("sticky_key"), replicas=pool_cfg.get("replicas", 1)
+    )
+
+
+def _resolve_actor_pool(connection: HTTPConnection) -> Tuple[str, ActorPool]:
+    if not getattr(connection.app.state, "ray_is_available", False):
+        logger.error("resolve_actor_handle: Ray is globally unavailable, blocking actor handle request.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ray service is unavailable. Check Ray cluster status.",
+        )
+
+    slug_id = _experiment_slug(connection)
+    if not slug_id:
+        logger.error(f"resolve_actor_handle: slug_id not found for URL '{connection.url.path}'.")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Server error: slug_id not found in request state.",
+        )
+
+    try:
+        pool = experiment_actor_pool(connection.app, slug_id)
+    except Exception as e:
+        logger.error(f"resolve_actor_handle: Failed to get actor handle for '{slug_id}': {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error connecting to experiment service.",
+        )
+    if pool is None:
+        actor_name = actor_name_for(slug_id)
+        logger.error(f"resolve_actor_handle: CRITICAL: Actor '{actor_name}' not found or crashed.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Experiment service '{actor_name}' is not running or crashed.",
+        )
+    return slug_id, pool
+
+
+def _sticky_value(connection: HTTPConnection, pool: ActorPool) -> Optional[str]:
+    if not pool.sticky_key or len(pool) == 1:
+        return None
+    return connection.path_params.get(pool.sticky_key) or connection.query_params.get(pool.sticky_key)
+
+
+def resolve_actor_handle(connection: HTTPConnection, sticky_value: Optional[str] = None) -> Any:
+    """
+    Returns the cached Ray actor handle for the experiment serving `connection`
+    (HTTP request or WebSocket). With a replica pool this is the sticky replica for
+    `sticky_value` (default: the request's sticky key), else the least loaded one.
+    Each call made through the handle counts as outstanding on its replica until it
+    finishes, and a dead actor evicts the cached handles. Raises HTTPException when
+    the actor can't be reached.
+    """
+    _, pool = _resolve_actor_pool(connection)
+    if sticky_value is None:
+        sticky_value = _sticky_value(connection, pool)
+    return pool.handle(pool.pick(sticky_value), track=True)
+
+
+async def get_actor_handle(connection: HTTPConnection):
+    """
+    FastAPI Dependency: the experiment's Ray actor handle from the process-wide
+    actor registry (a dict lookup per request). With a replica pool the request is
+    dispatched to the least-outstanding replica (or its sticky replica) and counted
+    as outstanding until the endpoint returns. If any call finds the actor dead, the
+    cached handles are dropped so the next request re-resolves them.
+    """
+    _, pool = _resolve_actor_pool(connection)
+    replica, _ = pool.acquire(_sticky_value(connection, pool))
+    try:
+        yield pool.handle(replica)
+    finally:
+        pool.release(replica)
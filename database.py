@@ -420,7 +420,7 @@ async def seed_db_from_local_files(db: AsyncIOMotorDatabase):
                                 if manifest_status == "active" and db_status == "draft":
                                     await db.experiments_config.update_one(
                                         {"slug": slug},
-                                        {"$set": {"status": "active"}}
+                                        {"$set": {"status": "active"}, "$inc": {"config_version": 1}}
                                     )
                                     logger.info(f"[{slug}] 🔄 Updated status from 'draft' to 'active' to match manifest.")
                                     seeded_count += 1
@@ -0,0 +1,168 @@
+"""
+Per-experiment admission control from the manifest's `quotas` block.
+
+Each experiment router gets one extra router-level dependency that, for every HTTP
+request to /experiments/<slug>/...:
+
+1. Charges the request against the experiment's rate limits (`rate_limit` for every
+   route, `routes` for specific route paths), keyed per client IP. The hit goes
+   through the platform limiter's storage (rate_limit.py), so it is decided locally
+   in memory and shared across workers by the batched MongoDB flush.
+2. Takes one of `max_inflight` slots for the duration of the endpoint. Experiment
+   endpoints are thin proxies to their Ray actor, so this caps the actor calls and
+   Mongo pool connections one experiment can hold at once. Over capacity is
+   rejected immediately with 503 instead of queueing behind a busy actor.
+
+Manifest example:
+
+    "quotas": {
+        "rate_limit": "120 per minute",
+        "routes": {"/api/move": "30 per minute", "/export": "5 per minute"},
+        "max_inflight": 16
+    }
+
+Route keys are the route paths as declared on the experiment's APIRouter (without
+the /experiments/<slug> prefix), including path parameters such as "/game/{game_id}".
+WebSocket connections are long-lived and are not counted.
+"""
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from limits import RateLimitItem, parse_many
+from starlette.requests import HTTPConnection
+
+from rate_limit import limiter, get_rate_limit_key
+
+logger = logging.getLogger(__name__)
+
+
+class ExperimentGate:
+    """Admission state for one registered experiment (replaced on every registration)."""
+    
+    def __init__(self, slug: str, quotas: Dict[str, Any]):
+        self.slug = slug
+        self.prefix = f"/experiments/{slug}"
+        self.default_limits: List[RateLimitItem] = parse_many(quotas["rate_limit"]) if quotas.get("rate_limit") else []
+        self.route_limits: Dict[str, List[RateLimitItem]] = {
+            path: parse_many(spec) for path, spec in (quotas.get("routes") or {}).items()
+        }
+        self.max_inflight: Optional[int] = quotas.get("max_inflight")
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.over_capacity = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.default_limits or self.route_limits or self.max_inflight)
+    
+    def _route_path(self, connection: HTTPConnection) -> str:
+        route = connection.scope.get("route")
+        path = getattr(route, "path", None) or connection.url.path
+        return path[len(self.prefix):] if path.startswith(self.prefix) else path
+    
+    def check_rate(self, connection: HTTPConnection) -> None:
+        """Charges one hit against every applicable limit; raises 429 if any is exhausted."""
+        route_path = self._route_path(connection)
+        client = get_rate_limit_key(connection)
+        checks: List[Tuple[RateLimitItem, Tuple[str, ...]]] = [
+            (item, ("experiment", self.slug, "*", client)) for item in self.default_limits
+        ]
+        checks.extend(
+            (item, ("experiment", self.slug, route_path, client)) for item in self.route_limits.get(route_path, ())
+        )
+        strategy = limiter.limiter
+        for item, identifiers in checks:
+            if not strategy.hit(item, *identifiers):
+                self.rate_limited += 1
+                reset_at = strategy.get_window_stats(item, *identifiers).reset_time
+                retry_after = max(1, int(reset_at - time.time()))
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Rate limit exceeded for experiment '{self.slug}': {item}",
+                    headers={"Retry-After": str(retry_after)},
+                )
+    
+    def try_acquire(self) -> bool:
+        if self.max_inflight is not None and self.inflight >= self.max_inflight:
+            self.over_capacity += 1
+            return False
+        self.inflight += 1
+        self.admitted += 1
+        if self.inflight > self.peak_inflight:
+            self.peak_inflight = self.inflight
+        return True
+    
+    def release(self) -> None:
+        self.inflight -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_limit": [str(item) for item in self.default_limits],
+            "routes": {path: [str(item) for item in items] for path, items in self.route_limits.items()},
+            "max_inflight": self.max_inflight,
+            "inflight": self.inflight,
+            "peak_inflight": self.peak_inflight,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "over_capacity": self.over_capacity,
+        }
+
+
+class ExperimentAdmissionController:
+    """
+    Registry of per-experiment gates.
+    
+    Everything runs on the event loop without awaits between check and update, so
+    the counters need no locks. Re-registering an experiment installs a new gate;
+    requests admitted by the old gate release against it.
+    """
+    
+    def __init__(self):
+        self._gates: Dict[str, ExperimentGate] = {}
+    
+    def dependencies(self, slug: str, cfg: Dict[str, Any]) -> List[Any]:
+        """Router-level dependencies enforcing cfg['quotas'] for an experiment (empty when none)."""
+        self._gates.pop(slug, None)
+        quotas = cfg.get("quotas")
+        if not quotas:
+            return []
+        gate = ExperimentGate(slug, quotas)
+        if not gate.enabled:
+            return []
+        self._gates[slug] = gate
+        logger.info(
+            f"[{slug}] Quotas: rate_limit={[str(i) for i in gate.default_limits]}, "
+            f"routes={list(gate.route_limits)}, max_inflight={gate.max_inflight}"
+        )
+        
+        async def experiment_admission(connection: HTTPConnection):
+            if connection.scope["type"] != "http":
+                yield
+                return
+            gate.check_rate(connection)
+            if not gate.try_acquire():
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Experiment '{slug}' is at capacity. Please retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            try:
+                yield
+            finally:
+                gate.release()
+        
+        return [Depends(experiment_admission)]
+    
+    def clear(self) -> None:
+        """Forgets all gates (full experiment reload); in-flight requests still release their own gate."""
+        self._gates.clear()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {slug: gate.stats() for slug, gate in self._gates.items()}
+
+
+experiment_admission = ExperimentAdmissionController()
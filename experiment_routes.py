@@ -83,6 +83,8 @@ from core_deps import (
     get_current_user,
     get_current_user_or_redirect,
     get_authz_provider,
+    experiment_config_watcher,
+    warm_experiment_config_cache,
 )
 from authz_provider import AuthorizationProvider
 from background_tasks import safe_background_task as _safe_background_task
@@ -91,6 +93,8 @@ from index_management import (
     run_index_creation_for_collection as _run_index_creation_for_collection,
 )
 from manifest_schema import validate_manifest, validate_managed_indexes
+from experiment_quotas import experiment_admission
+from actor_registry import actor_registry, actor_name_for, retire_actor_replicas
 
 logger = logging.getLogger(__name__)
 
@@ -101,8 +105,11 @@ async def reload_active_experiments(app: FastAPI):
     logger.info(" Reloading active experiments from DB...")
     try:
         # Limit to 500 active experiments to prevent accidental large result sets
+        config_generation = experiment_config_watcher.generation
         active_cfgs = await db.experiments_config.find({"status": "active"}).limit(500).to_list(None)
         logger.info(f"Found {len(active_cfgs)} active experiment(s).")
+        # Bulk warm-up: these are full documents, so get_experiment_config can serve any projection
+        warm_experiment_config_cache(active_cfgs, generation=config_generation)
         if len(active_cfgs) == 0:
             logger.warning(" ⚠️  No active experiments found! Check experiment status in database.")
             # Try to list all experiments to help debug (limit to 500)
@@ -127,6 +134,8 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
     if is_reload:
         logger.debug("Clearing old experiment state...")
         app.state.experiments.clear()
+        experiment_admission.clear()
+        actor_registry.clear()
         # Also clear mounted static paths cache on reload
         if hasattr(app.state, "mounted_static_paths"):
             app.state.mounted_static_paths.clear()
@@ -734,6 +743,9 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
             # No auth required
             deps = [Depends(get_current_user)]
 
+        # Per-experiment quotas from manifest.json run before auth so rejected traffic stays cheap
+        deps = experiment_admission.dependencies(slug, cfg) + deps
+        
         prefix = f"/experiments/{slug}"
         try:
             app.include_router(proxy_router, prefix=prefix, tags=[f"Experiment: {slug}"], dependencies=deps)
@@ -769,16 +781,25 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
             continue
 
         actor_name = f"{slug}-actor"
+        # Optional replica pool (manifest "actor_pool"); replica 0 keeps the classic name
+        pool_cfg = cfg.get("actor_pool") or {}
+        replicas = pool_cfg.get("replicas", 1)
         try:
             import ray
-            actor_handle = actor_cls.options(
-                name=actor_name, namespace="modular_labs", lifetime="detached",
-                get_if_exists=True, max_restarts=-1, runtime_env=actor_runtime_env
-            ).remote(
-                mongo_uri=MONGO_URI, db_name=DB_NAME,
-                write_scope=slug, read_scopes=read_scopes
-            )
-            logger.info(f"[{slug}] Ray Actor '{actor_name}' started in {env_mode.upper()} mode.")
+            actor_handles = [
+                actor_cls.options(
+                    name=actor_name_for(slug, replica), namespace="modular_labs", lifetime="detached",
+                    get_if_exists=True, max_restarts=-1, runtime_env=actor_runtime_env
+                ).remote(
+                    mongo_uri=MONGO_URI, db_name=DB_NAME,
+                    write_scope=slug, read_scopes=read_scopes
+                )
+                for replica in range(replicas)
+            ]
+            actor_handle = actor_handles[0]
+            retire_actor_replicas(slug, keep=replicas)
+            logger.info(f"[{slug}] Ray Actor '{actor_name}' started in {env_mode.upper()} mode ({replicas} replica(s)).")
+            actor_registry.register(slug, actor_handles, sticky_key=pool_cfg.get("sticky_key"))
             
             # Call initialize hook if it exists (for post-startup tasks like data seeding)
             if hasattr(actor_cls, "initialize"):
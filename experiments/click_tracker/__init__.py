@@ -12,6 +12,7 @@ from starlette import status # Import status for 503
 # Core dependencies
 # Note: We don't need database dependency here since routes only delegate to actors
 # If routes need direct database access, use ExperimentDB via get_experiment_db from core_deps
+from core_deps import get_actor_handle
       
 # Our Ray Actor definition for this experiment  
 from .actor import ExperimentActor
@@ -25,51 +26,6 @@ templates = Jinja2Templates(directory=str(EXPERIMENT_DIR / "templates"))
 # Our main router for this experiment  
 bp = APIRouter()  
   
-async def get_actor_handle(  
-    request: Request
-) -> "ray.actor.ActorHandle":  
-    """  
-    FastAPI dependency to return the handle to our Ray actor.
-    
-    This relies on main.py's `reload_active_experiments` 
-    to ensure the actor is running.
-    """  
-    
-    # 1. Check global Ray availability state set during main.py lifespan
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("[ClickTracker] Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-
-    # 2. Get the slug from request state (set by main.py routing)
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("[ClickTracker] Server error: slug_id not found in request state.")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Server error: slug_id not found in request state."
-        )
-
-    # 3. Construct actor name from slug (matches naming convention in main.py)
-    actor_name = f"{slug_id}-actor"
-    try:  
-        # Attempt to get existing actor (which should be running due to main.py lifecycle)
-        # 'modular_labs' is the namespace set in main.py
-        handle = ray.get_actor(actor_name, namespace="modular_labs")  
-        return handle  
-    except ValueError:
-        # If the actor is not found, it means the main application failed to start it
-        # or the actor crashed. We should treat this as a service outage.
-        logger.error(f"[ClickTracker] CRITICAL: Actor '{actor_name}' not found or crashed.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail=f"Experiment service '{actor_name}' is not running or crashed."
-        )
-    except Exception as e:
-        logger.error(f"[ClickTracker] Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
   
 @bp.get("/", response_class=HTMLResponse, name="click_tracker_index")  
 async def index(request: Request, actor: Any = Depends(get_actor_handle)):  
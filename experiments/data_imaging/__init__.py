@@ -1,11 +1,13 @@
 # (This is the NEW "Thin Client" - NOW FIXED)
 
 import logging
+import os
 import ray
 from fastapi import APIRouter, Request, HTTPException, Depends, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
 from starlette import status
 from typing import Any 
+from core_deps import require_admin, get_actor_handle
 
 # Core dependencies
 # Note: We don't need database dependency here since routes only delegate to actors
@@ -17,41 +19,13 @@ from .actor import ExperimentActor
 logger = logging.getLogger(__name__)
 bp = APIRouter()
 
+# Images are content-addressed (ETag = content hash), so revalidation is a cheap 304.
+IMAGE_CACHE_CONTROL = os.getenv("DATA_IMAGING_IMAGE_CACHE_CONTROL", "private, no-cache")
+
 # --- Actor Handle Dependency ---
-# Routes only delegate to actors, so no database dependency needed here.
+# Routes only delegate to actors via core_deps.get_actor_handle (cached handle, no GCS lookup per request).
 # If routes need direct database access, use ExperimentDB via get_experiment_db from core_deps.
 
-async def get_actor_handle(
-    request: Request
-) -> "ray.actor.ActorHandle":
-    """
-    FastAPI Dependency to get the handle for the experiment's
-    dedicated Ray actor.
-    """
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-        
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("Server error: slug_id not found in request state.")
-        raise HTTPException(500, "Server error: slug_id not found in request state.")
-    
-    actor_name = f"{slug_id}-actor"
-    
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' found no process running.")
-        raise HTTPException(503, f"Experiment service '{actor_name}' is not running.")
-    except Exception as e:
-        logger.error(f"Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
-
 
 # --- Thin Client Routes (Pure Forwarders) ---
 
@@ -140,6 +114,71 @@ async def get_viz_data(
 # --- END NEW ---
 
 
+# ---
+# --- Binary image endpoints (PNG / SVG + ETag, referenced by the gallery and detail pages)
+# ---
+def _image_response(result: Any, what: str) -> Response:
+    if not result:
+        raise HTTPException(404, f"{what} not found")
+    headers = {"ETag": result["etag"], "Cache-Control": IMAGE_CACHE_CONTROL}
+    if result.get("body") is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=result["body"], media_type=result["content_type"], headers=headers)
+
+
+@bp.get("/workout/{workout_id}/image/{kind}.png")
+async def get_workout_image(
+    request: Request,
+    workout_id: int,
+    kind: str,
+    actor: "ray.actor.ActorHandle" = Depends(get_actor_handle),
+    r_key: str = Query("heart_rate"),
+    g_key: str = Query("calories_per_min"),
+    b_key: str = Query("speed_kph"),
+    alpha_mode: str = Query("none"),
+    alpha_key: str = Query("cadence")
+):
+    """
+    Returns one workout image (thumb, combined, r, g, b, a) as image/png.
+    Conditional requests whose If-None-Match matches get a 304 without re-encoding.
+    """
+    try:
+        result = await actor.get_workout_image_png.remote(
+            workout_id,
+            kind,
+            r_key=r_key,
+            g_key=g_key,
+            b_key=b_key,
+            alpha_mode=alpha_mode,
+            alpha_key=alpha_key,
+            if_none_match=request.headers.get("if-none-match")
+        )
+    except Exception as e:
+        logger.error(f"Actor call failed for get_workout_image_png: {e}", exc_info=True)
+        raise HTTPException(500, f"Actor image render failed: {e}")
+    return _image_response(result, f"Image '{kind}' for workout {workout_id}")
+
+
+@bp.get("/workout/{workout_id}/chart/{metric}.svg")
+async def get_workout_chart(
+    request: Request,
+    workout_id: int,
+    metric: str,
+    actor: "ray.actor.ActorHandle" = Depends(get_actor_handle)
+):
+    """Returns the line chart for one metric as image/svg+xml (ETag / 304 aware)."""
+    try:
+        result = await actor.get_workout_chart_svg.remote(
+            workout_id,
+            metric,
+            if_none_match=request.headers.get("if-none-match")
+        )
+    except Exception as e:
+        logger.error(f"Actor call failed for get_workout_chart_svg: {e}", exc_info=True)
+        raise HTTPException(500, f"Actor chart render failed: {e}")
+    return _image_response(result, f"Chart '{metric}' for workout {workout_id}")
+
+
 # ---
 # --- NEW: API endpoint to find similar workouts using custom RGB channels
 # ---
@@ -469,4 +508,18 @@ async def clear_all(
         )
     except Exception as e:
         logger.error(f"Actor call failed for clear_all: {e}", exc_info=True)
-        raise HTTPException(500, f"Actor failed to clear docs: {e}")
\ No newline at end of file
+        raise HTTPException(500, f"Actor failed to clear docs: {e}")
+
+@bp.get("/api/v1/debug/status", response_class=JSONResponse)
+async def debug_status(
+    request: Request,
+    actor: "ray.actor.ActorHandle" = Depends(get_actor_handle),
+    admin: dict = Depends(require_admin)
+):
+    """Debug endpoint: actor series-cache footprint and hit rate (admin only)."""
+    try:
+        status_doc = await actor.get_debug_status.remote()
+        return JSONResponse(status_doc)
+    except Exception as e:
+        logger.error(f"Actor call failed for get_debug_status: {e}", exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
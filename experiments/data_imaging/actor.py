@@ -6,13 +6,18 @@ import pathlib
 import asyncio
 from typing import List, Dict, Any
 import os
-import io
-import base64
+import time
+import hashlib
+import math
+from collections import OrderedDict
+from urllib.parse import urlencode
 from datetime import datetime, timezone
 import ray
 
+from .engine_pool import ProcessPoolEngine, encode_png, resolve_worker_count
+
 # --- NOTE: ALL HEAVY IMPORTS ARE GONE FROM THE TOP LEVEL ---
-# (numpy, matplotlib, httpx, PIL)
+# (numpy, httpx, PIL)
 
 # Actor-local paths
 experiment_dir = pathlib.Path(__file__).parent
@@ -38,6 +43,324 @@ NORM_BOUNDS = {
     "power": (0, 400),
     "cadence": (0, 120),
 }
+# (r, g, b) combinations stored as indexed vector fields on every workout
+INDEXED_CHANNEL_COMBOS = {
+    ("heart_rate", "calories_per_min", "speed_kph"),
+    ("power", "cadence", "heart_rate"),
+    ("power", "speed_kph", "heart_rate"),
+    ("speed_kph", "cadence", "heart_rate"),
+}
+
+# Full reload interval for the in-actor series cache (safety net for writes that
+# bypass this actor; generate_one / clear_all / run_analysis update it in place).
+SERIES_CACHE_TTL_SECONDS = float(os.getenv("DATA_IMAGING_SERIES_CACHE_TTL", "900"))
+SERIES_CACHE_PROJECTION = {
+    "_id": 1, "time_series": 1, "data_quality": 1, "rpe": 1,
+    "workout_type": 1, "session_tag": 1, "ai_classification": 1,
+}
+
+
+class _WorkoutSeriesCache:
+    """
+    Memory-resident copy of every workout's raw per-metric time series, so
+    custom-channel and vector-magic searches never go back to MongoDB.
+
+    - series:       float32 (N, 64, len(AVAILABLE_METRICS))
+    - data_quality: uint8   (N, 64)
+    - rpe:          float32 (N,)
+    - rankable:     bool    (N,), False for ids without the numeric workout suffix
+    - meta:         the small fields returned in search results
+
+    Rows are appended in place (capacity doubles), so generate_one is O(1).
+    """
+
+    META_FIELDS = ("workout_type", "session_tag", "ai_classification")
+
+    def __init__(self, np, ttl_seconds: float = SERIES_CACHE_TTL_SECONDS):
+        self.np = np
+        self.ttl_seconds = ttl_seconds
+        self.metric_index = {key: i for i, key in enumerate(AVAILABLE_METRICS)}
+        self.loaded_at = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.upserts = 0
+        self._allocate(0)
+
+    def _allocate(self, capacity: int):
+        np = self.np
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.meta: list[dict] = []
+        self.workout_ids: list = []
+        self.series = np.zeros((capacity, 64, len(AVAILABLE_METRICS)), dtype=np.float32)
+        self.data_quality = np.full((capacity, 64), 255, dtype=np.uint8)
+        self.rpe = np.full(capacity, 5.0, dtype=np.float32)
+        self.rankable = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed: int):
+        capacity = len(self.series)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        np = self.np
+        for name, fill in (("series", 0), ("data_quality", 255), ("rpe", 5.0), ("rankable", False)):
+            old = getattr(self, name)
+            new = np.full((new_capacity, *old.shape[1:]), fill, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def is_fresh(self) -> bool:
+        if self.loaded_at is None:
+            return False
+        return self.ttl_seconds <= 0 or (time.monotonic() - self.loaded_at) < self.ttl_seconds
+
+    def _pack(self, row: int, doc: dict) -> bool:
+        """Writes one document into `row`. Returns False (row zeroed) if it can't be read."""
+        np = self.np
+        time_series = doc.get("time_series") or {}
+        try:
+            for key, c in self.metric_index.items():
+                values = time_series.get(key)
+                self.series[row, :, c] = values if values is not None else 0
+            self.data_quality[row] = np.asarray(doc.get("data_quality", [255] * 64), dtype=np.uint8)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Series cache skipping {doc.get('_id')}: {e}")
+            self.series[row] = 0
+            self.data_quality[row] = 255
+            return False
+        rpe = doc.get("rpe", 5.0)
+        self.rpe[row] = rpe if isinstance(rpe, (int, float)) else 5.0
+        return True
+
+    def load(self, docs: list[dict]):
+        """Replaces the cache contents with `docs` (one projected find of the collection)."""
+        self._allocate(len(docs))
+        for doc in docs:
+            self.upsert(doc, count=False)
+        self.loaded_at = time.monotonic()
+        self.loads += 1
+
+    def upsert(self, doc: dict, count: bool = True) -> bool:
+        doc_id = doc.get("_id")
+        if not isinstance(doc_id, str):
+            return False
+        row = self.rows.get(doc_id)
+        is_new = row is None
+        if is_new:
+            row = len(self.ids)
+            self._grow(row + 1)
+        if not self._pack(row, doc):
+            return False
+        meta = {field: doc.get(field) for field in self.META_FIELDS}
+        if is_new:
+            try:
+                workout_id = int(doc_id.split("_")[-1])
+            except ValueError:
+                # Still drawable (gallery, charts), but never a search result
+                workout_id = None
+            self.ids.append(doc_id)
+            self.rows[doc_id] = row
+            self.meta.append(meta)
+            self.workout_ids.append(workout_id)
+            self.rankable[row] = workout_id is not None
+        else:
+            self.meta[row] = meta
+        if count:
+            self.upserts += 1
+        return True
+
+    def update_meta(self, doc_id: str, fields: dict):
+        row = self.rows.get(doc_id)
+        if row is not None:
+            self.meta[row].update({k: v for k, v in fields.items() if k in self.META_FIELDS})
+
+    def clear(self):
+        """Empties the cache but keeps it authoritative (the collection is known to be empty)."""
+        self._allocate(0)
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Forces a full reload on next use."""
+        self.loaded_at = None
+
+    def row(self, doc_id: str):
+        return self.rows.get(doc_id)
+
+    def channel_tensor(self, keys: list, rows: list = None):
+        """(N, 64, C) float64 copy of the requested metrics (all rows, or `rows`); unknown/None keys are zeros."""
+        np = self.np
+        source = self.series[:len(self.ids)] if rows is None else self.series[np.asarray(rows, dtype=np.intp)]
+        out = np.zeros((len(source), 64, len(keys)), dtype=np.float64)
+        for c, key in enumerate(keys):
+            idx = self.metric_index.get(key)
+            if idx is not None:
+                out[:, :, c] = source[:, :, idx]
+        return out
+
+    def as_doc(self, row: int) -> dict:
+        """
+        A minimal workout document for the image renderers. The arrays are copies:
+        renders may run in a worker thread while upsert() rewrites the row in place.
+        """
+        doc_id = self.ids[row]
+        series = self.series[row].copy()
+        return {
+            "_id": doc_id,
+            "time_series": {key: series[:, c] for key, c in self.metric_index.items()},
+            "data_quality": self.data_quality[row].copy(),
+            "rpe": float(self.rpe[row]),
+            **self.meta[row],
+        }
+
+    def stats(self) -> dict:
+        nbytes = int(self.series.nbytes + self.data_quality.nbytes + self.rpe.nbytes)
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self.ids),
+            "capacity": len(self.series),
+            "array_bytes": nbytes,
+            "array_mb": round(nbytes / (1024 * 1024), 3),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "full_loads": self.loads,
+            "incremental_upserts": self.upserts,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Rendered images (PNG thumbnails/channels, SVG charts): in-memory LRU, optionally mirrored to disk
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("DATA_IMAGING_IMAGE_CACHE_SIZE", "2048"))
+IMAGE_CACHE_DIR = os.getenv("DATA_IMAGING_IMAGE_CACHE_DIR", "")
+GALLERY_LIMIT = 200
+GALLERY_CHANNELS = ("heart_rate", "calories_per_min", "speed_kph")
+# kind -> (output size, tint colour); served by /workout/{id}/image/{kind}.png
+IMAGE_KINDS = {
+    "thumb": ((128, 128), None),
+    "combined": ((256, 256), None),
+    "r": ((128, 128), (255, 0, 0)),
+    "g": ((128, 128), (0, 255, 0)),
+    "b": ((128, 128), (0, 0, 255)),
+    "a": ((128, 128), (255, 255, 255)),
+}
+CHART_COLORS = {
+    "heart_rate": "#FF6868",
+    "calories_per_min": "#00ED64",
+    "speed_kph": "#58AEFF",
+    "power": "#FFA554",
+    "cadence": "#C792EA",
+}
+# Optional process pool for batched PNG encoding: "0" (off), a worker count, or "auto" (Ray-assigned CPUs)
+PROCESS_POOL_WORKERS = os.getenv("DATA_IMAGING_PROCESS_POOL_WORKERS", "0")
+# Smaller batches aren't worth the IPC round trip and stay on a worker thread
+PROCESS_POOL_MIN_BATCH = int(os.getenv("DATA_IMAGING_PROCESS_POOL_MIN_BATCH", "32"))
+CHART_SIZE = (450, 250)
+# Bump when chart rendering changes so cached charts and browser ETags are invalidated
+CHART_STYLE_VERSION = "chart-svg-v1"
+
+
+def _nice_tick_step(span: float, target_ticks: int = 5) -> float:
+    """1/2/2.5/5 x 10^n tick spacing giving at most ~target_ticks ticks over `span`."""
+    raw = span / max(target_ticks, 1)
+    magnitude = 10 ** math.floor(math.log10(raw)) if raw > 0 else 1.0
+    for mult in (1, 2, 2.5, 5, 10):
+        step = mult * magnitude
+        if span / step <= target_ticks:
+            return step
+    return 10 * magnitude
+
+
+class _ImageCache:
+    """
+    Content-addressed image cache (PNG / SVG bytes). Keys are derived from the workout id, the
+    image kind / channel mapping and a digest of the raw series, so a changed
+    workout gets a new key (and ETag) and stale entries simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = IMAGE_CACHE_MAX_ENTRIES, disk_dir: str = IMAGE_CACHE_DIR):
+        self.max_entries = max(1, max_entries)
+        self.disk_dir = pathlib.Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            try:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Image disk cache disabled ({self.disk_dir}): {e}")
+                self.disk_dir = None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(doc_id: str, mapping: tuple, series_bytes: bytes, size: tuple) -> str:
+        h = hashlib.sha1()
+        h.update(f"{doc_id}|{','.join(str(m) for m in mapping)}|{size[0]}x{size[1]}|".encode())
+        h.update(series_bytes)
+        return h.hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str):
+        png = self._entries.get(key)
+        if png is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+        if self.disk_dir is not None:
+            try:
+                png = (self.disk_dir / f"{key}.img").read_bytes()
+            except OSError:
+                png = None
+            if png is not None:
+                self.disk_hits += 1
+                self._remember(key, png)
+                return png
+        self.misses += 1
+        return None
+
+    def put(self, key: str, png: bytes) -> bytes:
+        self._remember(key, png)
+        if self.disk_dir is not None:
+            try:
+                tmp = self.disk_dir / f"{key}.img.tmp"
+                tmp.write_bytes(png)
+                tmp.replace(self.disk_dir / f"{key}.img")
+            except OSError as e:
+                logger.debug(f"Image disk write failed for {key}: {e}")
+        return png
+
+    def _remember(self, key: str, png: bytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = png
+        self._bytes += len(png)
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+            "disk_dir": str(self.disk_dir) if self.disk_dir is not None else None,
+        }
 
 
 @ray.remote
@@ -65,16 +388,12 @@ class ExperimentActor:
         try:
             import httpx
             import numpy
-            import matplotlib
-            matplotlib.use("Agg")
-            import matplotlib.pyplot
             from PIL import Image
             from fastapi.templating import Jinja2Templates
             from pymongo.errors import OperationFailure
             
             self.httpx = httpx
             self.np = numpy
-            self.plt = matplotlib.pyplot
             self.Image = Image
             self.OperationFailure = OperationFailure
             
@@ -89,7 +408,6 @@ class ExperimentActor:
             logger.critical(f"[{write_scope}-Actor] ❌ CRITICAL: Failed to load dependencies: {e}", exc_info=True)
             self.httpx = None
             self.np = None
-            self.plt = None
             self.Image = None
             self.OperationFailure = None
             self.templates = None
@@ -133,8 +451,17 @@ class ExperimentActor:
             logger.critical(f"[{write_scope}-Actor] ❌ CRITICAL: Failed to init DB: {e}")
             self.db = None
 
+        # In-actor float32 series cache (loaded lazily on first search)
+        self._series_cache = _WorkoutSeriesCache(self.np) if self.np is not None else None
+        self._series_cache_lock = asyncio.Lock()
+        self._image_cache = _ImageCache()
+
+        # Optional process-pool engine (spawned lazily on the first large batch)
+        self._engine_pool = None
+        self._engine_pool_workers = resolve_worker_count(PROCESS_POOL_WORKERS)
+
     # ============================================================================
-    # Engine module code (Now as private methods, using self.np, self.plt etc.)
+    # Engine module code (Now as private methods, using self.np, self.Image etc.)
     # ============================================================================
 
     async def _call_openai_api(self, prompt: str) -> str:
@@ -527,81 +854,333 @@ class ExperimentActor:
         return arrays["rgb_combined"].reshape(-1)
 
 
-    def _encode_png_b64(
+    def _batch_series_tensor(self, docs: list[dict], keys: list):
+        """
+        Stacks the raw `time_series` of N documents into one (N, 64, C) float array,
+        one channel per key. A key of None (or a metric missing from a document)
+        yields zeros, matching `_generate_workout_viz_arrays`. Documents whose
+        series can't be read as 64 points are skipped.
+
+        Returns (tensor, kept_docs).
+        """
+        out = self.np.zeros((len(docs), 64, len(keys)), dtype=self.np.float64)
+        kept = []
+        for doc in docs:
+            row = len(kept)
+            time_series = doc.get("time_series") or {}
+            try:
+                for c, key in enumerate(keys):
+                    series = time_series.get(key) if key is not None else None
+                    if series is not None:
+                        out[row, :, c] = series
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Skipping {doc.get('_id')} in batch feature build: {e}")
+                out[row] = 0
+                continue
+            kept.append(doc)
+        return out[:len(kept)], kept
+
+    def _batch_feature_vectors(
+        self,
+        docs: list[dict],
+        r_key: str,
+        g_key: str,
+        b_key: str,
+        alpha_mode: str = "none",
+        alpha_key: str = "cadence"
+    ):
+        """
+        Vectorized `_get_feature_vector_custom` for many documents at once.
+        Normalizes every channel of the (N, 64, C) tensor in a single pass and
+        returns (matrix of shape (N, 64*C) as float32, kept_docs), with each row
+        laid out exactly like the per-document RGB/RGBA feature vector.
+        """
+        np = self.np
+        # Unknown RGB keys are all-zero channels (raw_data only holds AVAILABLE_METRICS);
+        # the fourth_metric alpha reads any key straight from the document.
+        channel_keys = [k if k in AVAILABLE_METRICS else None for k in (r_key, g_key, b_key)]
+        bound_keys = [r_key, g_key, b_key]
+        if alpha_mode == "fourth_metric":
+            channel_keys.append(alpha_key)
+            bound_keys.append(alpha_key)
+
+        series, kept = self._batch_series_tensor(docs, channel_keys)
+        if not kept:
+            return np.zeros((0, 64 * (4 if alpha_mode in ("fourth_metric", "data_quality", "global_rpe") else 3)), dtype=np.float32), kept
+
+        data_quality = rpe = None
+        if alpha_mode == "data_quality":
+            data_quality = np.full((len(kept), 64), 255, dtype=np.uint8)
+            valid = np.ones(len(kept), dtype=bool)
+            for i, doc in enumerate(kept):
+                try:
+                    data_quality[i] = np.asarray(doc.get("data_quality", [255] * 64), dtype=np.uint8)
+                except (ValueError, TypeError):
+                    valid[i] = False
+            if not valid.all():
+                series, data_quality = series[valid], data_quality[valid]
+                kept = [doc for doc, ok in zip(kept, valid) if ok]
+        elif alpha_mode == "global_rpe":
+            rpe = np.array([
+                doc.get("rpe", 5.0) if isinstance(doc.get("rpe", 5.0), (int, float)) else 5.0
+                for doc in kept
+            ], dtype=np.float64)
+
+        return self._normalize_feature_tensor(series, bound_keys, alpha_mode, data_quality, rpe), kept
+
+    def _normalize_feature_tensor(self, series, bound_keys: list, alpha_mode: str, data_quality=None, rpe=None):
+        """
+        Turns a raw (N, 64, C) series tensor into the (N, 64*C') float32 feature
+        matrix: per-channel NORM_BOUNDS scaling to uint8, plus the data_quality
+        or global_rpe alpha channel when requested.
+        """
+        np = self.np
+        n = len(series)
+        # Per-channel bounds broadcast across (N, 64, C)
+        bounds = np.array([NORM_BOUNDS.get(k, (0, 1)) for k in bound_keys], dtype=np.float64)
+        lo, hi = bounds[:, 0], bounds[:, 1]
+        span = hi - lo
+        normalized = ((np.clip(series, lo, hi) - lo) / np.where(span > 0, span, 1.0) * 255).astype(np.uint8)
+        normalized[..., span <= 0] = 0
+
+        if alpha_mode == "data_quality":
+            normalized = np.concatenate([normalized, np.asarray(data_quality, dtype=np.uint8)[..., None]], axis=-1)
+        elif alpha_mode == "global_rpe":
+            alpha = np.clip((np.asarray(rpe, dtype=np.float64) - 1) / 9 * 255, 0, 255).astype(np.uint8)
+            normalized = np.concatenate(
+                [normalized, np.broadcast_to(alpha[:, None, None], (n, 64, 1))], axis=-1
+            )
+
+        return normalized.reshape(n, -1).astype(np.float32)
+
+    def _cached_feature_matrix(
+        self,
+        cache: "_WorkoutSeriesCache",
+        r_key: str,
+        g_key: str,
+        b_key: str,
+        alpha_mode: str = "none",
+        alpha_key: str = "cadence"
+    ):
+        """Same rows as `_batch_feature_vectors`, built from the series cache (row i = cache row i)."""
+        bound_keys = [r_key, g_key, b_key]
+        if alpha_mode == "fourth_metric":
+            bound_keys.append(alpha_key)
+        n = len(cache)
+        series = cache.channel_tensor(bound_keys)
+        return self._normalize_feature_tensor(
+            series,
+            bound_keys,
+            alpha_mode,
+            data_quality=cache.data_quality[:n] if alpha_mode == "data_quality" else None,
+            rpe=cache.rpe[:n].astype(self.np.float64) if alpha_mode == "global_rpe" else None,
+        )
+
+    async def _get_series_cache(self):
+        """
+        Returns (cache, loaded_now). The cache is (re)loaded with one projected
+        find of the whole collection when cold or past its TTL; cache is None if
+        it is unavailable.
+        """
+        cache = self._series_cache
+        if cache is None or self.db is None:
+            return None, False
+        if cache.is_fresh():
+            return cache, False
+        async with self._series_cache_lock:
+            if cache.is_fresh():
+                return cache, False
+            try:
+                docs = await self.db.workouts.find({}, SERIES_CACHE_PROJECTION).to_list(length=None)
+            except Exception as e:
+                logger.warning(f"[{self.write_scope}-Actor] Series cache load failed: {e}")
+                return (cache if cache.loaded_at is not None else None), False
+            cache.load(docs)
+            logger.info(
+                f"[{self.write_scope}-Actor] Series cache loaded {len(cache)} workouts "
+                f"({cache.stats()['array_mb']} MB)."
+            )
+            return cache, True
+
+    @staticmethod
+    def _channel_keys(r_key: str, g_key: str, b_key: str, alpha_mode: str, alpha_key: str) -> list:
+        """The time_series keys an r/g/b(/alpha) mapping reads."""
+        return [r_key, g_key, b_key] + ([alpha_key] if alpha_mode == "fourth_metric" else [])
+
+    @staticmethod
+    def _series_cache_covers(keys) -> bool:
+        """The series cache only holds AVAILABLE_METRICS; any other key (channel, alpha or chart metric) needs the documents."""
+        return all(key in AVAILABLE_METRICS for key in keys)
+
+    def _rank_cache_rows(self, cache, matrix, query_vector, limit: int, exclude_row=None) -> list[dict]:
+        """Top-`limit` cosine matches over the cached feature matrix, formatted like `_rank_candidates_custom`."""
+        np = self.np
+        keep = cache.rankable[:len(matrix)].copy()
+        if exclude_row is not None:
+            keep[exclude_row] = False
+        rows = np.flatnonzero(keep)
+        matrix = matrix[keep]
+        if len(matrix) == 0:
+            return []
+        top, scores = self._top_k_cosine(matrix, query_vector, limit)
+        results = []
+        for i in top:
+            row = int(rows[i])
+            doc_id = cache.ids[row]
+            meta = cache.meta[row]
+            results.append({
+                "_id": doc_id,
+                "workout_id": cache.workout_ids[row],
+                "score": float(scores[i]),
+                "workout_type": meta.get("workout_type") or "?",
+                "session_tag": meta.get("session_tag"),
+                "ai_classification": meta.get("ai_classification")
+            })
+        return results
+
+    async def _similar_from_series_cache(
+        self,
+        doc_id: str,
+        r_key: str,
+        g_key: str,
+        b_key: str,
+        alpha_mode: str,
+        alpha_key: str,
+        limit: int
+    ):
+        """Custom-channel neighbours of `doc_id` from the series cache, or None if the cache can't answer."""
+        if not self._series_cache_covers(self._channel_keys(r_key, g_key, b_key, alpha_mode, alpha_key)):
+            return None
+        cache, loaded_now = await self._get_series_cache()
+        if cache is None:
+            return None
+        row = cache.row(doc_id)
+        if loaded_now or row is None:
+            cache.misses += 1
+        else:
+            cache.hits += 1
+        if row is None:
+            return None
+        matrix = self._cached_feature_matrix(cache, r_key, g_key, b_key, alpha_mode, alpha_key)
+        return self._rank_cache_rows(cache, matrix, matrix[row], limit, exclude_row=row)
+
+    def _top_k_cosine(self, matrix, query_vector, k: int):
+        """
+        Cosine similarity of every row in `matrix` against `query_vector` via one
+        matrix-vector product, then `argpartition` for the top k.
+        Returns (top_indices sorted by descending score, all_scores).
+        """
+        np = self.np
+        query = np.asarray(query_vector, dtype=np.float32)
+        dots = matrix @ query
+        denom = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), scores
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")], scores
+
+    def _rank_candidates_custom(
+        self,
+        query_vector,
+        candidate_docs: list[dict],
+        r_key: str,
+        g_key: str,
+        b_key: str,
+        alpha_mode: str,
+        alpha_key: str,
+        limit: int
+    ) -> list[dict]:
+        """Scores candidates against a custom-channel query vector in one batch and returns the top `limit`."""
+        matrix, kept = self._batch_feature_vectors(candidate_docs, r_key, g_key, b_key, alpha_mode, alpha_key)
+        # A document whose _id has no numeric suffix is skipped, not the whole search
+        rows, workout_ids = [], []
+        for i, doc in enumerate(kept):
+            try:
+                workout_ids.append(int(doc["_id"].split("_")[-1]))
+            except Exception as e:
+                logger.warning(f"Error computing similarity for {doc.get('_id')}: {e}")
+                continue
+            rows.append(i)
+        if len(rows) < len(kept):
+            matrix = matrix[rows]
+            kept = [kept[i] for i in rows]
+        if not kept:
+            return []
+        top, scores = self._top_k_cosine(matrix, query_vector, limit)
+        results = []
+        for i in top:
+            doc = kept[i]
+            results.append({
+                "_id": doc["_id"],
+                "workout_id": workout_ids[i],
+                "score": float(scores[i]),
+                "workout_type": doc.get("workout_type", "?"),
+                "session_tag": doc.get("session_tag"),
+                "ai_classification": doc.get("ai_classification")
+            })
+        return results
+
+
+    def _encode_png_bytes(
         self,
         img_array,
         size=(128, 128),
         tint_color=None
-    ) -> str:
-        """Encodes a NumPy array to a Base64 PNG. Supports RGB, RGBA, and grayscale."""
-        error_placeholder = (
-            "iVBORw0KGgoAAAANSUEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42"
-            "mNkYAAAAYAAjCB0C8AAAAASUVORK5CYII="
-        )
-        try:
-            # Use self.np and self.Image
-            if tint_color is not None and img_array.ndim == 2:
-                colored_array = self.np.zeros((*img_array.shape, 3), dtype=self.np.uint8)
-                for i in range(3):
-                    if tint_color[i] > 0:
-                        colored_array[..., i] = (
-                            img_array.astype(float) * tint_color[i] / 255
-                        ).astype(self.np.uint8)
-                img = self.Image.fromarray(colored_array, "RGB")
-            elif img_array.ndim == 2:
-                img = self.Image.fromarray(img_array, "L")
-            elif img_array.shape[-1] == 4:
-                # RGBA mode
-                img = self.Image.fromarray(img_array, "RGBA")
-            elif img_array.shape[-1] == 3:
-                # RGB mode
-                img = self.Image.fromarray(img_array, "RGB")
-            else:
-                # Fallback to RGB
-                img = self.Image.fromarray(img_array, "RGB")
+    ) -> bytes:
+        """Encodes a NumPy array to PNG bytes. Supports RGB, RGBA, and grayscale. Raises on failure."""
+        # Shared with the process-pool workers (engine_pool.py)
+        return encode_png(img_array, size, tint_color)
 
-            if size:
-                img = img.resize(size, self.Image.NEAREST)
-
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            return base64.b64encode(buf.getvalue()).decode("utf-8")
-        except Exception as e:
-            logger.error(f"Image encoding failed: {e}")
-            return error_placeholder
-
-
-    def _generate_chart_base64(self, data, color="#FF6868") -> str:
-        """Generates a Matplotlib line chart from a 1D list or array, returns base64 PNG."""
-        # Use self.np and self.plt
-        arr = self.np.array(data, dtype=float)
-        
-        self.plt.style.use("dark_background")
-        fig, ax = self.plt.subplots(figsize=(4.5, 2.5), dpi=100)
-        fig.patch.set_facecolor("#132A38")
-        ax.set_facecolor("#132A38")
-
-        ax.plot(arr, color=color, linewidth=2)
-        ax.set_xlim(0, len(arr)-1 if len(arr) > 1 else 1)
-        ax.tick_params(axis="x", colors="#A7B6C2")
-        ax.tick_params(axis="y", colors="#A7B6C2")
-        ax.set_xticks([0, len(arr)-1])
-        ax.set_xticklabels(["Start", "End"])
-        ax.spines["top"].set_visible(False)
-        ax.spines["right"].set_visible(False)
-        ax.spines["bottom"].set_color("#23435B")
-        ax.spines["left"].set_color("#23435B")
-
-        buf = io.BytesIO()
-        try:
-            fig.savefig(buf, format="PNG", facecolor=fig.get_facecolor(), bbox_inches='tight', pad_inches=0.1)
-            return base64.b64encode(buf.getvalue()).decode("utf-8")
-        except Exception as e:
-            logger.error(f"Chart generation error: {e}")
-            return ""
-        finally:
-            self.plt.close(fig)
-            self.plt.style.use("default")
+    def _generate_chart_svg(self, data, color="#FF6868") -> bytes:
+        """
+        Renders a 1D series as a small SVG line chart straight from the NumPy
+        array (polyline + nice y ticks). Same look as the old Matplotlib charts,
+        but no figure creation or global style switching per call.
+        """
+        np = self.np
+        arr = np.asarray(data, dtype=float).reshape(-1)
+        arr = arr[np.isfinite(arr)]
+        width, height = CHART_SIZE
+        left, right, top, bottom = 46, 12, 10, 24
+        plot_w, plot_h = width - left - right, height - top - bottom
+
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" font-family="DejaVu Sans, Arial, sans-serif" font-size="10">',
+            f'<rect width="{width}" height="{height}" fill="#132A38"/>',
+        ]
+        if len(arr):
+            lo, hi = float(arr.min()), float(arr.max())
+            if hi - lo <= 0:
+                pad = abs(hi) * 0.05 or 0.5
+            else:
+                pad = (hi - lo) * 0.05  # Matplotlib's default 5% data margin
+            lo, hi = lo - pad, hi + pad
+            step = _nice_tick_step(hi - lo)
+            for tick in np.arange(np.ceil(lo / step) * step, hi + step * 1e-9, step):
+                y = top + plot_h * (hi - tick) / (hi - lo)
+                label = round(float(tick) / step) * step + 0.0  # snap float noise, no "-0"
+                parts.append(
+                    f'<line x1="{left - 4}" y1="{y:.1f}" x2="{left}" y2="{y:.1f}" stroke="#A7B6C2"/>'
+                    f'<text x="{left - 7}" y="{y + 3.5:.1f}" fill="#A7B6C2" text-anchor="end">{label:g}</text>'
+                )
+            xs = left + plot_w * np.arange(len(arr)) / max(len(arr) - 1, 1)
+            ys = top + plot_h * (hi - arr) / (hi - lo)
+            points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+            parts.append(
+                f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2" '
+                f'stroke-linejoin="round" stroke-linecap="round"/>'
+            )
+        baseline = top + plot_h
+        parts.append(
+            f'<path d="M{left},{top}V{baseline}H{left + plot_w}" fill="none" stroke="#23435B"/>'
+            f'<text x="{left}" y="{baseline + 15}" fill="#A7B6C2" text-anchor="middle">Start</text>'
+            f'<text x="{left + plot_w}" y="{baseline + 15}" fill="#A7B6C2" text-anchor="middle">End</text>'
+            '</svg>'
+        )
+        return "".join(parts).encode("utf-8")
 
     # ============================================================================
     # End of Engine code
@@ -712,7 +1291,34 @@ class ExperimentActor:
         logger.info(f"[{self.write_scope}-Actor] Post-initialization setup complete.")
 
     def __del__(self):
-        pass
+        if getattr(self, "_engine_pool", None) is not None:
+            self._engine_pool.shutdown()
+
+    def _get_engine_pool(self):
+        """The process-pool engine, created on first use; None when disabled or unavailable."""
+        if self._engine_pool is None and self._engine_pool_workers > 0:
+            try:
+                self._engine_pool = ProcessPoolEngine(self._engine_pool_workers)
+                logger.info(f"[{self.write_scope}-Actor] Process-pool engine started with {self._engine_pool_workers} workers.")
+            except Exception as e:
+                logger.error(f"[{self.write_scope}-Actor] Could not start process-pool engine, using threads: {e}")
+                self._engine_pool_workers = 0
+        return self._engine_pool
+
+    async def _encode_png_batch(self, images, size, tint_color=None) -> list:
+        """
+        Encodes a batch of uint8 images. Large batches go to the process pool in
+        one shared-memory submission; otherwise (or on pool failure) one worker thread.
+        """
+        pool = self._get_engine_pool() if len(images) >= PROCESS_POOL_MIN_BATCH else None
+        if pool is not None:
+            try:
+                return await pool.encode_png_batch(images, size, tint_color)
+            except Exception as e:
+                logger.warning(f"[{self.write_scope}-Actor] Process-pool batch failed, falling back to thread: {e}")
+        return await asyncio.to_thread(
+            lambda: [self._encode_png_bytes(img, size, tint_color) for img in images]
+        )
 
     def _check_ready(self):
         """Check if actor is ready (follows pattern from other experiments)."""
@@ -720,7 +1326,7 @@ class ExperimentActor:
             raise RuntimeError("Database not initialized. Check logs for import errors.")
         if not self.templates:
             raise RuntimeError("Templates not loaded. Check logs for import errors.")
-        if not self.np or not self.plt or not self.httpx or not self.Image:
+        if not self.np or not self.httpx or not self.Image:
             raise RuntimeError("Heavy dependencies not loaded. Check logs for import errors.")
 
     # ---
@@ -736,10 +1342,12 @@ class ExperimentActor:
         alpha_key: str = "cadence"
     ) -> dict:
         """
-        Generates all B64 images and labels for the selected keys.
-        Returns a JSON-serializable dictionary.
+        Generates the image URLs and labels for the selected keys.
+        Returns a JSON-serializable dictionary; the PNGs themselves are served
+        (and cached by ETag) from /workout/{id}/image/{kind}.png.
         """
         self._check_ready()
+        workout_id = int(doc["_id"].split("_")[-1])
         
         # --- Must call internal method ---
         arrays = self._generate_workout_viz_arrays(
@@ -752,20 +1360,22 @@ class ExperimentActor:
             alpha_key=alpha_key
         )
         
-        # --- Must call internal method ---
-        b64_combined = self._encode_png_b64(arrays["rgb_combined"], (256,256))
-        b64_r = self._encode_png_b64(arrays["channel_r_2d"], (128,128), tint_color=(255,0,0))
-        b64_g = self._encode_png_b64(arrays["channel_g_2d"], (128,128), tint_color=(0,255,0))
-        b64_b = self._encode_png_b64(arrays["channel_b_2d"], (128,128), tint_color=(0,0,255))
+        def image_url(kind: str) -> str:
+            return self._image_url(workout_id, kind, r_key, g_key, b_key, alpha_mode, alpha_key)
+
+        url_combined = image_url("combined")
+        url_r = image_url("r")
+        url_g = image_url("g")
+        url_b = image_url("b")
         
-        # Generate alpha channel visualization if present
-        b64_a = None
+        # Alpha channel visualization if present
+        url_a = None
         label_a_full_html = None
         label_a_short_html = None
         if arrays.get("channel_a_2d") is not None:
             # For alpha channel, we can show it as grayscale or with a special tint
             # Using a subtle white/gray tint to show transparency
-            b64_a = self._encode_png_b64(arrays["channel_a_2d"], (128,128), tint_color=(255,255,255))
+            url_a = image_url("a")
             
             alpha_key_used = arrays.get("alpha_key", "unknown")
             if alpha_mode == "fourth_metric":
@@ -798,10 +1408,10 @@ class ExperimentActor:
         }
         
         result = {
-            "b64_combined": b64_combined,
-            "b64_r": b64_r,
-            "b64_g": b64_g,
-            "b64_b": b64_b,
+            "url_combined": url_combined,
+            "url_r": url_r,
+            "url_g": url_g,
+            "url_b": url_b,
             "label_r_full_html": format_label("r", r_key),
             "label_g_full_html": format_label("g", g_key),
             "label_b_full_html": format_label("b", b_key),
@@ -813,8 +1423,8 @@ class ExperimentActor:
             "alpha_key": alpha_key if alpha_mode == "fourth_metric" else None
         }
         
-        if b64_a is not None:
-            result["b64_a"] = b64_a
+        if url_a is not None:
+            result["url_a"] = url_a
             result["label_a_full_html"] = label_a_full_html
             result["label_a_short_html"] = label_a_short_html
         
@@ -841,14 +1451,26 @@ class ExperimentActor:
         3. Computes custom channel vectors for candidates and scores in-memory
         
         This approach balances MongoDB's indexed vector search performance with
-        the flexibility of custom channel combinations.
+        the flexibility of custom channel combinations. Non-indexed combinations
+        are ranked against the in-actor series cache with no DB round trip.
         """
         self._check_ready()
         doc_id = f"workout_rad_{workout_id}"
+        is_indexed_combo = (r_key, g_key, b_key) in INDEXED_CHANNEL_COMBOS
+        if not is_indexed_combo:
+            cached = await self._similar_from_series_cache(
+                doc_id, r_key, g_key, b_key, alpha_mode, alpha_key, limit
+            )
+            if cached is not None:
+                return cached
+
         query_doc = await self.db.workouts.find_one({"_id": doc_id})
         if not query_doc:
             raise RuntimeError(f"Doc {doc_id} not found")
-        
+        if self._series_cache is not None and self._series_cache.loaded_at is not None:
+            # Pick up workouts written outside this actor without waiting for the TTL reload
+            self._series_cache.upsert(query_doc)
+
         # Generate query vector with custom channels
         query_vector = self._get_feature_vector_custom(query_doc, r_key, g_key, b_key, alpha_mode, alpha_key)
         query_vector_list = query_vector.tolist()  # Convert NumPy array to list
@@ -950,8 +1572,14 @@ class ExperimentActor:
                 # Fall through to in-memory computation
         
         # For non-canonical channels OR if vector search fails:
-        # Use MongoDB to efficiently fetch candidates, then compute custom similarity
-        # This leverages MongoDB for filtering/fetching but computes similarity with custom vectors
+        # Prefer the series cache; otherwise use MongoDB to fetch candidates and
+        # compute custom similarity over them
+        if is_indexed_combo:
+            cached = await self._similar_from_series_cache(
+                doc_id, r_key, g_key, b_key, alpha_mode, alpha_key, limit
+            )
+            if cached is not None:
+                return cached
         try:
             # First, try to get a smart candidate set using canonical vector search
             # as a pre-filter, then re-rank with custom vectors
@@ -999,41 +1627,10 @@ class ExperimentActor:
             if not candidate_docs:
                 return []
             
-            # Compute cosine similarity with custom channel vectors
-            similarities = []
-            query_vec_norm = self.np.linalg.norm(query_vector)
-            
-            for doc in candidate_docs:
-                try:
-                    # Generate vector for this doc using the same custom channels
-                    candidate_vector = self._get_feature_vector_custom(doc, r_key, g_key, b_key, alpha_mode, alpha_key)
-                    
-                    # Compute cosine similarity
-                    candidate_vec_norm = self.np.linalg.norm(candidate_vector)
-                    if candidate_vec_norm == 0 or query_vec_norm == 0:
-                        similarity = 0.0
-                    else:
-                        dot_product = float(self.np.dot(query_vector, candidate_vector))
-                        similarity = dot_product / (query_vec_norm * candidate_vec_norm)
-                    
-                    # Extract workout ID suffix for display
-                    suffix = doc["_id"].split("_")[-1]
-                    
-                    similarities.append({
-                        "_id": doc["_id"],
-                        "workout_id": int(suffix),
-                        "score": similarity,
-                        "workout_type": doc.get("workout_type", "?"),
-                        "session_tag": doc.get("session_tag"),
-                        "ai_classification": doc.get("ai_classification")
-                    })
-                except Exception as e:
-                    logger.warning(f"Error computing similarity for {doc.get('_id')}: {e}")
-                    continue
-            
-            # Sort by similarity (descending) and return top N
-            similarities.sort(key=lambda x: x["score"], reverse=True)
-            return similarities[:limit]
+            # Compute cosine similarity with custom channel vectors for all candidates at once
+            return self._rank_candidates_custom(
+                query_vector, candidate_docs, r_key, g_key, b_key, alpha_mode, alpha_key, limit
+            )
             
         except Exception as e:
             logger.error(f"Error in find_similar_workouts_custom: {e}", exc_info=True)
@@ -1069,39 +1666,58 @@ class ExperimentActor:
         self._check_ready()
         
         base_doc_id = f"workout_rad_{base_workout_id}"
-        base_doc = await self.db.workouts.find_one({"_id": base_doc_id})
-        if not base_doc:
-            raise RuntimeError(f"Base workout {base_doc_id} not found")
-        
-        # Get base vector
-        base_vector = self._get_feature_vector_custom(
-            base_doc, r_key, g_key, b_key, alpha_mode, alpha_key
+        operand_doc_id = None
+        if operation in ("add", "subtract") and operand_workout_id is not None:
+            operand_doc_id = f"workout_rad_{operand_workout_id}"
+
+        # Serve base/operand vectors and the candidate set from the series cache when it has them
+        cache, loaded_now = await self._get_series_cache()
+        base_row = cache.row(base_doc_id) if cache is not None else None
+        operand_row = cache.row(operand_doc_id) if cache is not None and operand_doc_id else None
+        use_cache = (
+            self._series_cache_covers(self._channel_keys(r_key, g_key, b_key, alpha_mode, alpha_key))
+            and base_row is not None
+            and (operand_doc_id is None or operand_row is not None)
         )
+        if cache is not None:
+            if use_cache and not loaded_now:
+                cache.hits += 1
+            else:
+                cache.misses += 1
+
+        base_doc = None
+        if use_cache:
+            matrix = self._cached_feature_matrix(cache, r_key, g_key, b_key, alpha_mode, alpha_key)
+            base_vector = matrix[base_row]
+        else:
+            base_doc = await self.db.workouts.find_one({"_id": base_doc_id})
+            if not base_doc:
+                raise RuntimeError(f"Base workout {base_doc_id} not found")
+            # Get base vector
+            base_vector = self._get_feature_vector_custom(
+                base_doc, r_key, g_key, b_key, alpha_mode, alpha_key
+            )
         base_vector_list = base_vector.tolist()
-        
-        # Perform vector arithmetic
-        if operation == "subtract" and operand_workout_id is not None:
-            operand_doc_id = f"workout_rad_{operand_workout_id}"
+
+        async def _get_operand_vector():
+            if use_cache:
+                return matrix[operand_row]
             operand_doc = await self.db.workouts.find_one({"_id": operand_doc_id})
             if not operand_doc:
                 raise RuntimeError(f"Operand workout {operand_doc_id} not found")
-            
-            operand_vector = self._get_feature_vector_custom(
+            return self._get_feature_vector_custom(
                 operand_doc, r_key, g_key, b_key, alpha_mode, alpha_key
             )
+        
+        # Perform vector arithmetic
+        if operation == "subtract" and operand_workout_id is not None:
+            operand_vector = await _get_operand_vector()
             # Subtract: base - operand (e.g., hard - easy = effort vector)
             result_vector = self.np.array(base_vector_list) - operand_vector
             operation_description = f"Vector({base_workout_id}) - Vector({operand_workout_id})"
             
         elif operation == "add" and operand_workout_id is not None:
-            operand_doc_id = f"workout_rad_{operand_workout_id}"
-            operand_doc = await self.db.workouts.find_one({"_id": operand_doc_id})
-            if not operand_doc:
-                raise RuntimeError(f"Operand workout {operand_doc_id} not found")
-            
-            operand_vector = self._get_feature_vector_custom(
-                operand_doc, r_key, g_key, b_key, alpha_mode, alpha_key
-            )
+            operand_vector = await _get_operand_vector()
             # Add: base + operand (e.g., yoga + effort = harder yoga)
             result_vector = self.np.array(base_vector_list) + operand_vector
             operation_description = f"Vector({base_workout_id}) + Vector({operand_workout_id})"
@@ -1125,9 +1741,23 @@ class ExperimentActor:
         result_vector_list = result_vector.tolist()
         
         # Search for similar workouts using the computed vector
-        # Use the canonical vector search as a pre-filter, then re-rank with custom vectors
         try:
-            # First, try to use indexed vector search as a pre-filter
+            if use_cache:
+                # Exact search over every cached workout (no DB round trip)
+                similarities = self._rank_cache_rows(cache, matrix, result_vector, limit, exclude_row=base_row)
+                if not similarities:
+                    return {
+                        "operation": operation_description,
+                        "results": [],
+                        "message": "No candidate workouts found for vector magic search."
+                    }
+                return {
+                    "operation": operation_description,
+                    "results": similarities,
+                    "computed_vector_length": len(result_vector_list)
+                }
+
+            # Use the canonical vector search as a pre-filter, then re-rank with custom vectors
             if isinstance(base_doc.get("workout_vector"), list):
                 prefilter_pipeline = [
                     {
@@ -1167,43 +1797,14 @@ class ExperimentActor:
                     "message": "No candidate workouts found for vector magic search."
                 }
             
-            # Compute cosine similarity with the computed vector
-            similarities = []
-            query_vec_norm = self.np.linalg.norm(result_vector)
-            
-            for doc in candidate_docs:
-                try:
-                    candidate_vector = self._get_feature_vector_custom(
-                        doc, r_key, g_key, b_key, alpha_mode, alpha_key
-                    )
-                    
-                    candidate_vec_norm = self.np.linalg.norm(candidate_vector)
-                    if candidate_vec_norm == 0 or query_vec_norm == 0:
-                        similarity = 0.0
-                    else:
-                        dot_product = float(self.np.dot(result_vector, candidate_vector))
-                        similarity = dot_product / (query_vec_norm * candidate_vec_norm)
-                    
-                    suffix = doc["_id"].split("_")[-1]
-                    
-                    similarities.append({
-                        "_id": doc["_id"],
-                        "workout_id": int(suffix),
-                        "score": similarity,
-                        "workout_type": doc.get("workout_type", "?"),
-                        "session_tag": doc.get("session_tag"),
-                        "ai_classification": doc.get("ai_classification")
-                    })
-                except Exception as e:
-                    logger.warning(f"Error computing similarity for {doc.get('_id')}: {e}")
-                    continue
-            
-            # Sort by similarity (descending) and return top N
-            similarities.sort(key=lambda x: x["score"], reverse=True)
+            # Compute cosine similarity with the computed vector for all candidates at once
+            similarities = self._rank_candidates_custom(
+                result_vector, candidate_docs, r_key, g_key, b_key, alpha_mode, alpha_key, limit
+            )
             
             return {
                 "operation": operation_description,
-                "results": similarities[:limit],
+                "results": similarities,
                 "computed_vector_length": len(result_vector_list)
             }
             
@@ -1550,46 +2151,76 @@ class ExperimentActor:
         return await self._generate_viz_data(doc, r_key, g_key, b_key, alpha_mode, alpha_key)
 
     # --- Method 1: Replaces show_gallery ---
+    async def _load_gallery_series(self):
+        """
+        Returns (doc_ids, raw (N, 64, 3) series) for the first GALLERY_LIMIT workouts
+        by _id, from the series cache when available, else from MongoDB.
+        """
+        cache, loaded_now = await self._get_series_cache()
+        if cache is not None:
+            if loaded_now:
+                cache.misses += 1
+            else:
+                cache.hits += 1
+            doc_ids = sorted(cache.ids)[:GALLERY_LIMIT]
+            return doc_ids, cache.channel_tensor(list(GALLERY_CHANNELS), rows=[cache.row(i) for i in doc_ids])
+
+        docs = await self.db.workouts.find(
+            {}, 
+            {"_id": 1, "time_series": 1}
+        ).sort("_id", 1).limit(GALLERY_LIMIT).to_list(length=None)
+        raw, kept = self._batch_series_tensor(docs, list(GALLERY_CHANNELS))
+        return [d["_id"] for d in kept], raw
+
+    async def _warm_gallery_thumbnails(self, doc_ids: list, raw) -> None:
+        """
+        Makes sure every gallery thumbnail is in the image cache under the key its
+        /image/thumb.png route will look up. Only new or changed workouts are
+        normalized and encoded, as a single batch (process pool or worker thread).
+        """
+        size = IMAGE_KINDS["thumb"][0]
+        keys = [
+            self._image_key(doc_id, "thumb", raw[i].T.astype(self.np.float32).tobytes())
+            for i, doc_id in enumerate(doc_ids)
+        ]
+        missing = [i for i, k in enumerate(keys) if k not in self._image_cache]
+        if not missing:
+            return
+        pixels = self._normalize_feature_tensor(
+            raw[missing], list(GALLERY_CHANNELS), "none"
+        ).astype(self.np.uint8).reshape(len(missing), 8, 8, 3)
+
+        try:
+            encoded = await self._encode_png_batch(pixels, size)
+        except Exception as e:
+            logger.error(f"[{self.write_scope}-Actor] Thumbnail batch encoding failed: {e}")
+            return
+        for i, png in zip(missing, encoded):
+            self._image_cache.put(keys[i], png)
+
     async def render_gallery_page(self, request_context: dict) -> str:
         self._check_ready()
         try:
-            docs = await self.db.workouts.find(
-                {}, 
-                {"_id": 1, "time_series": 1}
-            ).sort("_id", 1).limit(200).to_list(length=None)
+            doc_ids, raw = await self._load_gallery_series()
         except Exception as e:
             logger.error(f"[{self.write_scope}-Actor] DB error in render_gallery_page: {e}")
-            docs = []
+            doc_ids, raw = [], None
 
-        if not docs:
+        if not doc_ids:
             snippet_list = ["<p>No workouts present. Click 'Generate' to create some!</p>"]
         else:
-            semaphore = asyncio.Semaphore(10)
-            
-            def _generate_snippet_sync(doc: Dict[str, Any]) -> str:
-                """Synchronous helper to generate snippet for a single document."""
-                # --- Must call internal methods ---
-                arrays = self._generate_workout_viz_arrays(
-                    doc, size=8, r_key="heart_rate", g_key="calories_per_min", b_key="speed_kph"
-                )
-                b64_img = self._encode_png_b64(arrays["rgb_combined"], (128, 128))
-                suffix = doc["_id"].split("_")[-1]
-                return f"""
+            await self._warm_gallery_thumbnails(doc_ids, raw)
+            snippet_list = []
+            for doc_id in doc_ids:
+                suffix = doc_id.split("_")[-1]
+                snippet_list.append(f"""
                   <div class="collection-item">
                     <a href="./workout/{suffix}">
-                      <img src="data:image/png;base64,{b64_img}" alt="Workout {suffix}">
+                      <img src="./workout/{suffix}/image/thumb.png" alt="Workout {suffix}" loading="lazy" width="128" height="128">
                       <p>Workout #{suffix}</p>
                     </a>
                   </div>
-                """
-            
-            async def _generate_snippet_with_limit(doc: Dict[str, Any]) -> str:
-                """Async wrapper that limits concurrency using semaphore."""
-                async with semaphore:
-                    return await asyncio.to_thread(_generate_snippet_sync, doc)
-            
-            snippet_tasks = [_generate_snippet_with_limit(d) for d in docs]
-            snippet_list = await asyncio.gather(*snippet_tasks)
+                """)
 
         response = self.templates.TemplateResponse(
             "index.html",
@@ -1597,6 +2228,175 @@ class ExperimentActor:
         )
         return response.body.decode("utf-8")
 
+    # ---
+    # --- Binary image endpoints (PNG bytes + ETag)
+    # ---
+    def _image_url(
+        self,
+        workout_id: int,
+        kind: str,
+        r_key: str = "heart_rate",
+        g_key: str = "calories_per_min",
+        b_key: str = "speed_kph",
+        alpha_mode: str = "none",
+        alpha_key: str = "cadence"
+    ) -> str:
+        url = f"/experiments/{self.write_scope}/workout/{workout_id}/image/{kind}.png"
+        if kind == "thumb":
+            return url
+        params = {"r_key": r_key, "g_key": g_key, "b_key": b_key}
+        if alpha_mode != "none":
+            params["alpha_mode"] = alpha_mode
+            if alpha_mode == "fourth_metric":
+                params["alpha_key"] = alpha_key
+        return f"{url}?{urlencode(params)}"
+
+    def _chart_url(self, workout_id: int, metric: str) -> str:
+        return f"/experiments/{self.write_scope}/workout/{workout_id}/chart/{metric}.svg"
+
+    def _image_key(
+        self,
+        doc_id: str,
+        kind: str,
+        source_bytes: bytes,
+        r_key: str = "heart_rate",
+        g_key: str = "calories_per_min",
+        b_key: str = "speed_kph",
+        alpha_mode: str = "none",
+        alpha_key: str = "cadence"
+    ) -> str:
+        if kind == "thumb":
+            mapping = ("thumb",) + GALLERY_CHANNELS + ("none",)
+        else:
+            mapping = (kind, r_key, g_key, b_key, alpha_mode, alpha_key if alpha_mode == "fourth_metric" else "")
+        return _ImageCache.make_key(doc_id, mapping, source_bytes, IMAGE_KINDS[kind][0])
+
+    def _image_source_bytes(self, doc: dict, keys, alpha_mode: str = "none") -> bytes:
+        """Float32 bytes of every input the image depends on (channel-major), for content addressing."""
+        np = self.np
+        time_series = doc.get("time_series") or {}
+        parts = []
+        for key in keys:
+            values = time_series.get(key)
+            parts.append(np.asarray(values if values is not None else np.zeros(64), dtype=np.float32).tobytes())
+        if alpha_mode == "data_quality":
+            parts.append(np.asarray(doc.get("data_quality", [255] * 64), dtype=np.uint8).tobytes())
+        elif alpha_mode == "global_rpe":
+            parts.append(np.float32(doc.get("rpe", 5.0)).tobytes())
+        return b"".join(parts)
+
+    async def _get_render_doc(self, doc_id: str, keys: list):
+        """
+        The series/meta fields needed to draw `keys` of a workout, from the series
+        cache when it holds all of them (else from the document).
+        """
+        if self._series_cache_covers(keys):
+            cache, _ = await self._get_series_cache()
+        else:
+            cache = None
+        if cache is not None:
+            row = cache.row(doc_id)
+            if row is not None:
+                return cache.as_doc(row)
+        return await self.db.workouts.find_one({"_id": doc_id}, SERIES_CACHE_PROJECTION)
+
+    @staticmethod
+    def _etag_matches(if_none_match, etag: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    async def _serve_cached_image(
+        self, key: str, render, content_type: str, if_none_match=None, offload: bool = False
+    ):
+        """
+        Shared ETag / cache / render path. Returns {"etag", "content_type", "body"}
+        (image bytes) with body None for a 304. `offload` runs `render` in a worker
+        thread; only pass it for renders that touch no shared state (numpy + PIL encoding
+        over private copies, such as the arrays from _get_render_doc).
+        """
+        etag = f'"{key}"'
+        if self._etag_matches(if_none_match, etag):
+            return {"etag": etag, "content_type": content_type, "body": None}
+        body = self._image_cache.get(key)
+        if body is None:
+            body = await asyncio.to_thread(render) if offload else render()
+            if not body:
+                return None
+            self._image_cache.put(key, body)
+        return {"etag": etag, "content_type": content_type, "body": body}
+
+    async def get_workout_image_png(
+        self,
+        workout_id: int,
+        kind: str,
+        r_key: str = "heart_rate",
+        g_key: str = "calories_per_min",
+        b_key: str = "speed_kph",
+        alpha_mode: str = "none",
+        alpha_key: str = "cadence",
+        if_none_match: str = None
+    ):
+        """
+        PNG for one workout image (thumb, combined, r, g, b or a) as
+        {"etag", "content_type", "body"}; body is None when `if_none_match` already matches.
+        Returns None if the workout (or the requested channel) doesn't exist.
+        """
+        self._check_ready()
+        if kind not in IMAGE_KINDS:
+            return None
+        if kind == "thumb":
+            r_key, g_key, b_key = GALLERY_CHANNELS
+            alpha_mode = "none"
+        if kind == "a" and alpha_mode not in ("fourth_metric", "data_quality", "global_rpe"):
+            return None
+        doc_id = f"workout_rad_{workout_id}"
+        source_keys = self._channel_keys(r_key, g_key, b_key, alpha_mode, alpha_key)
+        doc = await self._get_render_doc(doc_id, source_keys)
+        if not doc:
+            return None
+
+        key = self._image_key(
+            doc_id, kind, self._image_source_bytes(doc, source_keys, alpha_mode),
+            r_key, g_key, b_key, alpha_mode, alpha_key
+        )
+        size, tint = IMAGE_KINDS[kind]
+
+        def render() -> bytes:
+            arrays = self._generate_workout_viz_arrays(
+                doc, size=8, r_key=r_key, g_key=g_key, b_key=b_key,
+                alpha_mode=alpha_mode, alpha_key=alpha_key
+            )
+            if kind in ("thumb", "combined"):
+                img = arrays["rgb_combined"]
+            else:
+                img = arrays[f"channel_{kind}_2d"]
+            return self._encode_png_bytes(img, size, tint_color=tint)
+
+        return await self._serve_cached_image(key, render, "image/png", if_none_match, offload=True)
+
+    async def get_workout_chart_svg(self, workout_id: int, metric: str, if_none_match: str = None):
+        """Line chart SVG for one metric as {"etag", "content_type", "body"} (body None on ETag match), or None."""
+        self._check_ready()
+        if metric not in CHART_COLORS:
+            return None
+        doc_id = f"workout_rad_{workout_id}"
+        doc = await self._get_render_doc(doc_id, [metric])
+        if not doc:
+            return None
+        series = (doc.get("time_series") or {}).get(metric)
+        if series is None:
+            series = []
+        key = _ImageCache.make_key(
+            doc_id, (CHART_STYLE_VERSION, metric, CHART_COLORS[metric]),
+            self.np.asarray(series, dtype=self.np.float32).tobytes(), CHART_SIZE
+        )
+        # Sub-millisecond to render, so it stays on the event loop
+        return await self._serve_cached_image(
+            key, lambda: self._generate_chart_svg(series, CHART_COLORS[metric]), "image/svg+xml", if_none_match
+        )
+
     # --- Method 2: Replaces show_detail (UPDATED + FIXED) ---
     async def render_detail_page(
         self, 
@@ -1617,7 +2417,6 @@ class ExperimentActor:
             return f"<h1>404 - Not Found</h1><p>No workout with id {doc_id}</p>"
 
         viz_data = await self._generate_viz_data(doc, r_key, g_key, b_key, alpha_mode, alpha_key)
-        raw_data_for_charts = viz_data["raw_data"]
 
         summary_is_pending = (
             PLACEHOLDER_CLASSIFICATION in doc.get("ai_classification", "") or
@@ -1756,14 +2555,8 @@ class ExperimentActor:
         else:
             ephemeral_prompt = doc.get("llm_analysis_prompt", PLACEHOLDER_PROMPT)
 
-        all_charts = {
-            # --- Must call internal method ---
-            "heart_rate": self._generate_chart_base64(raw_data_for_charts.get("heart_rate", []), "#FF6868"),
-            "calories_per_min": self._generate_chart_base64(raw_data_for_charts.get("calories_per_min", []), "#00ED64"),
-            "speed_kph": self._generate_chart_base64(raw_data_for_charts.get("speed_kph", []), "#58AEFF"),
-            "power": self._generate_chart_base64(raw_data_for_charts.get("power", []), "#FFA554"),
-            "cadence": self._generate_chart_base64(raw_data_for_charts.get("cadence", []), "#C792EA")
-        }
+        # Charts are fetched by the browser from the cacheable /chart/{metric}.svg route
+        chart_urls = {metric: self._chart_url(workout_id, metric) for metric in CHART_COLORS}
 
         doc_copy = dict(doc)
         if isinstance(doc_copy.get("workout_vector"), list):
@@ -1816,7 +2609,7 @@ class ExperimentActor:
         context = {
             "request": request_context,
             "workout_id": workout_id,
-            "all_charts": all_charts,
+            "chart_urls": chart_urls,
             "json_data_pretty": doc_json,
             "ai_neighbors_html": neighbors_html,
             "neighbors_data": neighbors_data,  # Structured data for Vector Magic
@@ -1826,11 +2619,11 @@ class ExperimentActor:
             "ai_summary": ai_sum,
             "llm_analysis_prompt": ephemeral_prompt,
             "ai_analysis_button_html": ai_analysis_button_html,
-            "b64_combined": viz_data["b64_combined"],
-            "b64_r": viz_data["b64_r"],
-            "b64_g": viz_data["b64_g"],
-            "b64_b": viz_data["b64_b"],
-            "b64_a": viz_data.get("b64_a"),  # Alpha channel (may not be present)
+            "url_combined": viz_data["url_combined"],
+            "url_r": viz_data["url_r"],
+            "url_g": viz_data["url_g"],
+            "url_b": viz_data["url_b"],
+            "url_a": viz_data.get("url_a"),  # Alpha channel (may not be present)
             "label_r_full_html": viz_data["label_r_full_html"],
             "label_g_full_html": viz_data["label_g_full_html"],
             "label_b_full_html": viz_data["label_b_full_html"],
@@ -1985,6 +2778,8 @@ class ExperimentActor:
             {"_id": doc_id},
             {"$set": {"ai_classification": final_class, "ai_summary": summary, "llm_analysis_prompt": final_prompt}}
         )
+        if self._series_cache is not None:
+            self._series_cache.update_meta(doc_id, {"ai_classification": final_class})
         logger.info(f"[{self.write_scope}-Actor] Analysis complete for {doc_id}.")
         return True
 
@@ -2139,6 +2934,8 @@ class ExperimentActor:
                 doc = self._convert_numpy_types(doc)
                 await self.db.workouts.insert_one(doc)
                 logger.info(f"[{self.write_scope}-Actor] Inserted new doc {doc['_id']} with indexed vectors")
+                if self._series_cache is not None and self._series_cache.loaded_at is not None:
+                    self._series_cache.upsert(doc)
                 return new_suffix
             except Exception as e:
                 if "duplicate" in str(e).lower() or "E11000" in str(e):
@@ -2155,5 +2952,26 @@ class ExperimentActor:
         self._check_ready()
         result = await self.db.workouts.delete_many({})
         deleted_count = result.deleted_count
+        if self._series_cache is not None:
+            if set(self.read_scopes) == {self.write_scope}:
+                self._series_cache.clear()
+            else:
+                # Other read scopes' workouts survive the scoped delete; reload them
+                self._series_cache.invalidate()
         logger.info(f"[{self.write_scope}-Actor] Cleared {deleted_count} documents.")
-        return {"deleted_count": deleted_count}
\ No newline at end of file
+        return {"deleted_count": deleted_count}
+
+    # ============================================================================
+    # DEBUG METHODS
+    # ============================================================================
+
+    async def get_debug_status(self) -> dict:
+        """Returns the series/image cache footprints and hit rates for the debug endpoint."""
+        cache = self._series_cache
+        return {
+            "write_scope": self.write_scope,
+            "read_scopes": self.read_scopes,
+            "series_cache": cache.stats() if cache is not None else None,
+            "image_cache": self._image_cache.stats(),
+            "engine_pool": self._engine_pool.stats() if self._engine_pool is not None else {"workers": self._engine_pool_workers, "started": False},
+        }
@@ -0,0 +1,123 @@
+# File: /app/experiments/data_imaging/engine_pool.py
+
+"""
+Optional process-pool engine for the data_imaging actor's CPU-bound work.
+
+PNG encoding runs under the GIL in the actor's worker threads, so a gallery of
+200 thumbnails is effectively single-core. When enabled, the actor hands a whole
+batch of uint8 image arrays to this engine in one call:
+
+- the batch is copied once into a SharedMemory block (no per-item pickling),
+- it is split into one contiguous slice per worker process,
+- each worker attaches to the block, encodes its slice and returns PNG bytes.
+
+The worker-side code lives in png_codec. Spawn-context children import what they
+unpickle, so each worker imports this experiment package once when it starts;
+the pool is long-lived, so that is a one-off cost per worker. encode_png is
+re-exported here for the actor.
+
+Heavy imports (numpy, PIL) stay inside functions, matching actor.py.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from .png_codec import encode_png, encode_png_slice
+
+logger = logging.getLogger(__name__)
+
+def resolve_worker_count(setting: str) -> int:
+    """
+    "0"/"" disables the pool, an integer is used as-is, and "auto" uses the
+    CPUs Ray assigned to this actor (falling back to the visible core count).
+    """
+    setting = (setting or "").strip().lower()
+    if setting in ("", "0", "off", "false", "none"):
+        return 0
+    if setting != "auto":
+        try:
+            return max(0, int(setting))
+        except ValueError:
+            logger.warning(f"Invalid process pool worker setting '{setting}'; pool disabled.")
+            return 0
+    try:
+        import ray
+        cpus = ray.get_runtime_context().get_assigned_resources().get("CPU")
+        if cpus:
+            return max(1, int(cpus))
+    except Exception:
+        pass
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+class ProcessPoolEngine:
+    """Batched, shared-memory PNG encoding across a spawn-context process pool."""
+
+    def __init__(self, workers: int):
+        import multiprocessing
+
+        self.workers = max(1, workers)
+        # spawn: forking a Ray worker (threads, gRPC) is not safe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+
+    async def encode_png_batch(self, images, size=(128, 128), tint_color=None) -> List[bytes]:
+        """
+        Encodes every image in `images` (an (N, H, W[, C]) uint8 array) and
+        returns the PNG bytes in order. One SharedMemory block and one task
+        per worker for the whole batch.
+        """
+        import numpy as np
+        from multiprocessing import shared_memory
+
+        images = np.ascontiguousarray(images, dtype=np.uint8)
+        n = len(images)
+        if n == 0:
+            return []
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, images.nbytes))
+        try:
+            np.ndarray(images.shape, dtype=images.dtype, buffer=shm.buf)[...] = images
+            chunk = -(-n // self.workers)
+            loop = asyncio.get_running_loop()
+            futures = [
+                loop.run_in_executor(
+                    self._executor, encode_png_slice,
+                    shm.name, images.shape, images.dtype.str, start, min(start + chunk, n),
+                    tuple(size) if size else None, tuple(tint_color) if tint_color else None,
+                )
+                for start in range(0, n, chunk)
+            ]
+            try:
+                parts = await asyncio.gather(*futures)
+            except Exception:
+                self.failures += 1
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+        self.batches += 1
+        self.items += n
+        return [png for part in parts for png in part]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,76 @@
+# File: /app/experiments/data_imaging/png_codec.py
+
+"""
+PNG encoding shared by the data_imaging actor and its process-pool workers
+(see engine_pool.py). numpy and PIL are imported inside the functions.
+"""
+import io
+from typing import List, Optional, Tuple
+
+
+def encode_png(img_array, size=(128, 128), tint_color=None) -> bytes:
+    """Encodes a uint8 NumPy array to PNG bytes. Supports RGB, RGBA, and tinted/plain grayscale."""
+    import numpy as np
+    from PIL import Image
+
+    if tint_color is not None and img_array.ndim == 2:
+        colored_array = np.zeros((*img_array.shape, 3), dtype=np.uint8)
+        for i in range(3):
+            if tint_color[i] > 0:
+                colored_array[..., i] = (
+                    img_array.astype(float) * tint_color[i] / 255
+                ).astype(np.uint8)
+        img = Image.fromarray(colored_array, "RGB")
+    elif img_array.ndim == 2:
+        img = Image.fromarray(img_array, "L")
+    elif img_array.shape[-1] == 4:
+        # RGBA mode
+        img = Image.fromarray(img_array, "RGBA")
+    elif img_array.shape[-1] == 3:
+        # RGB mode
+        img = Image.fromarray(img_array, "RGB")
+    else:
+        # Fallback to RGB
+        img = Image.fromarray(img_array, "RGB")
+
+    if size:
+        img = img.resize(size, Image.NEAREST)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _attach_shared_memory(name: str):
+    """
+    Attaches to the parent's block. Pool workers share the parent's resource
+    tracker, so the (pre-3.13) implicit re-register is a no-op and the parent's
+    unlink() remains the single owner of the block's lifetime.
+    """
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def encode_png_slice(
+    shm_name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+    start: int,
+    stop: int,
+    size: Optional[Tuple[int, int]],
+    tint_color: Optional[Tuple[int, int, int]],
+) -> List[bytes]:
+    """Worker entry point: encodes images[start:stop] from the shared block."""
+    import numpy as np
+
+    shm = _attach_shared_memory(shm_name)
+    images = None
+    try:
+        images = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        return [encode_png(images[i], size, tint_color) for i in range(start, stop)]
+    finally:
+        images = None  # release the buffer export before closing
+        shm.close()
@@ -9,6 +9,8 @@ from fastapi import APIRouter, Request, HTTPException, Depends, Form, Query, sta
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from typing import Optional, Dict, Any, List
 
+from core_deps import get_actor_handle
+
 from .actor import ExperimentActor
 
 logger = logging.getLogger(__name__)
@@ -18,33 +20,6 @@ bp = APIRouter()
 # Router-level dependency ensures authentication. Routes access user from request.state
 
 
-async def get_actor_handle(request: Request) -> "ray.actor.ActorHandle":
-    """FastAPI Dependency to get the Event Zero actor handle."""
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-    
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("Server error: slug_id not found in request state.")
-        raise HTTPException(500, "Server error: slug_id not found in request state.")
-    
-    actor_name = f"{slug_id}-actor"
-    
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' found no process running.")
-        raise HTTPException(503, f"Experiment service '{actor_name}' is not running.")
-    except Exception as e:
-        logger.error(f"Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
-
-
 def get_user_id_for_actor(user: Dict[str, Any]) -> str:
     """Extract user_id from user dict (from sub-auth or platform auth)."""
     # Try experiment user ID first (from sub-auth), then fall back to platform user ID
@@ -14,6 +14,9 @@ from pydantic import BaseModel, Field
 from typing import Any, Dict, Optional
 from pathlib import Path
 
+from actor_registry import untracked
+from core_deps import resolve_actor_handle
+from ws_hub import ws_hub
 from .actor import ExperimentActor
 
 logger = logging.getLogger(__name__)
@@ -23,36 +26,10 @@ bp = APIRouter()
 EXPERIMENT_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(EXPERIMENT_DIR / "templates"))
 
-# Connection manager for WebSocket connections
-# { "game_id": { "player_id": WebSocket } }
-active_connections: Dict[str, Dict[str, WebSocket]] = {}
 
-
-def get_actor_handle(request: Request) -> "ray.actor.ActorHandle":
-    """FastAPI Dependency to get the Game Portal actor handle."""
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=503,
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-    
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("Server error: slug_id not found in request state.")
-        raise HTTPException(500, "Server error: slug_id not found in request state.")
-    
-    actor_name = f"{slug_id}-actor"
-    
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' found no process running.")
-        raise HTTPException(503, f"Experiment service '{actor_name}' is not running.")
-    except Exception as e:
-        logger.error(f"Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
+def game_room(game_id: str) -> str:
+    """ws_hub room of a game; members are keyed by player_id."""
+    return f"game_portal:{game_id}"
 
 
 async def get_actor_handle_ws(websocket: WebSocket) -> "ray.actor.ActorHandle":
@@ -69,9 +46,10 @@ async def get_actor_handle_ws(websocket: WebSocket) -> "ray.actor.ActorHandle":
     
     actor_name = f"{slug_id}-actor"
     try:
-        return ray.get_actor(actor_name, namespace="modular_labs")
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' not found in WebSocket")
+        # Sticky on game_id, so the replica that owns the game (and runs its AI turns) serves it
+        return resolve_actor_handle(websocket, sticky_value=websocket.path_params.get("game_id"))
+    except HTTPException as e:
+        logger.error(f"CRITICAL: Actor '{actor_name}' not available in WebSocket: {e.detail}")
         await websocket.close(code=503, reason="Service unavailable")
         return None
     except Exception as e:
@@ -80,64 +58,75 @@ async def get_actor_handle_ws(websocket: WebSocket) -> "ray.actor.ActorHandle":
         return None
 
 
-async def broadcast_to_game(game_id: str, message: Dict[str, Any]):
-    """Broadcast message to all players in a game."""
-    if game_id in active_connections:
-        for player_id, connection in active_connections[game_id].items():
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to {player_id}: {e}")
+def broadcast_to_game(game_id: str, message: Dict[str, Any]):
+    """Broadcast message to all players in a game (on any worker)."""
+    ws_hub.publish(game_room(game_id), message)
 
 
-async def send_to_player(game_id: str, player_id: str, message: Dict[str, Any]):
-    """Send message to a specific player."""
-    if game_id in active_connections and player_id in active_connections[game_id]:
-        try:
-            await active_connections[game_id][player_id].send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending to {player_id}: {e}")
+def send_to_player(game_id: str, player_id: str, message: Dict[str, Any]):
+    """Send message to a specific player (on any worker)."""
+    ws_hub.publish(game_room(game_id), message, to=player_id)
 
 
-async def process_ai_moves_with_broadcast(actor, game_id: str, player_ids: list):
-    """Processes AI moves and broadcasts state updates after each move."""
-    max_iterations = 20
-    iteration = 0
-    
-    while iteration < max_iterations:
-        iteration += 1
-        
-        # Process a single AI move
-        result = await actor.process_single_ai_move.remote(game_id)
-        
-        # Always broadcast updated state after AI move
-        updated_game = await actor.get_game.remote(game_id)
-        if not updated_game:
-            break
-        
-        players_with_ai_status = []
-        for p in updated_game.get('players', []):
-            player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-            pid = player_dict.get('player_id', player_dict)
-            player_dict['isAI'] = await actor.is_ai_player.remote(game_id, pid)
-            players_with_ai_status.append(player_dict)
-        
-        for pid in player_ids:
-            sanitized = await actor.sanitize_game_state_for_player.remote(
-                updated_game.get('game_type'), updated_game.get('game_state'), pid
-            )
-            await send_to_player(game_id, pid, {
-                "type": "state_update",
-                "game_state": sanitized,
-                "players": players_with_ai_status
-            })
-        
-        # Check if we should continue
-        if not result.get('continue', False):
-            break
-        
-        # Small delay between AI moves for better UX
-        await asyncio.sleep(0.3)
+async def broadcast_game_state(actor, game_id: str, message_type: str, player_ids: Optional[list] = None) -> Optional[Dict[str, Any]]:
+    """
+    Sends each player their sanitized game state. One actor call returns every view
+    (and the players with AI flags); the hub then writes to all players concurrently.
+    Returns the actor's snapshot, or None if the game no longer exists.
+    """
+    snapshot = await actor.get_player_views.remote(game_id, player_ids)
+    send_game_state(game_id, message_type, snapshot)
+    return snapshot
+
+
+def send_game_state(game_id: str, message_type: str, snapshot: Optional[Dict[str, Any]]):
+    """Sends the per-player views of a get_player_views snapshot."""
+    if not snapshot:
+        return
+    players_with_ai_status = snapshot["players"]
+    for pid, view in snapshot["views"].items():
+        send_to_player(game_id, pid, {
+            "type": message_type,
+            "game_state": view,
+            "players": players_with_ai_status
+        })
+
+
+# Games whose AI turns this worker is broadcasting: { "game_id": Task }
+ai_followers: Dict[str, asyncio.Task] = {}
+
+
+def follow_ai_turns(actor, game_id: str, snapshot: Optional[Dict[str, Any]]):
+    """
+    Broadcasts AI moves as the actor's turn scheduler plays them. The actor paces the
+    moves; this only waits on next_update, so there is no polling. At most one
+    follower runs per game in this worker: a newer one replaces the previous one.
+    """
+    if not snapshot or not snapshot.get("ai_pending"):
+        return
+    previous = ai_followers.get(game_id)
+    if previous is not None:
+        previous.cancel()
+    # next_update is a long poll; counted as outstanding it would skew least-loaded dispatch
+    ai_followers[game_id] = asyncio.create_task(_follow_ai_turns(untracked(actor), game_id, snapshot["move_seq"]))
+
+
+async def _follow_ai_turns(actor, game_id: str, seq: int):
+    try:
+        while True:
+            snapshot = await actor.next_update.remote(game_id, seq)
+            if not snapshot:
+                break
+            if snapshot["move_seq"] > seq:
+                seq = snapshot["move_seq"]
+                send_game_state(game_id, "state_update", snapshot)
+            if not snapshot.get("ai_pending"):
+                break
+    except Exception as e:
+        logger.error(f"Error broadcasting AI turns for game {game_id}: {e}", exc_info=True)
+    finally:
+        if ai_followers.get(game_id) is asyncio.current_task():
+            del ai_followers[game_id]
 
 
 # --- HTTP API Models ---
@@ -164,7 +153,7 @@ async def index(request: Request):
 @bp.post("/api/game/create")
 async def create_game(request: Request, create_req: CreateGameRequest):
     """Creates a new game lobby."""
-    actor = get_actor_handle(request)
+    actor = resolve_actor_handle(request)
     result = await actor.create_game.remote(
         player_id=create_req.player_id,
         game_type=create_req.game_type,
@@ -176,11 +165,11 @@ async def create_game(request: Request, create_req: CreateGameRequest):
 @bp.post("/api/game/{game_id}/join")
 async def join_game(request: Request, game_id: str, join_req: JoinGameRequest):
     """Allows a new player to join a waiting game."""
-    actor = get_actor_handle(request)
+    actor = resolve_actor_handle(request)
     result = await actor.join_game.remote(game_id, join_req.player_id)
     
     # Notify lobby via WebSocket
-    await broadcast_to_game(game_id, {
+    broadcast_to_game(game_id, {
         "type": "player_joined",
         "player_id": join_req.player_id
     })
@@ -196,44 +185,32 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_id: str)
     if not actor:
         return
     
-    # Verify game and player
-    game = await actor.get_game.remote(game_id)
+    # Verify game and player (one call also returns this player's view)
+    game = await actor.get_player_views.remote(game_id, [player_id])
     if not game:
         await websocket.close(code=1008, reason="Game not found")
         return
     
-    player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in game.get('players', [])]
+    player_ids = [p['player_id'] for p in game['players']]
     if player_id not in player_ids:
         await websocket.close(code=1008, reason="Player not in game")
         return
     
     # Connect
     await websocket.accept()
-    if game_id not in active_connections:
-        active_connections[game_id] = {}
-    active_connections[game_id][player_id] = websocket
+    connection = ws_hub.connect(websocket, key=player_id)
+    ws_hub.join(connection, game_room(game_id))
     logger.info(f"Player {player_id} connected to game {game_id}.")
     
     # Send initial state
-    sanitized_state = await actor.sanitize_game_state_for_player.remote(
-        game.get('game_type'), game.get('game_state'), player_id
-    )
-    
-    # Mark AI players
-    players_with_ai_status = []
-    for p in game.get('players', []):
-        player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-        player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-        players_with_ai_status.append(player_dict)
-    
-    await websocket.send_json({
+    connection.send({
         "type": "connection_success",
-        "game_state": sanitized_state,
-        "players": players_with_ai_status,
+        "game_state": game['views'][player_id],
+        "players": game['players'],
         "game_type": game.get('game_type')
     })
     
-    await broadcast_to_game(game_id, {
+    broadcast_to_game(game_id, {
         "type": "player_connected",
         "player_id": player_id
     })
@@ -246,40 +223,24 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_id: str)
             # Get fresh game state
             current_game = await actor.get_game.remote(game_id)
             if not current_game:
-                await websocket.send_json({"type": "error", "message": "Game not found"})
+                connection.send({"type": "error", "message": "Game not found"})
                 continue
             
             if action_type == 'start_game':
                 if current_game.get('host_id') != player_id:
-                    await websocket.send_json({"type": "error", "message": "Only the host can start."})
+                    connection.send({"type": "error", "message": "Only the host can start."})
                     continue
                 
                 result = await actor.start_game.remote(game_id, player_id)
                 if result.get('error'):
-                    await websocket.send_json({"type": "error", "message": result['error']})
+                    connection.send({"type": "error", "message": result['error']})
                     continue
                 
                 # Broadcast game started
-                updated_game = await actor.get_game.remote(game_id)
-                players_with_ai_status = []
-                for p in updated_game.get('players', []):
-                    player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                    player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                    players_with_ai_status.append(player_dict)
+                snapshot = await broadcast_game_state(actor, game_id, "game_started")
                 
-                player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in updated_game.get('players', [])]
-                for pid in player_ids:
-                    sanitized = await actor.sanitize_game_state_for_player.remote(
-                        updated_game.get('game_type'), updated_game.get('game_state'), pid
-                    )
-                    await send_to_player(game_id, pid, {
-                        "type": "game_started",
-                        "game_state": sanitized,
-                        "players": players_with_ai_status
-                    })
-                
-                # Process AI moves with state broadcasting
-                await process_ai_moves_with_broadcast(actor, game_id, player_ids)
+                # Broadcast AI moves as the actor plays them
+                follow_ai_turns(actor, game_id, snapshot)
             
             elif action_type == 'make_move':
                 try:
@@ -287,139 +248,60 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_id: str)
                         game_id, player_id, data.get('move_data', {})
                     )
                     if result.get('error'):
-                        await websocket.send_json({"type": "error", "message": result['error']})
+                        connection.send({"type": "error", "message": result['error']})
                         continue
                     
                     # Broadcast updated state
-                    updated_game = await actor.get_game.remote(game_id)
-                    players_with_ai_status = []
-                    for p in updated_game.get('players', []):
-                        player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                        player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                        players_with_ai_status.append(player_dict)
-                    
-                    player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in updated_game.get('players', [])]
-                    for pid in player_ids:
-                        sanitized = await actor.sanitize_game_state_for_player.remote(
-                            updated_game.get('game_type'), updated_game.get('game_state'), pid
-                        )
-                        await send_to_player(game_id, pid, {
-                            "type": "state_update",
-                            "game_state": sanitized,
-                            "players": players_with_ai_status
-                        })
+                    snapshot = await broadcast_game_state(actor, game_id, "state_update")
                     
-                    # Process AI moves with state broadcasting
-                    await process_ai_moves_with_broadcast(actor, game_id, player_ids)
+                    # Broadcast AI moves as the actor plays them
+                    follow_ai_turns(actor, game_id, snapshot)
                 except Exception as e:
                     logger.error(f"Error processing move: {e}", exc_info=True)
-                    await websocket.send_json({"type": "error", "message": f"Failed to process move: {str(e)}"})
+                    connection.send({"type": "error", "message": f"Failed to process move: {str(e)}"})
             
             elif action_type == 'ready_for_next_round':
                 result = await actor.ready_for_next_round.remote(game_id, player_id)
                 if result.get('error'):
-                    await websocket.send_json({"type": "error", "message": result['error']})
+                    connection.send({"type": "error", "message": result['error']})
                     continue
                 
                 # Broadcast updated state
-                updated_game = await actor.get_game.remote(game_id)
-                players_with_ai_status = []
-                for p in updated_game.get('players', []):
-                    player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                    player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                    players_with_ai_status.append(player_dict)
-                
-                player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in updated_game.get('players', [])]
-                for pid in player_ids:
-                    sanitized = await actor.sanitize_game_state_for_player.remote(
-                        updated_game.get('game_type'), updated_game.get('game_state'), pid
-                    )
-                    await send_to_player(game_id, pid, {
-                        "type": "state_update",
-                        "game_state": sanitized,
-                        "players": players_with_ai_status
-                    })
+                await broadcast_game_state(actor, game_id, "state_update")
                 
                 # Check if all ready and start next round
                 if result.get('all_ready'):
                     await asyncio.sleep(0.5)
                     await actor.start_next_round.remote(game_id)
-                    updated_game = await actor.get_game.remote(game_id)
-                    players_with_ai_status = []
-                    for p in updated_game.get('players', []):
-                        player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                        player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                        players_with_ai_status.append(player_dict)
+                    snapshot = await broadcast_game_state(actor, game_id, "state_update")
                     
-                    for pid in player_ids:
-                        sanitized = await actor.sanitize_game_state_for_player.remote(
-                            updated_game.get('game_type'), updated_game.get('game_state'), pid
-                        )
-                        await send_to_player(game_id, pid, {
-                            "type": "state_update",
-                            "game_state": sanitized,
-                            "players": players_with_ai_status
-                        })
-                    
-                    await process_ai_moves_with_broadcast(actor, game_id, player_ids)
+                    follow_ai_turns(actor, game_id, snapshot)
             
             elif action_type == 'ready_for_next_hand':
                 result = await actor.ready_for_next_hand.remote(game_id, player_id)
                 if result.get('error'):
-                    await websocket.send_json({"type": "error", "message": result['error']})
+                    connection.send({"type": "error", "message": result['error']})
                     continue
                 
                 # Broadcast updated state
-                updated_game = await actor.get_game.remote(game_id)
-                players_with_ai_status = []
-                for p in updated_game.get('players', []):
-                    player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                    player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                    players_with_ai_status.append(player_dict)
-                
-                player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in updated_game.get('players', [])]
-                for pid in player_ids:
-                    sanitized = await actor.sanitize_game_state_for_player.remote(
-                        updated_game.get('game_type'), updated_game.get('game_state'), pid
-                    )
-                    await send_to_player(game_id, pid, {
-                        "type": "state_update",
-                        "game_state": sanitized,
-                        "players": players_with_ai_status
-                    })
+                await broadcast_game_state(actor, game_id, "state_update")
                 
                 # Check if all ready and start next hand
                 if result.get('all_ready'):
                     await asyncio.sleep(0.5)
                     await actor.start_next_hand.remote(game_id)
-                    updated_game = await actor.get_game.remote(game_id)
-                    players_with_ai_status = []
-                    for p in updated_game.get('players', []):
-                        player_dict = p.copy() if isinstance(p, dict) else {"player_id": p}
-                        player_dict['isAI'] = await actor.is_ai_player.remote(game_id, player_dict.get('player_id', player_dict))
-                        players_with_ai_status.append(player_dict)
-                    
-                    for pid in player_ids:
-                        sanitized = await actor.sanitize_game_state_for_player.remote(
-                            updated_game.get('game_type'), updated_game.get('game_state'), pid
-                        )
-                        await send_to_player(game_id, pid, {
-                            "type": "state_update",
-                            "game_state": sanitized,
-                            "players": players_with_ai_status
-                        })
+                    snapshot = await broadcast_game_state(actor, game_id, "state_update")
                     
-                    await process_ai_moves_with_broadcast(actor, game_id, player_ids)
+                    follow_ai_turns(actor, game_id, snapshot)
     
     except WebSocketDisconnect:
         logger.info(f"Player {player_id} disconnected from game {game_id}.")
-        if game_id in active_connections and player_id in active_connections[game_id]:
-            del active_connections[game_id][player_id]
-        await broadcast_to_game(game_id, {
+        ws_hub.disconnect(connection)
+        broadcast_to_game(game_id, {
             "type": "player_disconnected",
             "player_id": player_id
         })
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
-        if game_id in active_connections and player_id in active_connections[game_id]:
-            del active_connections[game_id][player_id]
+    finally:
+        ws_hub.disconnect(connection)
@@ -3,10 +3,10 @@ Game Portal Actor
 Ray Actor that handles all game portal operations including Blackjack and Dominoes.
 """
 
+import os
 import logging
 import random
 import string
-import json
 import asyncio
 from typing import Dict, Any, List, Optional
 
@@ -15,6 +15,7 @@ from experiment_db import create_actor_database
 
 from . import blackjack_logic
 from . import domino_logic
+from .game_store import GameStore
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +25,18 @@ GAME_LOGIC_MODULES = {
     "blackjack": blackjack_logic,
 }
 
+# Pause before each AI move so players can follow the table (pure UX pacing, no I/O)
+GAME_AI_MOVE_DELAY_SECONDS = float(os.getenv("GAME_AI_MOVE_DELAY_SECONDS", "0.8"))
+# How long next_update waits for a change before returning the current state
+GAME_UPDATE_WAIT_SECONDS = 30.0
+
 
 @ray.remote
 class ExperimentActor:
     """
     Game Portal Ray Actor.
     Handles all game operations including game creation, joining, moves, and AI players.
+    Live games are held in memory by a GameStore and persisted write-behind (see game_store.py).
     """
     
     def __init__(
@@ -59,9 +66,13 @@ class ExperimentActor:
             logger.critical(f"[GamePortalActor] ❌ CRITICAL: Failed to init DB: {e}")
             self.db = None
         
-        # Track AI players (players without WebSocket connections)
-        # { "game_id": set(["player_id1", "player_id2"]) }
-        self.ai_players: Dict[str, set] = {}
+        # Live games (source of truth) with write-behind persistence to Mongo
+        self.store = GameStore(self.db, GAME_LOGIC_MODULES)
+        
+        # AI turn scheduler: at most one task per game, started when the turn passes to an AI
+        self._ai_turn_tasks: Dict[str, asyncio.Task] = {}
+        # Per-game change signals for next_update waiters (replaced on every change)
+        self._change_events: Dict[str, asyncio.Event] = {}
     
     # --- Utility Functions ---
     
@@ -88,10 +99,22 @@ class ExperimentActor:
         return 0
     
     def is_ai_player(self, game_id: str, player_id: str) -> bool:
-        """Checks if a player is an AI player."""
-        if game_id not in self.ai_players:
+        """Checks if a player is an AI player (the game must be loaded, e.g. by get_game)."""
+        game = self.store.games.get(game_id)
+        if not game:
             return False
-        return player_id in self.ai_players[game_id]
+        return player_id in game.get('ai_players', [])
+    
+    def get_store_stats(self) -> Dict[str, Any]:
+        """In-memory game store and write-behind counters."""
+        return {**self.store.stats(), "ai_schedulers": len(self._ai_turn_tasks)}
+    
+    def _record(self, game_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Applies a change through the store, wakes next_update waiters and schedules AI turns."""
+        game = self.store.record(game_id, entry)
+        self._notify_change(game_id)
+        self._schedule_ai_turns(game_id)
+        return game
     
     # --- Game Management ---
     
@@ -112,17 +135,17 @@ class ExperimentActor:
             "game_state": None
         }
         
-        await self.db.games.insert_one(game_document)
+        await self.store.create(game_document)
         
         return {"game_id": game_id, "player_id": player_id}
     
     async def get_game(self, game_id: str) -> Optional[Dict[str, Any]]:
         """Gets a game by ID."""
-        return await self.db.games.find_one({"_id": game_id})
+        return await self.store.get(game_id)
     
     async def join_game(self, game_id: str, player_id: str) -> Dict[str, Any]:
         """Allows a new player to join a waiting game."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return {"error": "Game not found."}
         
@@ -143,49 +166,32 @@ class ExperimentActor:
         
         new_player = {"player_id": player_id}
         
-        await self.db.games.update_one(
-            {"_id": game_id},
-            {"$push": {"players": new_player}}
-        )
+        self._record(game_id, {"kind": "set", "fields": {"players": game.get('players', []) + [new_player]}})
         
         return {"game_id": game_id, "player_id": player_id}
     
     async def start_game(self, game_id: str, player_id: str) -> Dict[str, Any]:
         """Starts a game."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return {"error": "Game not found."}
         
         if game.get('host_id') != player_id:
             return {"error": "Only the host can start."}
         
-        player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in game.get('players', [])]
+        players = list(game.get('players', []))
+        ai_player_ids = list(game.get('ai_players', []))
+        player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in players]
         current_count = len(player_ids)
         game_type = game.get('game_type')
         ai_needed = self.get_ai_players_needed(game_type, current_count)
         
         # Auto-fill AI players
-        if ai_needed > 0:
-            ai_players = []
-            for _ in range(ai_needed):
-                ai_player_id = self.generate_player_id()
-                ai_players.append({"player_id": ai_player_id})
-                player_ids.append(ai_player_id)
-            
-            await self.db.games.update_one(
-                {"_id": game_id},
-                {"$push": {"players": {"$each": ai_players}}}
-            )
-            
-            # Track AI players
-            if game_id not in self.ai_players:
-                self.ai_players[game_id] = set()
-            for ai_player in ai_players:
-                self.ai_players[game_id].add(ai_player["player_id"])
-        
-        # Refresh game document
-        game = await self.db.games.find_one({"_id": game_id})
-        player_ids = [p.get('player_id') if isinstance(p, dict) else p for p in game.get('players', [])]
+        for _ in range(ai_needed):
+            ai_player_id = self.generate_player_id()
+            players.append({"player_id": ai_player_id})
+            player_ids.append(ai_player_id)
+            ai_player_ids.append(ai_player_id)
         
         try:
             game_mode = game.get('game_mode', 'classic')
@@ -197,10 +203,12 @@ class ExperimentActor:
                 blackjack_mode = game_mode if game_mode in ['best_of_5', 'best_of_10'] else 'best_of_5'
                 initial_state = logic_module.create_new_game(player_ids, blackjack_mode)
             
-            await self.db.games.update_one(
-                {"_id": game_id},
-                {"$set": {"game_state": initial_state, "status": "in_progress"}}
-            )
+            self._record(game_id, {"kind": "set", "fields": {
+                "players": players,
+                "ai_players": ai_player_ids,
+                "game_state": initial_state,
+                "status": "in_progress"
+            }})
             
             return {"success": True}
         except ValueError as e:
@@ -213,7 +221,7 @@ class ExperimentActor:
     
     async def play_move(self, game_id: str, player_id: str, move_data: Dict[str, Any]) -> Dict[str, Any]:
         """Handles a player's move."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return {"error": "Game not found."}
         
@@ -222,17 +230,11 @@ class ExperimentActor:
             return {"error": "Game not started."}
         
         game_type = game.get('game_type')
-        logic_module = GAME_LOGIC_MODULES.get(game_type)
-        if not logic_module:
+        if game_type not in GAME_LOGIC_MODULES:
             return {"error": "Unknown game type."}
         
         try:
-            new_state = logic_module.play_move(game_state, player_id, move_data)
-            
-            await self.db.games.update_one(
-                {"_id": game_id},
-                {"$set": {"game_state": new_state}}
-            )
+            self._record(game_id, {"kind": "move", "player_id": player_id, "move": move_data})
             
             return {"success": True}
         except ValueError as e:
@@ -243,79 +245,57 @@ class ExperimentActor:
     
     async def ready_for_next_round(self, game_id: str, player_id: str) -> Dict[str, Any]:
         """Marks a player as ready for the next round (Blackjack)."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return {"error": "Game not found."}
         
         if game.get('game_type') != 'blackjack':
             return {"error": "This action is only for blackjack."}
         
-        game_state = game.get('game_state')
+        game_state = game.get('game_state') or {}
         if game_state.get('status') != 'round_finished':
             return {"error": "No round is finished."}
         
-        if 'ready_for_next_round' not in game_state:
-            game_state['ready_for_next_round'] = {}
-        
-        game_state['ready_for_next_round'][player_id] = True
-        
-        # Auto-mark AI players as ready
+        # Mark the player, and all AI players, as ready
         all_players = game_state.get('players', [])
-        for pid in all_players:
-            if self.is_ai_player(game_id, pid) and pid not in game_state['ready_for_next_round']:
-                game_state['ready_for_next_round'][pid] = True
+        ready_ids = [player_id] + [pid for pid in all_players if self.is_ai_player(game_id, pid)]
+        game = self._record(game_id, {"kind": "ready", "field": "ready_for_next_round", "player_ids": ready_ids})
         
-        ready_count = len(game_state['ready_for_next_round'])
+        ready_count = len(game['game_state']['ready_for_next_round'])
         total_players = len(all_players)
         
         all_ready = ready_count >= total_players
         
-        await self.db.games.update_one(
-            {"_id": game_id},
-            {"$set": {"game_state": game_state}}
-        )
-        
         return {"success": True, "all_ready": all_ready}
     
     async def ready_for_next_hand(self, game_id: str, player_id: str) -> Dict[str, Any]:
         """Marks a player as ready for the next hand (Dominoes)."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return {"error": "Game not found."}
         
         if game.get('game_type') != 'dominoes':
             return {"error": "This action is only for dominoes."}
         
-        game_state = game.get('game_state')
+        game_state = game.get('game_state') or {}
         if game_state.get('status') != 'hand_finished':
             return {"error": "No hand is finished."}
         
-        if 'ready_for_next_hand' not in game_state:
-            game_state['ready_for_next_hand'] = {}
-        
-        game_state['ready_for_next_hand'][player_id] = True
-        
-        # Auto-mark AI players as ready
+        # Mark the player, and all AI players, as ready
         all_players = game_state.get('players', [])
-        for pid in all_players:
-            if self.is_ai_player(game_id, pid) and pid not in game_state['ready_for_next_hand']:
-                game_state['ready_for_next_hand'][pid] = True
+        ready_ids = [player_id] + [pid for pid in all_players if self.is_ai_player(game_id, pid)]
+        game = self._record(game_id, {"kind": "ready", "field": "ready_for_next_hand", "player_ids": ready_ids})
         
-        ready_count = len(game_state['ready_for_next_hand'])
+        ready_count = len(game['game_state']['ready_for_next_hand'])
         total_players = len(all_players)
         
         all_ready = ready_count >= total_players
         
-        await self.db.games.update_one(
-            {"_id": game_id},
-            {"$set": {"game_state": game_state}}
-        )
-        
         return {"success": True, "all_ready": all_ready}
     
     async def start_next_round(self, game_id: str):
         """Starts the next round (Blackjack)."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return
         
@@ -335,14 +315,11 @@ class ExperimentActor:
         next_round_state['wins_needed'] = game_state.get('wins_needed', 3)
         next_round_state['log'] = [f"🔄 Starting Round #{next_round_number}..."] + next_round_state['log']
         
-        await self.db.games.update_one(
-            {"_id": game_id},
-            {"$set": {"game_state": next_round_state}}
-        )
+        self._record(game_id, {"kind": "set", "fields": {"game_state": next_round_state}})
     
     async def start_next_hand(self, game_id: str):
         """Starts the next hand (Dominoes)."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return
         
@@ -401,16 +378,13 @@ class ExperimentActor:
         next_hand_state['team_scores'] = game_state.get('team_scores')
         next_hand_state['log'] = [f"🔄 Starting Hand #{next_hand_number}..."] + next_hand_state['log']
         
-        await self.db.games.update_one(
-            {"_id": game_id},
-            {"$set": {"game_state": next_hand_state}}
-        )
+        self._record(game_id, {"kind": "set", "fields": {"game_state": next_hand_state}})
     
     # --- AI Player Logic ---
     
     async def make_ai_move_blackjack(self, game_id: str, player_id: str):
         """Simple AI for blackjack: hit if value < 17, otherwise stand."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return
         
@@ -429,7 +403,7 @@ class ExperimentActor:
     
     async def make_ai_move_dominoes(self, game_id: str, player_id: str):
         """Simple AI for dominoes: play first valid tile, or draw if none, or pass."""
-        game = await self.db.games.find_one({"_id": game_id})
+        game = await self.store.get(game_id)
         if not game:
             return
         
@@ -471,122 +445,152 @@ class ExperimentActor:
         move_data = {"action": "pass"}
         await self.play_move(game_id, player_id, move_data)
     
-    async def process_ai_moves(self, game_id: str):
-        """Processes AI moves until it's a human player's turn or the game ends."""
-        max_iterations = 20
-        iteration = 0
-        
-        while iteration < max_iterations:
-            iteration += 1
-            
-            game = await self.db.games.find_one({"_id": game_id})
-            if not game:
-                break
-            
-            game_state = game.get('game_state')
-            if not game_state:
-                break
-            
-            if game_state.get('status') != 'in_progress':
-                break
-            
-            current_turn_index = game_state.get('current_turn_index', 0)
-            if current_turn_index >= len(game_state.get('players', [])):
-                break
-            
-            current_player_id = game_state['players'][current_turn_index]
-            
-            # Check if current player is AI
-            if not self.is_ai_player(game_id, current_player_id):
-                break  # It's a human player's turn, stop processing
-            
-            # Make AI move
-            try:
-                game_type = game.get('game_type')
-                if game_type == 'blackjack':
-                    await self.make_ai_move_blackjack(game_id, current_player_id)
-                elif game_type == 'dominoes':
-                    await self.make_ai_move_dominoes(game_id, current_player_id)
-                else:
-                    break
-                
-                # Small delay to make AI moves visible
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                logger.error(f"Error processing AI move for {current_player_id}: {e}", exc_info=True)
-                break
-    
-    async def process_single_ai_move(self, game_id: str) -> Dict[str, Any]:
-        """Processes a single AI move and returns whether to continue processing."""
-        game = await self.db.games.find_one({"_id": game_id})
+    async def make_ai_move(self, game_id: str, player_id: str):
+        """Plays one move for an AI player."""
+        game = await self.store.get(game_id)
         if not game:
-            return {"continue": False, "game_state": None}
-        
+            return
+        game_type = game.get('game_type')
+        if game_type == 'blackjack':
+            await self.make_ai_move_blackjack(game_id, player_id)
+        elif game_type == 'dominoes':
+            await self.make_ai_move_dominoes(game_id, player_id)
+    
+    def _ai_turn_player(self, game_id: str) -> Optional[str]:
+        """The AI player whose turn it is in a live, in-progress game, if any."""
+        game = self.store.games.get(game_id)
+        if not game:
+            return None
         game_state = game.get('game_state')
-        if not game_state:
-            return {"continue": False, "game_state": None}
-        
-        if game_state.get('status') != 'in_progress':
-            return {"continue": False, "game_state": game_state}
+        if not game_state or game_state.get('status') != 'in_progress':
+            return None
         
         current_turn_index = game_state.get('current_turn_index', 0)
         if current_turn_index >= len(game_state.get('players', [])):
-            return {"continue": False, "game_state": game_state}
-        
+            return None
         current_player_id = game_state['players'][current_turn_index]
-        
-        # Check if current player is AI
-        if not self.is_ai_player(game_id, current_player_id):
-            return {"continue": False, "game_state": game_state}
-        
-        # Make AI move
+        return current_player_id if current_player_id in game.get('ai_players', []) else None
+    
+    # --- AI Turn Scheduler ---
+    
+    def _schedule_ai_turns(self, game_id: str):
+        """Starts the game's AI turn task if an AI is up and none is running (one per game)."""
+        task = self._ai_turn_tasks.get(game_id)
+        if task is not None and not task.done():
+            return
+        if self._ai_turn_player(game_id) is None:
+            return
+        self._ai_turn_tasks[game_id] = asyncio.get_running_loop().create_task(self._run_ai_turns(game_id))
+    
+    async def _run_ai_turns(self, game_id: str):
+        """Plays AI turns from memory, paced by GAME_AI_MOVE_DELAY_SECONDS, until a human is up."""
         try:
-            game_type = game.get('game_type')
-            if game_type == 'blackjack':
-                await self.make_ai_move_blackjack(game_id, current_player_id)
-            elif game_type == 'dominoes':
-                await self.make_ai_move_dominoes(game_id, current_player_id)
-            else:
-                return {"continue": False, "game_state": game_state}
-            
-            # Get updated game state
-            updated_game = await self.db.games.find_one({"_id": game_id})
-            updated_state = updated_game.get('game_state') if updated_game else None
-            
-            # Small delay to make AI moves visible
-            await asyncio.sleep(0.5)
-            
-            # Check if we should continue (if next turn is also AI)
-            if updated_state and updated_state.get('status') == 'in_progress':
-                next_turn_index = updated_state.get('current_turn_index', 0)
-                if next_turn_index < len(updated_state.get('players', [])):
-                    next_player_id = updated_state['players'][next_turn_index]
-                    if self.is_ai_player(game_id, next_player_id):
-                        return {"continue": True, "game_state": updated_state}
-            
-            return {"continue": False, "game_state": updated_state}
+            while True:
+                ai_player_id = self._ai_turn_player(game_id)
+                if ai_player_id is None:
+                    break
+                
+                await asyncio.sleep(GAME_AI_MOVE_DELAY_SECONDS)
+                if self._ai_turn_player(game_id) != ai_player_id:
+                    continue
+                
+                seq_before = self.store.games[game_id]['move_seq']
+                await self.make_ai_move(game_id, ai_player_id)
+                game = self.store.games.get(game_id)
+                if not game or game['move_seq'] == seq_before:
+                    logger.warning(f"[GamePortalActor] AI {ai_player_id} made no move in game {game_id}; stopping AI turns.")
+                    break
         except Exception as e:
-            logger.error(f"Error processing AI move for {current_player_id}: {e}", exc_info=True)
-            return {"continue": False, "game_state": game_state}
+            logger.error(f"Error processing AI turns for game {game_id}: {e}", exc_info=True)
+        finally:
+            self._ai_turn_tasks.pop(game_id, None)
+            # Followers see that the AI run is over
+            self._notify_change(game_id)
+    
+    def _notify_change(self, game_id: str):
+        event = self._change_events.pop(game_id, None)
+        if event is not None:
+            event.set()
+    
+    async def next_update(self, game_id: str, after_seq: int, timeout: float = GAME_UPDATE_WAIT_SECONDS) -> Optional[Dict[str, Any]]:
+        """
+        Waits until the game changes past `after_seq` (or its AI turns finish, or `timeout`),
+        then returns get_player_views(). Lets the route layer broadcast AI moves as they
+        are played instead of polling.
+        """
+        game = await self.store.get(game_id)
+        if not game:
+            return None
+        if game['move_seq'] <= after_seq and game_id in self._ai_turn_tasks:
+            event = self._change_events.setdefault(game_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get_player_views(game_id)
     
     # --- State Sanitization ---
     
+    async def get_player_views(self, game_id: str, player_ids: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Everything a state broadcast needs in one call: the player list with AI flags and
+        the sanitized game_state for each player (all players of the game by default).
+        Views share the unchanged parts of the live state, so Ray serializes those once.
+        """
+        game = await self.store.get(game_id)
+        if not game:
+            return None
+        
+        ai_player_ids = game.get('ai_players', [])
+        players_with_ai_status = []
+        for p in game.get('players', []):
+            player_dict = dict(p) if isinstance(p, dict) else {"player_id": p}
+            player_dict['isAI'] = player_dict.get('player_id') in ai_player_ids
+            players_with_ai_status.append(player_dict)
+        
+        if player_ids is None:
+            player_ids = [p['player_id'] for p in players_with_ai_status]
+        game_type = game.get('game_type')
+        game_state = game.get('game_state')
+        
+        return {
+            "game_type": game_type,
+            "host_id": game.get('host_id'),
+            "status": game.get('status'),
+            "move_seq": game.get('move_seq', 0),
+            "ai_pending": game_id in self._ai_turn_tasks,
+            "players": players_with_ai_status,
+            "views": {pid: self._sanitize_view(game_type, game_state, pid) for pid in player_ids},
+        }
+    
     async def sanitize_game_state_for_player(self, game_type: str, game_state: Dict[str, Any], player_id: str) -> Dict[str, Any]:
         """Hides sensitive info (other hands, boneyard, dealer card) before sending."""
+        return self._sanitize_view(game_type, game_state, player_id)
+    
+    def _sanitize_view(self, game_type: str, game_state: Dict[str, Any], player_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Per-player view of a game_state. Only the fields that differ are replaced; the rest
+        is shared with `game_state`, which is safe because the store never mutates a
+        state in place (see game_store.py).
+        """
         if not game_state:
             return None
         
-        # Deep copy to avoid modifying original
-        sanitized_state = json.loads(json.dumps(game_state))
+        sanitized_state = dict(game_state)
         
         # Generic sanitization
         if 'hands' in sanitized_state:
+            hands = {}
             for pid, hand_data in sanitized_state['hands'].items():
-                if pid != player_id:
-                    if game_type == 'dominoes':
-                        sanitized_state['hands'][pid] = f"{len(hand_data)} tiles"
-                    elif game_type == 'blackjack':
-                        sanitized_state['hands'][pid]['hand'] = f"{len(hand_data['hand'])} cards"
+                if pid == player_id:
+                    hands[pid] = hand_data
+                elif game_type == 'dominoes':
+                    hands[pid] = f"{len(hand_data)} tiles"
+                elif game_type == 'blackjack':
+                    hands[pid] = {**hand_data, 'hand': f"{len(hand_data['hand'])} cards"}
+                else:
+                    hands[pid] = hand_data
+            sanitized_state['hands'] = hands
         
         if 'boneyard' in sanitized_state:
             if isinstance(sanitized_state['boneyard'], list):
@@ -607,4 +611,3 @@ class ExperimentActor:
                     sanitized_state['dealer_value'] = 11
         
         return sanitized_state
-
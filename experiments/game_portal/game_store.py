@@ -0,0 +1,308 @@
+"""
+Game Portal Game Store
+In-memory game state with write-behind persistence for the Game Portal actor.
+
+The actor is the single owner of the games it serves (the only actor, or the sticky
+replica for a game_id when the manifest declares an actor_pool), so live games are
+kept in memory as the source of truth instead of being re-read and rewritten on every
+move:
+
+- Every change to a game is an entry in an append-only move log (`game_moves`):
+  "move" (a player action, replayed through the game logic, which is deterministic
+  for a given state), "ready" (next round/hand readiness flags) and "set" (top-level
+  fields replaced wholesale: joins, game start, new round/hand; these involve a
+  shuffle, so the resulting state is logged).
+- A background task writes pending entries of all games with one ordered insert_many
+  per flush, and snapshots a game document (`games`, with the `move_seq` it covers) every
+  GAME_SNAPSHOT_EVERY_ENTRIES entries, after "set" entries and when a round, hand or
+  game finishes.
+- A game that is not in memory (actor restart, replica change, eviction) is
+  recovered from its last snapshot plus the log entries after it.
+
+Game states are copy-on-write: each entry installs a fresh game_state, so the flush
+task can hold references to them without copying. Entries recorded within the last
+flush interval are lost if the actor process dies.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+GAME_FLUSH_INTERVAL_SECONDS = float(os.getenv("GAME_FLUSH_INTERVAL_SECONDS", "1.0"))
+GAME_SNAPSHOT_EVERY_ENTRIES = int(os.getenv("GAME_SNAPSHOT_EVERY_ENTRIES", "50"))
+GAME_IDLE_EVICT_SECONDS = float(os.getenv("GAME_IDLE_EVICT_SECONDS", "1800"))
+
+# Game states that end a round, hand or game; they are snapshotted right away
+SETTLED_STATUSES = ("finished", "round_finished", "hand_finished")
+DUPLICATE_KEY_ERROR = 11000
+
+
+def bson_copy(value: Any) -> Any:
+    """Deep copy with tuples turned into lists, i.e. the shape a MongoDB round-trip returns."""
+    if isinstance(value, dict):
+        return {key: bson_copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [bson_copy(item) for item in value]
+    return value
+
+
+class GameStore:
+    """Live game documents for one actor, persisted through the move log (see module docstring)."""
+    
+    def __init__(self, db, logic_modules: Dict[str, Any]):
+        self.db = db
+        self.logic_modules = logic_modules
+        self.games: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._snapshot_due: Set[str] = set()
+        self._snapshot_seq: Dict[str, int] = {}
+        self._last_access: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flush_errors = 0
+        self.entries_written = 0
+        self.snapshots_written = 0
+        self.recovered = 0
+        self.replayed = 0
+    
+    # --- Reads ---
+    
+    async def get(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """The live game document, recovering it from MongoDB if it is not in memory."""
+        game = self.games.get(game_id)
+        if game is None:
+            # Concurrent requests for a game being recovered share one load
+            loading = self._loading.get(game_id)
+            if loading is None:
+                loading = self._loading[game_id] = asyncio.ensure_future(self._load(game_id))
+                loading.add_done_callback(lambda _: self._loading.pop(game_id, None))
+            game = await loading
+        if game is not None:
+            self._last_access[game_id] = time.monotonic()
+        return game
+    
+    async def _load(self, game_id: str) -> Optional[Dict[str, Any]]:
+        game = await self.db.games.find_one({"_id": game_id})
+        if game is None:
+            return None
+        snapshot_seq = game.setdefault("move_seq", 0)
+        replayed = 0
+        cursor = self.db.game_moves.find(
+            {"game_id": game_id, "seq": {"$gt": snapshot_seq}}, sort=[("seq", 1)]
+        )
+        async for entry in cursor:
+            if entry["seq"] != game["move_seq"] + 1:
+                logger.warning(f"[GameStore] Gap in move log of game {game_id} after seq {game['move_seq']}; stopping replay.")
+                break
+            try:
+                self._apply(game, entry)
+            except ValueError as e:
+                logger.warning(f"[GameStore] Could not replay entry {entry['seq']} of game {game_id}: {e}")
+                break
+            game["move_seq"] = entry["seq"]
+            replayed += 1
+        
+        self.games[game_id] = game
+        self._snapshot_seq[game_id] = snapshot_seq
+        self.recovered += 1
+        if replayed:
+            self.replayed += replayed
+            self._snapshot_due.add(game_id)
+            self._ensure_flusher()
+            logger.info(f"[GameStore] Recovered game {game_id}: snapshot at seq {snapshot_seq} + {replayed} log entries.")
+        return game
+    
+    # --- Writes ---
+    
+    async def create(self, game: Dict[str, Any]) -> None:
+        """Inserts a new game document (written through, it anchors recovery) and keeps it live."""
+        game["move_seq"] = 0
+        await self.db.games.insert_one(game)
+        self.games[game["_id"]] = game
+        self._snapshot_seq[game["_id"]] = 0
+        self._last_access[game["_id"]] = time.monotonic()
+    
+    def record(self, game_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Applies `entry` to the live game (which must be loaded) and appends it to the move log.
+        Raises ValueError, leaving the game untouched, if the game logic rejects it.
+        """
+        game = self.games[game_id]
+        if entry["kind"] == "set":
+            entry["fields"] = bson_copy(entry["fields"])
+        self._apply(game, entry)
+        seq = game["move_seq"] + 1
+        game["move_seq"] = seq
+        entry.update(_id=f"{game_id}:{seq}", game_id=game_id, seq=seq, created_at=datetime.now(timezone.utc))
+        self._pending.setdefault(game_id, []).append(entry)
+        
+        status = (game.get("game_state") or {}).get("status")
+        if (
+            entry["kind"] == "set"
+            or status in SETTLED_STATUSES
+            or seq - self._snapshot_seq.get(game_id, 0) >= GAME_SNAPSHOT_EVERY_ENTRIES
+        ):
+            self._snapshot_due.add(game_id)
+        self._ensure_flusher()
+        return game
+    
+    def _apply(self, game: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        """Applies one log entry to a game document, installing a new game_state (copy-on-write)."""
+        kind = entry["kind"]
+        if kind == "move":
+            logic_module = self.logic_modules[game["game_type"]]
+            working_state = bson_copy(game["game_state"])
+            game["game_state"] = bson_copy(logic_module.play_move(working_state, entry["player_id"], entry["move"]))
+        elif kind == "ready":
+            game_state = dict(game["game_state"])
+            flags = dict(game_state.get(entry["field"]) or {})
+            flags.update(dict.fromkeys(entry["player_ids"], True))
+            game_state[entry["field"]] = flags
+            game["game_state"] = game_state
+        elif kind == "set":
+            game.update(entry["fields"])
+        else:
+            raise ValueError(f"Unknown move log entry kind '{kind}'.")
+    
+    # --- Write-behind ---
+    
+    def _ensure_flusher(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), GAME_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[GameStore] Flush failed; keeping changes in memory for the next attempt: {e}")
+            self._evict_idle()
+    
+    async def flush(self) -> None:
+        """Writes pending log entries (one insert_many) and due snapshots."""
+        async with self._flush_lock:
+            try:
+                await self._write_entries()
+                await self._write_snapshots()
+            except Exception:
+                self.flush_errors += 1
+                raise
+            self.flushes += 1
+    
+    async def _write_entries(self) -> None:
+        pending, self._pending = self._pending, {}
+        entries = [entry for game_entries in pending.values() for entry in game_entries]
+        if not entries:
+            return
+        # Ordered, so a failure leaves each game's log a gap-free prefix: recovery then
+        # replays everything written and never reuses a seq that is already stored
+        start = 0
+        try:
+            while start < len(entries):
+                try:
+                    await self.db.game_moves.insert_many(entries[start:], ordered=True)
+                    start = len(entries)
+                except BulkWriteError as e:
+                    details = e.details or {}
+                    errors = details.get("writeErrors") or []
+                    if details.get("writeConcernErrors") or not errors:
+                        raise
+                    index = start + errors[0]["index"]
+                    if errors[0].get("code") != DUPLICATE_KEY_ERROR:
+                        start = index
+                        raise
+                    await self._resolve_duplicate(entries[index])
+                    start = index + 1
+        except Exception:
+            self.entries_written += start
+            self._requeue(entries[start:])
+            raise
+        self.entries_written += len(entries)
+    
+    async def _resolve_duplicate(self, entry: Dict[str, Any]) -> None:
+        """
+        Entries carry deterministic _ids, so a duplicate is either this entry written by
+        an earlier flush, or a stale entry for a reused seq; the live game is built on
+        ours, so a stale one is overwritten.
+        """
+        stored = await self.db.game_moves.find_one({"_id": entry["_id"]})
+        if stored is not None and all(
+            stored.get(key) == bson_copy(value) for key, value in entry.items() if key != "created_at"
+        ):
+            return
+        logger.warning(f"[GameStore] Replacing stale move log entry {entry['_id']}.")
+        update: Dict[str, Any] = {"$set": {key: value for key, value in entry.items() if key != "_id"}}
+        stale_keys = set(stored or {}) - set(entry) - {"_id", "experiment_id"}
+        if stale_keys:
+            update["$unset"] = dict.fromkeys(stale_keys, "")
+        await self.db.game_moves.update_one({"_id": entry["_id"]}, update, upsert=True)
+    
+    def _requeue(self, entries: List[Dict[str, Any]]) -> None:
+        requeued: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            requeued.setdefault(entry["game_id"], []).append(entry)
+        for game_id, game_entries in requeued.items():
+            self._pending[game_id] = game_entries + self._pending.get(game_id, [])
+    
+    async def _write_snapshots(self) -> None:
+        due = list(self._snapshot_due)
+        self._snapshot_due.clear()
+        for index, game_id in enumerate(due):
+            game = self.games.get(game_id)
+            if game is None:
+                continue
+            seq = game["move_seq"]
+            fields = {key: value for key, value in game.items() if key not in ("_id", "experiment_id")}
+            try:
+                # Never let an older snapshot overwrite a newer one
+                await self.db.games.update_one(
+                    {"_id": game_id, "move_seq": {"$not": {"$gte": seq}}},
+                    {"$set": fields}
+                )
+            except Exception:
+                self._snapshot_due.update(due[index:])
+                raise
+            self._snapshot_seq[game_id] = seq
+            self.snapshots_written += 1
+    
+    def _evict_idle(self) -> None:
+        """Drops fully persisted games nobody has touched for GAME_IDLE_EVICT_SECONDS."""
+        cutoff = time.monotonic() - GAME_IDLE_EVICT_SECONDS
+        for game_id in list(self.games):
+            if game_id in self._pending or game_id in self._snapshot_due:
+                continue
+            if self._last_access.get(game_id, 0) < cutoff:
+                del self.games[game_id]
+                self._last_access.pop(game_id, None)
+                self._snapshot_seq.pop(game_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live_games": len(self.games),
+            "pending_entries": sum(len(entries) for entries in self._pending.values()),
+            "snapshots_due": len(self._snapshot_due),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "entries_written": self.entries_written,
+            "snapshots_written": self.snapshots_written,
+            "recovered_games": self.recovered,
+            "replayed_entries": self.replayed,
+        }
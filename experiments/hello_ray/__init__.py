@@ -5,9 +5,10 @@ import ray
 from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-from ray.actor import ActorHandle
 from pathlib import Path  # Import Path
 
+from core_deps import resolve_actor_handle
+
 # Import the actor definition (which must be named 'ExperimentActor')
 from .actor import ExperimentActor
 
@@ -30,50 +31,6 @@ if not INDEX_HTML_FILE.is_file():
 templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
 
 
-def get_actor_handle(request: Request) -> ActorHandle:
-    """
-    Returns the Ray actor handle created by main.py.
-    """
-    # 1. Check if Ray is available in the main app state
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("[HelloRay] Ray is not marked as available in app.state.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Ray Service is unavailable. Check Ray cluster and logs."
-        )
-
-    # 2. Get the slug from request state (set by main.py routing)
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("[HelloRay] Server error: slug_id not found in request state.")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Server error: slug_id not found in request state."
-        )
-
-    try:
-        # 3. Construct actor name from slug (matches naming convention in main.py)
-        actor_name = f"{slug_id}-actor"
-        logger.debug(f"[HelloRay] Looking up actor '{actor_name}' for slug '{slug_id}'...")
-        return ray.get_actor(actor_name, namespace="modular_labs")
-
-    except ValueError as e:
-        # Actor doesn't exist - this is a critical server error
-        logger.error(f"[HelloRay] Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        logger.error("This likely means the actor failed to start during the main app's startup sequence.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Experiment service '{actor_name}' is not running."
-        )
-    except Exception as e:
-        # Other errors
-        logger.error(f"[HelloRay] Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error connecting to Ray actor '{actor_name}'."
-        )
-
-
 @bp.get("/", response_class=HTMLResponse)
 async def hello_ray_index(request: Request):
     """
@@ -89,7 +46,7 @@ async def hello_ray_index(request: Request):
 
     # 2. Get the actor handle
     logger.info("[HelloRay] Getting actor handle...")
-    actor = get_actor_handle(request)
+    actor = resolve_actor_handle(request)
     logger.info(f"[HelloRay] Got actor handle: {actor} (type: {type(actor)})")
 
     # 3. Call the actor method
@@ -9,6 +9,8 @@ from pathlib import Path
 import ray
 from starlette import status
 
+from core_deps import get_actor_handle
+
 from .actor import ExperimentActor
 
 logger = logging.getLogger(__name__)
@@ -19,45 +21,6 @@ templates = Jinja2Templates(directory=str(EXPERIMENT_DIR / "templates"))
 bp = APIRouter()
 
 
-async def get_actor_handle(
-    request: Request
-) -> "ray.actor.ActorHandle":
-    """
-    FastAPI dependency to return the handle to our Ray actor.
-    """
-    
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("[IndexingDemo] Ray is globally unavailable.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-
-    # Get the slug from request state (set by main.py routing)
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("[IndexingDemo] Server error: slug_id not found in request state.")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Server error: slug_id not found in request state."
-        )
-
-    # Construct actor name from slug (matches naming convention in main.py)
-    actor_name = f"{slug_id}-actor"
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"[IndexingDemo] Actor '{actor_name}' not found.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail=f"Experiment service '{actor_name}' is not running."
-        )
-    except Exception as e:
-        logger.error(f"[IndexingDemo] Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
-
-
 @bp.get("/", response_class=HTMLResponse, name="indexing_demo_index")
 async def index(request: Request, actor: Any = Depends(get_actor_handle)):
     """
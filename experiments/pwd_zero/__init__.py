@@ -10,6 +10,8 @@ from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from typing import Optional, Dict, Any
 from bson import ObjectId
 
+from core_deps import get_actor_handle
+
 from .actor import ExperimentActor
 from experiment_auth_restrictions import block_demo_users
 
@@ -17,33 +19,6 @@ logger = logging.getLogger(__name__)
 bp = APIRouter()
 
 
-async def get_actor_handle(request: Request) -> "ray.actor.ActorHandle":
-    """FastAPI Dependency to get the Password Manager actor handle."""
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
-    
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("Server error: slug_id not found in request state.")
-        raise HTTPException(500, "Server error: slug_id not found in request state.")
-    
-    actor_name = f"{slug_id}-actor"
-    
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' found no process running.")
-        raise HTTPException(503, f"Experiment service '{actor_name}' is not running.")
-    except Exception as e:
-        logger.error(f"Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
-
-
 async def get_user_from_request(request: Request) -> Dict[str, Any]:
     """Get authenticated user from sub-auth session."""
     from sub_auth import get_experiment_sub_user
@@ -1,67 +1,95 @@
 """
 WebRTC Demo Experiment
-FastAPI routes that handle WebSocket signaling and delegate to the Ray Actor.
+FastAPI routes that handle WebSocket signaling.
+
+Signaling is relayed by the shared connection hub (ws_hub): room membership is the
+hub room of the signaling room, and offers, answers and ICE candidates are forwarded
+to the other peer as soon as they arrive, without a Ray call or MongoDB write on the
+path. With WEBRTC_DEMO_PERSIST_SIGNALING on, rooms are (re)created in the `rooms`
+collection as they are opened, in one write tagged with a new room generation (so a
+peer joining through another worker finds them right away), and the relayed offers,
+answers and ICE candidates are recorded there, batched into one actor call every
+WEBRTC_DEMO_PERSIST_INTERVAL_SECONDS. Batched messages carry their room generation, so
+a late batch never lands in a room that has been re-created since.
+
+Joining a room that has no peer on this worker falls back to the actor's room lookup
+only when the hub spans workers; with WS_HUB_BACKEND=local a peer on another worker
+could never receive our messages, so the join is refused instead.
+
+WEBRTC_DEMO_SIGNALING_MODE=actor restores the previous behaviour of saving every
+message through the actor before relaying it.
 """
 
+import os
+import asyncio
 import logging
 import json
+import uuid
 import ray
 from fastapi import APIRouter, Request, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+from core_deps import resolve_actor_handle
+from ws_hub import ws_hub, HubConnection
 from .actor import ExperimentActor
 
 logger = logging.getLogger(__name__)
 bp = APIRouter()
 
+WEBRTC_DEMO_SIGNALING_MODE = os.getenv("WEBRTC_DEMO_SIGNALING_MODE", "relay").lower()  # relay | actor
+WEBRTC_DEMO_PERSIST_SIGNALING = os.getenv("WEBRTC_DEMO_PERSIST_SIGNALING", "true").lower() in ("1", "true", "yes")
+WEBRTC_DEMO_PERSIST_INTERVAL_SECONDS = float(os.getenv("WEBRTC_DEMO_PERSIST_INTERVAL_SECONDS", "2.0"))
+
 # Path setup
 EXPERIMENT_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(EXPERIMENT_DIR / "templates"))
 
-# Dictionary to hold active WebSocket connections by room name
-# { "room_name": [ws1, ws2] }
-connected_peers: Dict[str, list] = {}
+
+def signaling_room(room_name: str) -> str:
+    """ws_hub room of a signaling room; peers are keyed by their connection id."""
+    return f"webrtc_demo:{room_name}"
+
+
+# Generation of the rooms that have peers on this worker (see ExperimentActor.reset_room)
+room_generations: Dict[str, str] = {}
 
 
-async def get_actor_handle(request: Request) -> "ray.actor.ActorHandle":
-    """FastAPI Dependency to get the WebRTC Demo actor handle."""
-    if not getattr(request.app.state, "ray_is_available", False):
-        logger.error("Ray is globally unavailable, blocking actor handle request.")
-        raise HTTPException(
-            status_code=503,
-            detail="Ray service is unavailable. Check Ray cluster status."
-        )
+def broadcast(room_name: str, sender: HubConnection, message: Dict[str, Any]):
+    """Helper function to broadcast messages to all peers in a room (on any worker) except the sender."""
+    ws_hub.publish(signaling_room(room_name), message, exclude=sender.key)
+
+
+class SignalingPersister:
+    """Batches relayed signaling messages into one actor.save_signaling_batch call per interval."""
     
-    slug_id = getattr(request.state, "slug_id", None)
-    if not slug_id:
-        logger.error("Server error: slug_id not found in request state.")
-        raise HTTPException(500, "Server error: slug_id not found in request state.")
+    def __init__(self, interval: float = WEBRTC_DEMO_PERSIST_INTERVAL_SECONDS):
+        self.interval = interval
+        self._ops: List[Dict[str, Any]] = []
+        self._actor = None
+        self._task: Optional[asyncio.Task] = None
     
-    actor_name = f"{slug_id}-actor"
+    def record(self, actor, room_name: str, generation: Optional[str], op_type: str, data: Any = None) -> None:
+        self._actor = actor
+        self._ops.append({'room_name': room_name, 'generation': generation, 'type': op_type, 'data': data})
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
     
-    try:
-        handle = ray.get_actor(actor_name, namespace="modular_labs")
-        return handle
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' found no process running.")
-        raise HTTPException(503, f"Experiment service '{actor_name}' is not running.")
-    except Exception as e:
-        logger.error(f"Failed to get actor handle '{actor_name}': {e}", exc_info=True)
-        raise HTTPException(500, "Error connecting to experiment service.")
+    async def _run(self) -> None:
+        # Runs while there is something to write, then exits until the next record()
+        while self._ops:
+            await asyncio.sleep(self.interval)
+            ops, self._ops = self._ops, []
+            try:
+                await self._actor.save_signaling_batch.remote(ops)
+            except Exception as e:
+                # Signaling was already relayed; losing its record only affects the rooms collection
+                logger.warning(f"Failed to persist {len(ops)} signaling message(s): {e}")
 
 
-async def broadcast(room_name: str, sender_ws: WebSocket, message: Dict[str, Any]):
-    """Helper function to broadcast messages to all peers in a room except the sender."""
-    if room_name in connected_peers:
-        for ws in connected_peers[room_name]:
-            if ws != sender_ws:
-                try:
-                    await ws.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to peer in room {room_name}: {e}")
+signaling_persister = SignalingPersister()
 
 
 @bp.get("/", response_class=HTMLResponse, name="webrtc_demo_index")
@@ -77,7 +105,9 @@ async def index(request: Request):
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for WebRTC signaling."""
     await websocket.accept()
+    connection = ws_hub.connect(websocket)
     current_room: Optional[str] = None
+    relay = WEBRTC_DEMO_SIGNALING_MODE != "actor"
     
     # Get actor handle - we need to get it from the app state
     # Since WebSocket doesn't support Depends, we'll get it manually
@@ -93,20 +123,27 @@ async def websocket_endpoint(websocket: WebSocket):
         # Check Ray availability
         if not getattr(websocket.app.state, "ray_is_available", False):
             logger.error("Ray is globally unavailable in WebSocket")
+            ws_hub.disconnect(connection)
             await websocket.close(code=503, reason="Service unavailable")
             return
         
         actor_name = f"{slug_id}-actor"
-        actor = ray.get_actor(actor_name, namespace="modular_labs")
-    except ValueError:
-        logger.error(f"CRITICAL: Actor '{actor_name}' not found in WebSocket")
+        actor = resolve_actor_handle(websocket)
+    except HTTPException as e:
+        logger.error(f"CRITICAL: Actor '{actor_name}' not available in WebSocket: {e.detail}")
+        ws_hub.disconnect(connection)
         await websocket.close(code=503, reason="Service unavailable")
         return
     except Exception as e:
         logger.error(f"Failed to get actor in WebSocket: {e}", exc_info=True)
+        ws_hub.disconnect(connection)
         await websocket.close(code=503, reason="Service unavailable")
         return
     
+    def persist(room_name: str, op_type: str, data: Any = None):
+        if WEBRTC_DEMO_PERSIST_SIGNALING:
+            signaling_persister.record(actor, room_name, room_generations.get(room_name), op_type, data)
+    
     try:
         while True:
             # Receive message from client
@@ -123,56 +160,76 @@ async def websocket_endpoint(websocket: WebSocket):
             # --- Room Management ---
             if action == 'create-room':
                 logger.info(f"User creating room: {room_name}")
-                # Clear any old room data
-                await actor.clear_room.remote(room_name)
-                # Create a new, empty room
-                await actor.create_room.remote(room_name)
+                if not relay:
+                    # Clear any old room data
+                    await actor.clear_room.remote(room_name)
+                    # Create a new, empty room
+                    await actor.create_room.remote(room_name)
+                elif WEBRTC_DEMO_PERSIST_SIGNALING:
+                    # Written through, not batched: a peer on another worker looks the room up on join.
+                    # The new generation makes batches still pending for the old room match nothing.
+                    room_generations[room_name] = uuid.uuid4().hex
+                    await actor.reset_room.remote(room_name, room_generations[room_name])
                 
-                if room_name not in connected_peers:
-                    connected_peers[room_name] = []
-                connected_peers[room_name].append(websocket)
-                await websocket.send_json({'type': 'room-created'})
+                ws_hub.join(connection, signaling_room(room_name))
+                connection.send({'type': 'room-created'})
             
             elif action == 'join-room':
                 logger.info(f"User joining room: {room_name}")
-                room_exists = await actor.room_exists.remote(room_name)
+                room_exists = bool(ws_hub.members(signaling_room(room_name)))
+                if not room_exists and ws_hub.spans_workers:
+                    # The creator may be connected to another worker
+                    if not relay:
+                        room_exists = await actor.room_exists.remote(room_name)
+                    elif WEBRTC_DEMO_PERSIST_SIGNALING:
+                        generation = await actor.get_room_generation.remote(room_name)
+                        room_exists = generation is not None
+                        if room_exists:
+                            room_generations[room_name] = generation
                 
                 if room_exists:
-                    if room_name not in connected_peers:
-                        connected_peers[room_name] = []
-                    connected_peers[room_name].append(websocket)
+                    ws_hub.join(connection, signaling_room(room_name))
                     
-                    await websocket.send_json({'type': 'room-joined'})
+                    connection.send({'type': 'room-joined'})
                     # Notify the *other* peer (the creator) to start the connection
-                    await broadcast(room_name, websocket, {'type': 'peer-joined'})
+                    broadcast(room_name, connection, {'type': 'peer-joined'})
                 else:
-                    await websocket.send_json({'type': 'error', 'message': 'Room not found'})
+                    connection.send({'type': 'error', 'message': 'Room not found'})
             
             # --- WebRTC Signaling ---
             elif action == 'offer':
                 logger.info(f"Got offer for room {room_name}")
                 offer = message.get('offer')
                 # Save offer to MongoDB
-                await actor.save_offer.remote(room_name, offer)
+                if relay:
+                    persist(room_name, 'offer', offer)
+                else:
+                    await actor.save_offer.remote(room_name, offer)
                 # Broadcast the offer to the other peer
-                await broadcast(room_name, websocket, {'type': 'offer', 'offer': offer})
+                broadcast(room_name, connection, {'type': 'offer', 'offer': offer})
             
             elif action == 'answer':
                 logger.info(f"Got answer for room {room_name}")
                 answer = message.get('answer')
                 # Save answer to MongoDB
-                await actor.save_answer.remote(room_name, answer)
+                if relay:
+                    persist(room_name, 'answer', answer)
+                else:
+                    await actor.save_answer.remote(room_name, answer)
                 # Broadcast the answer to the other peer
-                await broadcast(room_name, websocket, {'type': 'answer', 'answer': answer})
+                broadcast(room_name, connection, {'type': 'answer', 'answer': answer})
             
             elif action == 'ice-candidate':
-                logger.info(f"Got ICE candidate for room {room_name}")
+                logger.debug(f"Got ICE candidate for room {room_name}")
                 candidate = message.get('candidate')
                 # Save candidate to MongoDB
                 if candidate:
-                    await actor.save_ice_candidate.remote(room_name, candidate)
+                    if relay:
+                        persist(room_name, 'ice-candidate', candidate)
+                    else:
+                        await actor.save_ice_candidate.remote(room_name, candidate)
                     # Broadcast the candidate to the other peer
-                    await broadcast(room_name, websocket, {'type': 'ice-candidate', 'candidate': candidate})
+                    broadcast(room_name, connection, {'type': 'ice-candidate', 'candidate': candidate})
     
     except WebSocketDisconnect:
         logger.info(f"User disconnected from room {current_room}")
@@ -180,11 +237,9 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}", exc_info=True)
     finally:
         # --- Cleanup ---
-        if current_room and current_room in connected_peers:
-            if websocket in connected_peers[current_room]:
-                connected_peers[current_room].remove(websocket)
-            if not connected_peers[current_room]:
-                del connected_peers[current_room]
+        ws_hub.disconnect(connection)
         # Notify the other peer (if any) that this user left
         if current_room:
-            await broadcast(current_room, websocket, {'type': 'peer-left'})
+            broadcast(current_room, connection, {'type': 'peer-left'})
+            if not ws_hub.members(signaling_room(current_room)):
+                room_generations.pop(current_room, None)
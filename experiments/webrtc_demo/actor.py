@@ -71,6 +71,38 @@ class ExperimentActor:
             logger.error(f"[WebRTCDemoActor] error in clear_room: {e}", exc_info=True)
             return False
 
+    async def reset_room(self, room_name: str, generation: str) -> bool:
+        """
+        (Re)creates an empty room in one write. `generation` tags this incarnation of
+        the room: signaling batches recorded for an older one no longer match it.
+        """
+        try:
+            if not self.db:
+                return False
+            
+            await self.db.rooms.update_one(
+                {'room_name': room_name},
+                {'$set': {'offer': None, 'answer': None, 'ice_candidates': [], 'generation': generation}},
+                upsert=True
+            )
+            logger.info(f"[WebRTCDemoActor] Reset room: {room_name}")
+            return True
+        except Exception as e:
+            logger.error(f"[WebRTCDemoActor] error in reset_room: {e}", exc_info=True)
+            return False
+
+    async def get_room_generation(self, room_name: str) -> Optional[str]:
+        """The room's generation ('' for rooms created without one), or None if it doesn't exist."""
+        try:
+            if not self.db:
+                return None
+            
+            room = await self.db.rooms.find_one({'room_name': room_name}, {'generation': 1})
+            return None if room is None else (room.get('generation') or '')
+        except Exception as e:
+            logger.error(f"[WebRTCDemoActor] error in get_room_generation: {e}", exc_info=True)
+            return None
+
     async def room_exists(self, room_name: str) -> bool:
         """Check if a room exists in MongoDB."""
         try:
@@ -131,6 +163,46 @@ class ExperimentActor:
             logger.error(f"[WebRTCDemoActor] error in save_ice_candidate: {e}", exc_info=True)
             return False
 
+    async def save_signaling_batch(self, ops: List[Dict[str, Any]]) -> int:
+        """
+        Persist a batch of relayed signaling messages (relay mode, see __init__.py).
+        
+        `ops` are {'room_name', 'generation', 'type': 'offer' | 'answer' | 'ice-candidate', 'data'}
+        in arrival order. Rooms are created through reset_room as they are opened; the
+        ops are folded per room generation, so each room costs one write, and ops of a
+        room that has since been re-created match nothing. Returns the number of rooms written.
+        """
+        try:
+            if not self.db:
+                return 0
+            
+            rooms: Dict[tuple, Dict[str, Any]] = {}
+            for op in ops:
+                room = rooms.setdefault((op['room_name'], op.get('generation')), {'set': {}, 'ice_candidates': []})
+                if op['type'] == 'offer':
+                    room['set']['offer'] = op['data']
+                elif op['type'] == 'answer':
+                    room['set']['answer'] = op['data']
+                elif op['type'] == 'ice-candidate':
+                    room['ice_candidates'].append(op['data'])
+            
+            for (room_name, generation), room in rooms.items():
+                update: Dict[str, Any] = {}
+                if room['set']:
+                    update['$set'] = room['set']
+                if room['ice_candidates']:
+                    update['$push'] = {'ice_candidates': {'$each': room['ice_candidates']}}
+                if update:
+                    room_filter: Dict[str, Any] = {'room_name': room_name}
+                    if generation:
+                        room_filter['generation'] = generation
+                    await self.db.rooms.update_one(room_filter, update)
+            logger.debug(f"[WebRTCDemoActor] Saved {len(ops)} signaling message(s) for {len(rooms)} room(s)")
+            return len(rooms)
+        except Exception as e:
+            logger.error(f"[WebRTCDemoActor] error in save_signaling_batch: {e}", exc_info=True)
+            return 0
+
     async def get_room_data(self, room_name: str) -> Optional[Dict[str, Any]]:
         """Get all room data from MongoDB."""
         try:
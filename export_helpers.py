@@ -465,6 +465,14 @@ def create_zip_to_disk(
             if experiment_db.is_file():
                 zf.write(experiment_db, "experiment_db.py")
             
+            actor_registry_file = source_dir / "actor_registry.py"
+            if actor_registry_file.is_file():
+                zf.write(actor_registry_file, "actor_registry.py")
+            
+            ws_hub_file = source_dir / "ws_hub.py"
+            if ws_hub_file.is_file():
+                zf.write(ws_hub_file, "ws_hub.py")
+            
             if dockerfile_content:
                 zf.writestr("Dockerfile", dockerfile_content)
             if docker_compose_content:
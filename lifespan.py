@@ -199,6 +199,30 @@ async def lifespan(app: FastAPI):
         logger.critical(f"❌ CRITICAL ERROR: Failed to connect to MongoDB: {e}", exc_info=True)
         raise RuntimeError(f"MongoDB connection failed: {e}") from e
     
+    # Push-based experiment config cache invalidation (change stream, or polling fallback)
+    from core_deps import experiment_config_watcher
+    experiment_config_watcher.start(db)
+    if await experiment_config_watcher.wait_ready():
+        logger.info(f"✔️ Experiment config cache watcher started ({experiment_config_watcher.mode}).")
+    else:
+        logger.warning("⚠️ Experiment config cache watcher not ready yet; using the short cache TTL until it is.")
+    
+    # Cluster-wide rate limit counters (batched flushes to MongoDB)
+    from rate_limit import start_rate_limit_storage, stop_rate_limit_storage
+    try:
+        if await start_rate_limit_storage(db):
+            logger.info("✔️ Rate limit counters shared via MongoDB.")
+    except Exception as e:
+        logger.error(f"⚠️ Could not attach MongoDB rate limit storage; limits stay per process: {e}", exc_info=True)
+    
+    # WebSocket rooms across workers (WS_HUB_BACKEND=mongo)
+    from ws_hub import ws_hub
+    try:
+        if await ws_hub.start(db):
+            logger.info("✔️ WebSocket hub backend started (MongoDB change stream).")
+    except Exception as e:
+        logger.error(f"⚠️ Could not start the WebSocket hub backend; rooms stay per process: {e}", exc_info=True)
+    
     # Pluggable Authorization Provider Initialization
     AUTHZ_PROVIDER = os.getenv("AUTHZ_PROVIDER", "casbin").lower()
     logger.info(f"Initializing Authorization Provider: '{AUTHZ_PROVIDER}'...")
@@ -277,6 +301,10 @@ async def lifespan(app: FastAPI):
                     pass
                 logger.info("Scheduled export cleanup task cancelled.")
         
+        await experiment_config_watcher.stop()
+        await stop_rate_limit_storage()
+        await ws_hub.stop()
+        
         if hasattr(app.state, "mongo_client") and app.state.mongo_client:
             logger.info("Closing MongoDB connection...")
             app.state.mongo_client.close()
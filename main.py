@@ -97,12 +97,7 @@ except ImportError:
 from ray_decorator import ray_actor
 
 # Middleware
-from middleware import (
-    ExperimentScopeMiddleware,
-    ProxyAwareHTTPSMiddleware,
-    HTTPSEnforcementMiddleware,
-)
-from request_id_middleware import RequestIDMiddleware
+from middleware import PlatformMiddleware
 
 # Rate limiting
 from rate_limit import (
@@ -114,8 +109,12 @@ from rate_limit import (
     EXPORT_LIMIT,
     EXPORT_FILE_LIMIT,
     rate_limit_exceeded_handler,
+    rate_limit_storage_stats,
 )
 from slowapi.errors import RateLimitExceeded
+from experiment_quotas import experiment_admission
+from actor_registry import actor_registry, actor_name_for, retire_actor_replicas
+from ws_hub import ws_hub
 
 # Background tasks
 from background_tasks import (
@@ -208,6 +207,9 @@ try:
     get_experiment_config,
     get_authz_provider,
     require_experiment_access,
+    experiment_config_watcher,
+    warm_experiment_config_cache,
+    experiment_actor_pool,
   )
   # ScopedMongoWrapper is imported above from async_mongo_wrapper
 except ImportError as e:
@@ -224,7 +226,10 @@ except ImportError as e:
 
 # Index Management import
 try:
-  from async_mongo_wrapper import AsyncAtlasIndexManager
+  from async_mongo_wrapper import (
+    AsyncAtlasIndexManager, IndexCatalog, auto_index_queue, query_profiler,
+    actor_query_profile_snapshot, merge_query_profiles
+  )
   INDEX_MANAGER_AVAILABLE = True
 except ImportError:
   INDEX_MANAGER_AVAILABLE = False
@@ -439,22 +444,20 @@ async def general_exception_handler(request: Request, exc: Exception):
 # ============================================================================
 # Middleware Setup
 # ============================================================================
-# Middleware classes are now imported from middleware.py
-# Middleware order matters: 
-# 1. Request ID middleware should run FIRST to track all requests
-# 2. Proxy-aware middleware must run early so request.url is corrected
-# 3. Experiment scope middleware runs after proxy detection
-app.add_middleware(RequestIDMiddleware)  # First: Generate request IDs for tracing
-app.add_middleware(ProxyAwareHTTPSMiddleware)
-app.add_middleware(ExperimentScopeMiddleware)
+# PlatformMiddleware (middleware.py) is a single pure-ASGI pass that, in order:
+# 1. Generates the request ID used for tracing
+# 2. Rewrites scheme/host from proxy headers so request.url is corrected
+# 3. Resolves the experiment scope (after proxy detection)
+# 4. Attaches the lazy principal context (no decoding)
+# 5. Enforces HTTPS on responses (production only)
 G_NOME_ENV = os.getenv("G_NOME_ENV", "production").lower()
 
 if G_NOME_ENV == "production":
-    logger.info("Production environment detected. Enabling proxy-aware HTTPSEnforcementMiddleware.")
+    logger.info("Production environment detected. Enabling proxy-aware HTTPS enforcement.")
     logger.info("HTTPS will only be enforced when requests actually come via HTTPS (detected from proxy headers).")
-    app.add_middleware(HTTPSEnforcementMiddleware)
 else:
     logger.warning(f"Non-production environment ('{G_NOME_ENV}') detected. Skipping HTTPS enforcement.")
+app.add_middleware(PlatformMiddleware, enforce_https=G_NOME_ENV == "production")
 
 # Compression middleware should be added LAST to compress final responses after all other middleware
 # This ensures responses are compressed after HTTPS enforcement and other modifications
@@ -551,7 +554,7 @@ async def login_post(request: Request):
 
 @auth_router.get("/logout", name="logout", response_class=RedirectResponse)
 async def logout(request: Request):
-  token_data = await get_current_user(request.cookies.get("token"))
+  token_data = await get_current_user(request, request.cookies.get("token"))
   user_email = token_data.get("email") if token_data else "Unknown/Expired"
   logger.info(f"User logging out: {user_email}")
   response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
@@ -857,6 +860,14 @@ def _create_zip_to_disk(
       if experiment_db.is_file():
         zf.write(experiment_db, "experiment_db.py")
       
+      actor_registry_file = source_dir / "actor_registry.py"
+      if actor_registry_file.is_file():
+        zf.write(actor_registry_file, "actor_registry.py")
+      
+      ws_hub_file = source_dir / "ws_hub.py"
+      if ws_hub_file.is_file():
+        zf.write(ws_hub_file, "ws_hub.py")
+      
       if dockerfile_content:
         zf.writestr("Dockerfile", dockerfile_content)
       if docker_compose_content:
@@ -1562,7 +1573,23 @@ def _create_intelligent_export_zip(
       logger.debug("Included experiment_db.py")
     else:
       logger.warning("experiment_db.py not found - export may not work correctly")
-
+    
+    # Add actor_registry.py (actor handle pools used by the platform's actor dependencies)
+    actor_registry_file = source_dir / "actor_registry.py"
+    if actor_registry_file.is_file():
+      zf.write(actor_registry_file, "actor_registry.py")
+      logger.debug("Included actor_registry.py")
+    else:
+      logger.warning("actor_registry.py not found - export may not work correctly")
+    
+    # Add ws_hub.py (WebSocket rooms used by the realtime experiments)
+    ws_hub_file = source_dir / "ws_hub.py"
+    if ws_hub_file.is_file():
+      zf.write(ws_hub_file, "ws_hub.py")
+      logger.debug("Included ws_hub.py")
+    else:
+      logger.warning("ws_hub.py not found - WebSocket experiments may not work correctly")
+    
     # Add generated files
     zf.writestr("Dockerfile", dockerfile_content)
     zf.writestr("docker-compose.yml", docker_compose_content)
@@ -2414,10 +2441,11 @@ async def save_manifest(
       config_data = old_config.copy()
       config_data.update(new_manifest_data)
       config_data["slug"] = slug_id
-      update_doc = {"$set": config_data}
     else:
       config_data = {"slug": slug_id, **new_manifest_data}
-      update_doc = {"$set": config_data}
+    # config_version is the change marker the config watcher polls; only ever bump it
+    config_data.pop("config_version", None)
+    update_doc = {"$set": config_data, "$inc": {"config_version": 1}}
 
     await db.experiments_config.update_one({"slug": slug_id}, update_doc, upsert=True)
     # Invalidate application-level config cache after update
@@ -2427,10 +2455,8 @@ async def save_manifest(
     
     # Invalidate cache after update since config has changed
     if hasattr(request.state, "experiment_config_cache"):
-      # Clear all cache entries for this slug_id (including any projections)
-      keys_to_remove = [key for key in request.state.experiment_config_cache.keys() if key.startswith(f"{slug_id}:") or key == slug_id]
-      for key in keys_to_remove:
-        del request.state.experiment_config_cache[key]
+      # One full config per slug is cached (projections are sliced from it)
+      request.state.experiment_config_cache.pop(slug_id, None)
 
     if old_status != new_status:
       logger.info(f"Experiment '{slug_id}' status changed from '{old_status}' to '{new_status}'. Reloading...")
@@ -2524,11 +2550,15 @@ async def delete_experiment_impl(
         try:
           actor_handle = ray.get_actor(actor_name, namespace="modular_labs")
           ray.kill(actor_handle, no_restart=True)
+          actor_registry.invalidate(slug_id)
           logger.info(f"[{slug_id}] ✅ Ray actor '{actor_name}' killed")
           cleanup_results["ray_actor"] = True
         except ValueError:
+          actor_registry.invalidate(slug_id)
           logger.warning(f"[{slug_id}] Ray actor '{actor_name}' not found (may already be stopped)")
           cleanup_results["ray_actor"] = True  # Consider successful if not found
+        # Replica-pool actors ({slug}-actor-1, ...) if the manifest declared an actor_pool
+        retire_actor_replicas(slug_id, keep=1)
       except Exception as e:
         error_msg = f"Failed to kill Ray actor: {e}"
         logger.error(f"[{slug_id}] ❌ {error_msg}", exc_info=True)
@@ -2769,6 +2799,58 @@ async def get_index_status(request: Request, slug_id: str, user: Dict[str, Any]
   return JSONResponse(status_list, headers=no_cache_headers)
 
 
+# How long the query profile endpoint waits for each actor replica's profile
+QUERY_PROFILE_ACTOR_TIMEOUT_SECONDS = float(os.getenv("QUERY_PROFILE_ACTOR_TIMEOUT_SECONDS", "5"))
+
+
+@admin_router.get("/api/query-profile/{slug_id}", response_class=JSONResponse)
+async def get_query_profile(
+  request: Request,
+  slug_id: str,
+  top: int = Query(10, ge=1, le=100),
+  user: Dict[str, Any] = Depends(require_experiment_ownership_or_admin_dep)
+):
+  """
+  Reports the slowest and most frequent query shapes seen for an experiment,
+  each with the compound index it would need as a ready-to-paste
+  `managed_indexes` entry. Combines this worker's profile with the profile of
+  every actor replica of the experiment, where most queries run.
+  Requires QUERY_PROFILER_ENABLED (in the actors' environment too).
+  """
+  no_cache_headers = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0"
+  }
+  if not INDEX_MANAGER_AVAILABLE:
+    return JSONResponse({"error": "Index Management not available."}, status_code=501, headers=no_cache_headers)
+
+  snapshots = [query_profiler.snapshot(slug_id)]
+  sources = ["worker"]
+  pool = experiment_actor_pool(request.app, slug_id) if RAY_AVAILABLE and getattr(request.app.state, "ray_is_available", False) else None
+  if pool is not None:
+    results = await asyncio.gather(
+      *(
+        asyncio.wait_for(handle.__ray_call__.remote(actor_query_profile_snapshot, slug_id), timeout=QUERY_PROFILE_ACTOR_TIMEOUT_SECONDS)
+        for handle in pool.handles
+      ),
+      return_exceptions=True
+    )
+    for replica, result in enumerate(results):
+      if isinstance(result, BaseException):
+        logger.warning(f"[{slug_id}] Could not collect query profile from actor replica {replica}: {result}")
+        actor_registry.report_failure(slug_id, result)
+        continue
+      snapshots.append(result)
+      sources.append(actor_name_for(slug_id, replica))
+
+  report = merge_query_profiles(slug_id, snapshots, top=top)
+  report["sources"] = sources
+  if not report["enabled"]:
+    report["message"] = "Query profiler is disabled. Set QUERY_PROFILER_ENABLED=true to record query shapes."
+  return JSONResponse(report, headers=no_cache_headers)
+
+
 @admin_router.get("/api/get-file-content/{slug_id}", response_class=JSONResponse)
 async def get_file_content(slug_id: str, path: str = Query(...), user: Dict[str, Any] = Depends(require_experiment_ownership_or_admin_dep)):
   experiment_path = (EXPERIMENTS_DIR / slug_id).resolve()
@@ -3650,7 +3732,10 @@ async def upload_experiment_zip(
           config_data["owner_email"] = admin_email
           logger.warning(f"[{slug_id}] Unexpected: Non-admin overwriting admin-managed experiment. Setting owner to '{admin_email}'")
     
-    await db.experiments_config.update_one({"slug": slug_id}, {"$set": config_data}, upsert=True)
+    config_data.pop("config_version", None)
+    await db.experiments_config.update_one(
+      {"slug": slug_id}, {"$set": config_data, "$inc": {"config_version": 1}}, upsert=True
+    )
     if using_b2:
       logger.info(f"[{slug_id}] Updated DB config with new B2 runtime.")
     else:
@@ -3658,10 +3743,8 @@ async def upload_experiment_zip(
     
     # Invalidate cache after update since config has changed
     if hasattr(request.state, "experiment_config_cache"):
-      # Clear all cache entries for this slug_id (including any projections)
-      keys_to_remove = [key for key in request.state.experiment_config_cache.keys() if key.startswith(f"{slug_id}:") or key == slug_id]
-      for key in keys_to_remove:
-        del request.state.experiment_config_cache[key]
+      # One full config per slug is cached (projections are sliced from it)
+      request.state.experiment_config_cache.pop(slug_id, None)
     
     # Also invalidate application-level config cache
     from core_deps import invalidate_experiment_config_cache
@@ -3882,6 +3965,7 @@ async def admin_management_panel(
             "indexes_data": indexes_data,
             "collections_list": sorted(set(collections_list)),
             "users_data": users_data,
+            "experiment_slugs": sorted(getattr(request.app.state, "experiments", {}) or {}),
             "INDEX_MANAGER_AVAILABLE": INDEX_MANAGER_AVAILABLE,
         }
     )
@@ -3972,6 +4056,85 @@ async def api_list_indexes(
     return JSONResponse({"status": "success", "indexes": indexes_data})
 
 
+@admin_router.get("/api/auto-index-stats", response_class=JSONResponse, name="api_auto_index_stats")
+async def api_auto_index_stats(
+    request: Request,
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """
+    API endpoint exposing auto-index internals for this worker process:
+    analysis queue depth/drop counters and the shared index catalog.
+    """
+    if not INDEX_MANAGER_AVAILABLE:
+        return JSONResponse(
+            {"error": "Index Management not available."},
+            status_code=501
+        )
+    return JSONResponse({
+        "status": "success",
+        "pid": os.getpid(),
+        "queue": auto_index_queue.stats(),
+        "catalog": IndexCatalog.stats(),
+    })
+
+
+@admin_router.get("/api/authz-cache-stats", response_class=JSONResponse, name="api_authz_cache_stats")
+async def api_authz_cache_stats(
+    request: Request,
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """
+    API endpoint exposing the authorization decision cache counters for this
+    worker process (hits, misses, coalesced loads, evictions) for sizing.
+    """
+    authz: AuthorizationProvider = await get_authz_provider(request)
+    cache_stats = getattr(authz, "cache_stats", None)
+    if cache_stats is None:
+        return JSONResponse(
+            {"error": f"{type(authz).__name__} does not expose cache stats."},
+            status_code=501
+        )
+    return JSONResponse({
+        "status": "success",
+        "pid": os.getpid(),
+        "provider": type(authz).__name__,
+        "cache": cache_stats(),
+    })
+
+
+@admin_router.get("/api/rate-limit-stats", response_class=JSONResponse, name="api_rate_limit_stats")
+async def api_rate_limit_stats(
+    request: Request,
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """
+    API endpoint exposing this worker's rate limit storage counters (backend,
+    pending hits, flushes, flush errors) and per-experiment quota counters.
+    """
+    return JSONResponse({
+        "status": "success",
+        "pid": os.getpid(),
+        "storage": rate_limit_storage_stats(),
+        "experiments": experiment_admission.stats(),
+    })
+
+
+@admin_router.get("/api/ws-hub-stats", response_class=JSONResponse, name="api_ws_hub_stats")
+async def api_ws_hub_stats(
+    request: Request,
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """
+    API endpoint exposing this worker's WebSocket hub counters (rooms, members,
+    published/delivered messages, slow-consumer evictions, backend state).
+    """
+    return JSONResponse({
+        "status": "success",
+        "pid": os.getpid(),
+        "hub": ws_hub.stats(),
+    })
+
+
 @admin_router.get("/api/indexes/stream", name="api_indexes_stream")
 async def api_indexes_stream(
     request: Request,
@@ -4424,8 +4587,11 @@ async def reload_active_experiments(app: FastAPI):
   logger.info(" Reloading active experiments from DB...")
   try:
     # Limit to 500 active experiments to prevent accidental large result sets
+    config_generation = experiment_config_watcher.generation
     active_cfgs = await db.experiments_config.find({"status": "active"}).limit(500).to_list(None)
     logger.info(f"Found {len(active_cfgs)} active experiment(s).")
+    # Bulk warm-up: these are full documents, so get_experiment_config can serve any projection
+    warm_experiment_config_cache(active_cfgs, generation=config_generation)
     if len(active_cfgs) == 0:
       logger.warning(" ⚠️  No active experiments found! Check experiment status in database.")
       # Try to list all experiments to help debug (limit to 500)
@@ -4452,6 +4618,8 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
   if is_reload:
     logger.debug("Clearing old experiment state...")
     app.state.experiments.clear()
+    experiment_admission.clear()
+    actor_registry.clear()
     # Also clear mounted static paths cache on reload
     if hasattr(app.state, "mounted_static_paths"):
       app.state.mounted_static_paths.clear()
@@ -4631,6 +4799,9 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
       # No auth required
       deps = [Depends(get_current_user)]
 
+    # Per-experiment quotas from manifest.json run before auth so rejected traffic stays cheap
+    deps = experiment_admission.dependencies(slug, cfg) + deps
+
     prefix = f"/experiments/{slug}"
     try:
       app.include_router(proxy_router, prefix=prefix, tags=[f"Experiment: {slug}"], dependencies=deps)
@@ -4666,15 +4837,24 @@ async def _register_experiments(app: FastAPI, active_cfgs: List[Dict[str, Any]],
       continue
 
     actor_name = f"{slug}-actor"
+    # Optional replica pool (manifest "actor_pool"); replica 0 keeps the classic name
+    pool_cfg = cfg.get("actor_pool") or {}
+    replicas = pool_cfg.get("replicas", 1)
     try:
-      actor_handle = actor_cls.options(
-        name=actor_name, namespace="modular_labs", lifetime="detached",
-        get_if_exists=True, max_restarts=-1, runtime_env=actor_runtime_env
-      ).remote(
-        mongo_uri=MONGO_URI, db_name=DB_NAME,
-        write_scope=slug, read_scopes=read_scopes
-      )
-      logger.info(f"[{slug}] Ray Actor '{actor_name}' started in {env_mode.upper()} mode.")
+      actor_handles = [
+        actor_cls.options(
+          name=actor_name_for(slug, replica), namespace="modular_labs", lifetime="detached",
+          get_if_exists=True, max_restarts=-1, runtime_env=actor_runtime_env
+        ).remote(
+          mongo_uri=MONGO_URI, db_name=DB_NAME,
+          write_scope=slug, read_scopes=read_scopes
+        )
+        for replica in range(replicas)
+      ]
+      actor_handle = actor_handles[0]
+      retire_actor_replicas(slug, keep=replicas)
+      logger.info(f"[{slug}] Ray Actor '{actor_name}' started in {env_mode.upper()} mode ({replicas} replica(s)).")
+      actor_registry.register(slug, actor_handles, sticky_key=pool_cfg.get("sticky_key"))
       
       # Call initialize hook if it exists (for post-startup tasks like data seeding)
       if hasattr(actor_cls, "initialize"):
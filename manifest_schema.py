@@ -12,7 +12,7 @@ SCHEMA VERSIONING STRATEGY
 
 Versions:
 - 1.0: Initial schema (default for manifests without version field)
-- 2.0: Current schema with all features (auth_policy, sub_auth, managed_indexes, etc.)
+- 2.0: Current schema with all features (auth_policy, sub_auth, managed_indexes, quotas, actor_pool, etc.)
 
 Migration Strategy:
 - Automatically detects schema version from manifest
@@ -57,6 +57,11 @@ def _get_manifest_hash(manifest_data: Dict[str, Any]) -> str:
     return hashlib.sha256(normalized_str.encode()).hexdigest()[:16]
 
 
+# Rate limit strings accepted by limits.parse_many (e.g. "30 per minute", "5/second; 100/hour")
+_RATE_LIMIT_ITEM = r"\s*\d+\s*(/|per)\s*(\d+\s*)?(second|minute|hour|day|month|year)s?\s*"
+RATE_LIMIT_PATTERN = f"^{_RATE_LIMIT_ITEM}([;,]{_RATE_LIMIT_ITEM})*$"
+
+
 # JSON Schema definition for manifest.json (Version 2.0 - Current)
 MANIFEST_SCHEMA_V2 = {
     "type": "object",
@@ -341,10 +346,60 @@ MANIFEST_SCHEMA_V2 = {
             "type": "string",
             "format": "email",
             "description": "Email of the developer who owns this experiment"
+        },
+        "quotas": {
+            "type": "object",
+            "properties": {
+                "rate_limit": {
+                    "$ref": "#/definitions/rateLimit",
+                    "description": "Request rate allowed per client IP across all routes of this experiment (e.g., '120 per minute')."
+                },
+                "routes": {
+                    "type": "object",
+                    "patternProperties": {
+                        "^/": {
+                            "$ref": "#/definitions/rateLimit"
+                        }
+                    },
+                    "additionalProperties": False,
+                    "description": "Route path (as declared on the experiment router, e.g. '/api/move' or '/game/{game_id}') -> rate limit per client IP. Applied in addition to rate_limit."
+                },
+                "max_inflight": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Maximum concurrent HTTP requests (and therefore actor calls) this experiment may have in flight per worker. Excess requests get 503."
+                }
+            },
+            "additionalProperties": False,
+            "description": "Per-experiment admission limits enforced by the platform (see experiment_quotas.py)."
+        },
+        "actor_pool": {
+            "type": "object",
+            "properties": {
+                "replicas": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": 32,
+                    "default": 1,
+                    "description": "Number of identical ExperimentActor replicas. Requests go to the replica with the fewest outstanding requests."
+                },
+                "sticky_key": {
+                    "type": "string",
+                    "pattern": "^[A-Za-z_][A-Za-z0-9_]*$",
+                    "description": "Path or query parameter (e.g., 'game_id') whose value pins a request to one replica, for state that must stay on a single actor."
+                }
+            },
+            "additionalProperties": False,
+            "description": "Actor replica pool for CPU-heavy experiments (see actor_registry.py)."
         }
     },
     "required": [],
     "definitions": {
+        "rateLimit": {
+            "type": "string",
+            "pattern": RATE_LIMIT_PATTERN,
+            "description": "One or more limits in 'N per [M] unit' or 'N/unit' form, separated by ';' or ',' (e.g., '10 per second; 300 per hour')."
+        },
         "indexDefinition": {
             "type": "object",
             "properties": {
@@ -730,7 +785,7 @@ def get_schema_version(manifest_data: Dict[str, Any]) -> str:
         return str(version)
     
     # Heuristic: If manifest has new fields, assume 2.0, otherwise 1.0
-    if any(field in manifest_data for field in ["auth_policy", "sub_auth", "collection_settings"]):
+    if any(field in manifest_data for field in ["auth_policy", "sub_auth", "collection_settings", "quotas", "actor_pool"]):
         return "2.0"
     
     return DEFAULT_SCHEMA_VERSION
@@ -1,245 +1,238 @@
-"""FastAPI middleware classes for experiment scoping, proxy awareness, and HTTPS enforcement."""
+"""
+Pure-ASGI platform middleware: request IDs, proxy awareness, experiment scoping,
+principal context and HTTPS enforcement in a single pass over the scope.
+
+The previous implementation stacked one BaseHTTPMiddleware per concern. Each of
+those runs the downstream app in a new task and pipes every response body chunk
+through a memory stream, so a request paid five task hops and five body
+re-wraps, including long-lived SSE and export streams. PlatformMiddleware
+touches only the scope on the way in and the `http.response.start` message on
+the way out; the body is never wrapped and no task is created.
+
+scripts/bench_middleware.py compares it with the BaseHTTPMiddleware stack.
+"""
 import os
 import re
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from fastapi import Request
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from principal_context import PrincipalContext
+from request_id_middleware import generate_request_id, _request_id_context
 
 logger = logging.getLogger(__name__)
 
+_LOCALHOST_NAMES = ("localhost", "127.0.0.1", "0.0.0.0", "[::1]")
+_FORWARDED_HOST_RE = re.compile(r'host=([^;,\s]+)', re.IGNORECASE)
+# Request headers the middleware reads; everything else is skipped while scanning
+_WANTED_HEADERS = {
+    b"host", b"cookie", b"x-forwarded-proto", b"x-forwarded-host", b"x-forwarded-ssl", b"forwarded",
+}
+_HSTS_HEADER = (b"strict-transport-security", b"max-age=31536000; includeSubDomains; preload")
+
 
-class ExperimentScopeMiddleware(BaseHTTPMiddleware):
-    """Middleware that sets experiment scope information in request.state."""
-    async def dispatch(self, request: Request, call_next: ASGIApp):
-        request.state.slug_id = None
-        request.state.read_scopes = None
-        path = request.url.path
-        if path.startswith("/experiments/"):
-            parts = path.strip("/").split("/")
-            if len(parts) >= 2:
-                slug = parts[1]
-                exp_cfg = getattr(request.app.state, "experiments", {}).get(slug)
-                if exp_cfg:
-                    request.state.slug_id = slug
-                    request.state.read_scopes = exp_cfg.get("resolved_read_scopes", [slug])
-        response = await call_next(request)
-        return response
-
-
-class ProxyAwareHTTPSMiddleware(BaseHTTPMiddleware):
+def _read_headers(scope: Scope) -> Dict[str, str]:
+    """Single scan of the raw header list, decoding only the headers we use."""
+    found: Dict[str, str] = {}
+    for name, value in scope.get("headers") or ():
+        if name in _WANTED_HEADERS and name not in found:
+            found[name.decode("latin-1")] = value.decode("latin-1")
+    return found
+
+
+def _split_host(value: str) -> Tuple[str, Optional[int]]:
+    """Splits 'host[:port]' (IPv6 literals in brackets) into (host, port)."""
+    if value.startswith("["):
+        end = value.find("]")
+        host, rest = value[: end + 1], value[end + 1:]
+        port_str = rest[1:] if rest.startswith(":") else ""
+    elif value.count(":") == 1:
+        host, port_str = value.split(":", 1)
+    else:
+        host, port_str = value, ""
+    try:
+        return host, int(port_str) if port_str else None
+    except ValueError:
+        return host, None
+
+
+def resolve_proxy(scope: Scope, headers: Dict[str, str], default_app_port: int, force_https: bool) -> Dict[str, Any]:
     """
-    Proxy-aware middleware: Detects proxy headers and rewrites request.url
-    to reflect the actual client scheme/host BEFORE route handlers execute.
-    This ensures FastAPI's url_for() generates correct HTTPS URLs when behind proxies.
-    
+    Detects the client-facing scheme/host/port from proxy headers and rewrites
+    scope["scheme"]/scope["server"] so url_for() generates the correct URLs.
+
     Handles multiple proxy header formats:
     - X-Forwarded-Proto (Render.com, AWS ELB, etc.)
     - X-Forwarded-Ssl (older proxies)
     - Forwarded (RFC 7239)
     - X-Forwarded-Host
+
+    Returns the values stored on request.state (original_*/detected_*).
     """
-    async def dispatch(self, request: Request, call_next: ASGIApp):
-        # Store original values for debugging
-        original_scheme = request.url.scheme
-        original_host = request.url.hostname
-        
-        # Detect if we're in localhost/development (no proxy)
-        is_localhost = original_host in ("localhost", "127.0.0.1", "0.0.0.0", "[::1]")
-        has_proxy_headers = any((
-            request.headers.get("X-Forwarded-Proto"),
-            request.headers.get("X-Forwarded-Host"),
-            request.headers.get("Forwarded"),
-            request.headers.get("X-Forwarded-Ssl")
-        ))
-        
-        # Detect actual scheme from proxy headers (priority order)
-        detected_scheme = original_scheme
-        detected_host = original_host
-        detected_port = request.url.port
-        if not detected_port:
-            server = request.scope.get("server")
-            if server and len(server) == 2:
-                detected_port = server[1]
-        
-        # Get the default application port (used internally, not externally)
-        default_app_port = int(os.getenv("PORT", "10000"))
-        
-        # On localhost without proxy headers, respect the original scheme
-        if is_localhost and not has_proxy_headers:
-            detected_scheme = original_scheme
-            logger.debug(f"Localhost request without proxy headers - respecting original scheme: {detected_scheme}")
-        else:
-            # We're behind a proxy or on a real server - check proxy headers
-            forwarded_proto = request.headers.get("X-Forwarded-Proto", "").lower()
-            if forwarded_proto in ("https", "http"):
-                detected_scheme = forwarded_proto
-                logger.debug(f"Detected scheme from X-Forwarded-Proto: {detected_scheme}")
-            
-            if request.headers.get("X-Forwarded-Ssl", "").lower() == "on":
-                detected_scheme = "https"
-                logger.debug(f"Detected HTTPS from X-Forwarded-Ssl header")
-            
-            forwarded_header = request.headers.get("Forwarded", "")
-            if forwarded_header:
-                if "proto=https" in forwarded_header.lower():
-                    detected_scheme = "https"
-                    logger.debug(f"Detected HTTPS from Forwarded header")
-                host_match = re.search(r'host=([^;,\s]+)', forwarded_header, re.IGNORECASE)
-                if host_match:
-                    host_value = host_match.group(1).strip('"')
-                    if ":" in host_value:
-                        detected_host, port_str = host_value.rsplit(":", 1)
-                        try:
-                            detected_port = int(port_str)
-                        except ValueError:
-                            pass
-                    else:
-                        detected_host = host_value
-            
-            forwarded_host = request.headers.get("X-Forwarded-Host")
-            if forwarded_host:
-                if ":" in forwarded_host:
-                    detected_host, port_str = forwarded_host.rsplit(":", 1)
-                    try:
-                        detected_port = int(port_str)
-                    except ValueError:
-                        pass
-                else:
-                    detected_host = forwarded_host
-                logger.debug(f"Detected host from X-Forwarded-Host: {detected_host}")
-        
-        # When behind a proxy, exclude internal app port (10000) from detected_port
-        # since the proxy handles port mapping externally (clients use 443/80, not 10000)
-        if has_proxy_headers and not is_localhost:
-            if detected_port == default_app_port:
-                logger.debug(f"Excluding internal app port {detected_port} from detected_port (behind proxy)")
-                detected_port = None  # Let it default to standard port based on scheme
-        
-        # Force HTTPS in production when FORCE_HTTPS env var is set
-        force_https = os.getenv("FORCE_HTTPS", "").lower() == "true"
-        if force_https and not is_localhost:
+    original_scheme = scope.get("scheme", "http")
+    server = scope.get("server")
+    server_port = server[1] if server and len(server) == 2 else None
+
+    # Same host/port the request URL would report (Host header first, then server)
+    if "host" in headers:
+        original_host, url_port = _split_host(headers["host"])
+    elif server:
+        original_host = server[0]
+        default_port = {"http": 80, "https": 443}.get(original_scheme)
+        url_port = server_port if server_port != default_port else None
+    else:
+        original_host, url_port = None, None
+
+    # Detect if we're in localhost/development (no proxy)
+    is_localhost = original_host in _LOCALHOST_NAMES
+    forwarded_proto_header = headers.get("x-forwarded-proto", "")
+    forwarded_host = headers.get("x-forwarded-host")
+    forwarded_header = headers.get("forwarded", "")
+    forwarded_ssl = headers.get("x-forwarded-ssl", "")
+    has_proxy_headers = bool(forwarded_proto_header or forwarded_host or forwarded_header or forwarded_ssl)
+
+    detected_scheme = original_scheme
+    detected_host = original_host
+    detected_port = url_port or server_port
+
+    if not (is_localhost and not has_proxy_headers):
+        # We're behind a proxy or on a real server - check proxy headers (priority order)
+        forwarded_proto = forwarded_proto_header.lower()
+        if forwarded_proto in ("https", "http"):
+            detected_scheme = forwarded_proto
+
+        if forwarded_ssl.lower() == "on":
             detected_scheme = "https"
-            logger.debug("Forcing HTTPS due to FORCE_HTTPS environment variable")
-        
-        # Store corrected values in request.state for later use
-        request.state.original_scheme = original_scheme
-        request.state.original_host = original_host
-        request.state.detected_scheme = detected_scheme
-        request.state.detected_host = detected_host
-        request.state.detected_port = detected_port
-        
-        # Rewrite request.scope to reflect actual client scheme/host
-        if detected_scheme != original_scheme or detected_host != original_host or (
-            detected_port and detected_port != request.scope.get("server", (None, None))[1]
-        ):
-            request.scope["scheme"] = detected_scheme
-            port_to_use = detected_port
+
+        if forwarded_header:
+            if "proto=https" in forwarded_header.lower():
+                detected_scheme = "https"
+            host_match = _FORWARDED_HOST_RE.search(forwarded_header)
+            if host_match:
+                host_value, port = _split_host(host_match.group(1).strip('"'))
+                detected_host = host_value
+                if port is not None:
+                    detected_port = port
+
+        if forwarded_host:
+            host_value, port = _split_host(forwarded_host)
+            detected_host = host_value
+            if port is not None:
+                detected_port = port
+
+    # When behind a proxy, exclude the internal app port from detected_port
+    # since the proxy handles port mapping externally (clients use 443/80)
+    if has_proxy_headers and not is_localhost and detected_port == default_app_port:
+        detected_port = None
+
+    # Force HTTPS in production when FORCE_HTTPS env var is set
+    if force_https and not is_localhost:
+        detected_scheme = "https"
+
+    # Rewrite scope to reflect actual client scheme/host
+    if detected_scheme != original_scheme or detected_host != original_host or (
+        detected_port and detected_port != server_port
+    ):
+        scope["scheme"] = detected_scheme
+        port_to_use = detected_port
+        if not port_to_use:
+            default_port = 443 if detected_scheme == "https" else 80
+            if server_port and server_port != default_port:
+                port_to_use = server_port
             if not port_to_use:
-                original_server = request.scope.get("server")
-                if original_server and len(original_server) == 2:
-                    original_port = original_server[1]
-                    default_port = 443 if detected_scheme == "https" else 80
-                    if original_port != default_port:
-                        port_to_use = original_port
-                if not port_to_use:
-                    port_to_use = 443 if detected_scheme == "https" else 80
-            
-            request.scope["server"] = (detected_host, port_to_use)
-            
-            if hasattr(request, "_url"):
-                delattr(request, "_url")
-            
-            logger.info(
-                f"Proxy-aware HTTPS: Rewrote request URL "
-                f"{original_scheme}://{original_host}:{request.scope.get('server', (None, None))[1]} -> "
-                f"{detected_scheme}://{detected_host}:{port_to_use}"
-            )
-        
-        response = await call_next(request)
-        return response
-
-
-class HTTPSEnforcementMiddleware(BaseHTTPMiddleware):
+                port_to_use = default_port
+        scope["server"] = (detected_host, port_to_use)
+        logger.debug(
+            f"Proxy-aware HTTPS: Rewrote request URL "
+            f"{original_scheme}://{original_host}:{server_port} -> "
+            f"{detected_scheme}://{detected_host}:{port_to_use}"
+        )
+
+    return {
+        "original_scheme": original_scheme,
+        "original_host": original_host,
+        "detected_scheme": detected_scheme,
+        "detected_host": detected_host,
+        "detected_port": detected_port,
+    }
+
+
+def resolve_experiment_scope(scope: Scope) -> Tuple[Optional[str], Optional[list]]:
+    """Maps /experiments/<slug>/... to (slug_id, read_scopes) for registered experiments."""
+    path = scope.get("path", "")
+    if path.startswith("/experiments/"):
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2:
+            slug = parts[1]
+            app = scope.get("app")
+            experiments = getattr(getattr(app, "state", None), "experiments", None) or {}
+            exp_cfg = experiments.get(slug)
+            if exp_cfg:
+                return slug, exp_cfg.get("resolved_read_scopes", [slug])
+    return None, None
+
+
+def enforce_https_headers(message: Message) -> None:
+    """Adds HSTS and upgrades http:// Location redirects on an http.response.start message."""
+    headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"strict-transport-security"]
+    headers.append(_HSTS_HEADER)
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"location" and value.startswith(b"http://"):
+            headers[i] = (name, b"https://" + value[len(b"http://"):])
+            logger.debug(f"Enforced HTTPS redirect: {value.decode('latin-1')}")
+    message["headers"] = headers
+
+
+class PlatformMiddleware:
     """
-    Proxy-aware security middleware: Only enforces HTTPS when the request actually
-    came via HTTPS (detected through proxy headers or direct connection).
-    
-    This is intelligent for deployments behind proxies like Render.com:
-    - If the proxy indicates HTTPS (X-Forwarded-Proto: https), enforces HTTPS
-    - If the proxy indicates HTTP, does NOT enforce HTTPS (allows proxy to handle it)
-    - Prevents HTTP downgrade attacks and mixed content issues only when HTTPS is active.
+    Single pure-ASGI middleware for every HTTP request:
+
+    - Request ID: generated per request, stored in request.state.request_id and the
+      logging contextvar, and returned as X-Request-ID.
+    - Proxy awareness: scope scheme/server rewritten from X-Forwarded-* / Forwarded
+      before routing, so url_for() emits client-facing URLs.
+    - Experiment scope: request.state.slug_id / read_scopes for /experiments/<slug>/.
+    - Principal context: lazy per-request auth memo at request.state.principal.
+    - HTTPS enforcement (enforce_https=True): HSTS header and https:// Location
+      redirects, only when the request actually came via HTTPS.
+
+    Non-HTTP scopes (websocket, lifespan) pass straight through.
     """
-    async def dispatch(self, request: Request, call_next: ASGIApp):
-        response = await call_next(request)
-        
-        # Check if this request is actually using HTTPS
-        detected_scheme = getattr(request.state, "detected_scheme", None)
-        if detected_scheme is None:
-            forwarded_proto = request.headers.get("X-Forwarded-Proto", "").lower()
-            if forwarded_proto in ("https", "http"):
-                detected_scheme = forwarded_proto
-            elif request.headers.get("X-Forwarded-Ssl", "").lower() == "on":
-                detected_scheme = "https"
-            elif "proto=https" in request.headers.get("Forwarded", "").lower():
-                detected_scheme = "https"
-            else:
-                detected_scheme = request.url.scheme
-        
-        is_https = detected_scheme == "https"
-        
-        if not is_https:
-            logger.debug(f"Skipping HTTPS enforcement - request came via {detected_scheme}")
-            return response
-        
-        logger.debug("Enforcing HTTPS - request came via HTTPS")
-        
-        # Add HSTS header
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
-        
-        # Force HTTPS on any Location redirect headers
-        if "Location" in response.headers:
-            location = response.headers["Location"]
-            if location.startswith("http://"):
-                https_location = location.replace("http://", "https://", 1)
-                response.headers["Location"] = https_location
-                logger.debug(f"Enforced HTTPS redirect: {location} -> {https_location}")
-        
-        # Sanitize mixed content in response bodies
-        content_type = response.headers.get("content-type", "").lower()
-        text_content_types = [
-            "application/json",
-            "text/html",
-            "text/css",
-            "text/javascript",
-            "application/javascript",
-            "text/plain",
-            "text/xml",
-            "application/xml",
-        ]
-        
-        if any(ct in content_type for ct in text_content_types):
-            if hasattr(response, "body") and response.body:
-                try:
-                    if isinstance(response.body, bytes):
-                        body_text = response.body.decode("utf-8")
-                    else:
-                        body_text = str(response.body)
-                    
-                    original_body = body_text
-                    body_text = re.sub(r'"http://', '"https://', body_text)
-                    body_text = re.sub(r'\bhttp://', 'https://', body_text)
-                    body_text = re.sub(r'(src|href)=["\']http://', r'\1="https://', body_text)
-                    body_text = re.sub(r'url\(http://', 'url(https://', body_text)
-                    body_text = re.sub(r'":\s*"http://', '": "https://', body_text)
-                    
-                    if body_text != original_body:
-                        response.body = body_text.encode("utf-8")
-                        if "content-length" in response.headers:
-                            response.headers["content-length"] = str(len(response.body))
-                        logger.debug("Sanitized mixed content in response body (HTTP -> HTTPS)")
-                except (UnicodeDecodeError, AttributeError) as e:
-                    logger.debug(f"Skipping mixed content sanitization: {e}")
-        
-        return response
 
+    def __init__(self, app: ASGIApp, enforce_https: bool = False):
+        self.app = app
+        self.enforce_https = enforce_https
+        self.default_app_port = int(os.getenv("PORT", "10000"))
+        self.force_https = os.getenv("FORCE_HTTPS", "").lower() == "true"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = _read_headers(scope)
+        request_id = generate_request_id()
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state.update(resolve_proxy(scope, headers, self.default_app_port, self.force_https))
+        state["slug_id"], state["read_scopes"] = resolve_experiment_scope(scope)
+        token = cookie_parser(headers["cookie"]).get("token") if "cookie" in headers else None
+        state["principal"] = PrincipalContext(token)
+
+        is_https = self.enforce_https and state["detected_scheme"] == "https"
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [request_id_header]
+                if is_https:
+                    enforce_https_headers(message)
+            await send(message)
+
+        context_token = _request_id_context.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id_context.reset(context_token)
@@ -0,0 +1,149 @@
+"""
+Per-request principal context.
+
+Authentication state is resolved lazily and at most once per request:
+
+- JWTs are decoded through a short, process-wide cache keyed by the token's
+  SHA-256 (never the raw token), bounded by the token's own `exp`.
+- Permission (check_many) and role lookups are memoized on the request's
+  PrincipalContext, so stacked dependencies share one provider round trip.
+- Sub-auth user documents are memoized per request; the cross-request TTL
+  cache for them lives in sub_auth.py.
+
+PrincipalContextMiddleware attaches a context to request.state.principal;
+get_principal() creates one on demand where the middleware did not run
+(e.g. WebSocket scopes).
+"""
+
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", "10000"))
+
+# sha256(token) -> (payload, expires_at_monotonic)
+_token_cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def decode_token_cached(token: str, secret_key: str, algorithms: Sequence[str] = ("HS256",)) -> Dict[str, Any]:
+    """
+    jwt.decode with a short cache of successfully decoded payloads.
+
+    Raises the same jwt exceptions as jwt.decode on a miss. A cached payload is
+    never served past the token's `exp` claim, so expiry behaves exactly as an
+    uncached decode. Returns a shallow copy so callers can mutate freely.
+    """
+    key = _token_key(token)
+    now = time.monotonic()
+    entry = _token_cache.get(key)
+    if entry is not None:
+        payload, expires_at = entry
+        if expires_at > now:
+            _token_cache.move_to_end(key)
+            _token_cache_stats["hits"] += 1
+            return dict(payload)
+        _token_cache.pop(key, None)
+
+    _token_cache_stats["misses"] += 1
+    payload = jwt.decode(token, secret_key, algorithms=list(algorithms))
+
+    expires_at = now + TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, now + (exp - time.time()))
+    if TOKEN_CACHE_TTL_SECONDS > 0 and expires_at > now:
+        _token_cache[key] = (payload, expires_at)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+            _token_cache_stats["evictions"] += 1
+    return dict(payload)
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    return {"size": len(_token_cache), "max_size": TOKEN_CACHE_MAX_SIZE,
+            "ttl_seconds": TOKEN_CACHE_TTL_SECONDS, **_token_cache_stats}
+
+
+class PrincipalContext:
+    """Request-scoped memo of the caller's identity, permissions, roles and sub-auth users."""
+
+    _UNRESOLVED = object()
+
+    def __init__(self, token: Optional[str] = None):
+        self.token = token
+        self._user: Any = self._UNRESOLVED
+        # (subject, resource, action) -> bool
+        self.permissions: Dict[Tuple[str, str, str], bool] = {}
+        # (subject, role) -> bool
+        self.roles: Dict[Tuple[str, str], bool] = {}
+        # (slug_id, session_token) -> sub-auth user doc (or None)
+        self.sub_users: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+
+    def cached_user(self, token: Optional[str]) -> Any:
+        """The memoized platform user for `token`, or _UNRESOLVED."""
+        if token != self.token:
+            return self._UNRESOLVED
+        user = self._user
+        return dict(user) if isinstance(user, dict) else user
+
+    def remember_user(self, token: Optional[str], user: Optional[Dict[str, Any]]) -> None:
+        if token == self.token:
+            self._user = dict(user) if user else None
+
+    async def check_many(
+        self,
+        authz: Any,
+        subject: str,
+        pairs: Sequence[Tuple[str, str]],
+        user_object: Optional[Dict[str, Any]] = None,
+    ) -> Dict[Tuple[str, str], bool]:
+        """authz.check_many, asking the provider only for pairs not yet resolved in this request."""
+        missing: List[Tuple[str, str]] = [
+            pair for pair in dict.fromkeys(pairs)
+            if (subject, pair[0], pair[1]) not in self.permissions
+        ]
+        if missing:
+            resolved = await authz.check_many(subject, missing, user_object=user_object)
+            for (resource, action), allowed in resolved.items():
+                self.permissions[(subject, resource, action)] = allowed
+        return {pair: self.permissions[(subject, pair[0], pair[1])] for pair in pairs}
+
+    async def check(
+        self,
+        authz: Any,
+        subject: str,
+        resource: str,
+        action: str,
+        user_object: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        return (await self.check_many(authz, subject, [(resource, action)], user_object))[(resource, action)]
+
+    async def has_role(self, authz: Any, subject: str, role: str) -> bool:
+        """Memoized authz.has_role_for_user (False when the provider has no role API)."""
+        key = (subject, role)
+        if key not in self.roles:
+            has_role_for_user = getattr(authz, "has_role_for_user", None)
+            self.roles[key] = bool(await has_role_for_user(subject, role)) if has_role_for_user else False
+        return self.roles[key]
+
+
+def get_principal(request: Any) -> PrincipalContext:
+    """Returns the request's PrincipalContext, creating it if the middleware did not."""
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        principal = PrincipalContext(request.cookies.get("token"))
+        request.state.principal = principal
+    return principal
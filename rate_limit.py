@@ -1,7 +1,14 @@
 """
 Rate limiting configuration for protecting endpoints from brute force and DDoS attacks.
 Uses slowapi (Flask-Limiter wrapper for FastAPI) to implement rate limiting.
+
+Counters are kept cluster-wide in MongoDB by rate_limit_storage.BatchedMongoStorage
+(sliding window, batched flushes), so limits hold across uvicorn workers and restarts.
+Set RATE_LIMIT_STORAGE=memory for per-process counters.
 """
+import os
+from typing import Any, Dict
+
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -9,9 +16,42 @@ from fastapi import Request
 from fastapi.responses import JSONResponse, HTMLResponse
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS
 
+from rate_limit_storage import BatchedMongoStorage
+
+# "mongo" (cluster-wide, default) or "memory" (per process)
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "mongo").lower()
 
 # Initialize rate limiter with default key function (IP address)
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(
+    key_func=get_remote_address,
+    strategy="sliding-window-counter",
+    storage_uri="mongo-batched://" if RATE_LIMIT_STORAGE == "mongo" else "memory://",
+)
+
+
+def _batched_storage():
+    storage = limiter.limiter.storage
+    return storage if isinstance(storage, BatchedMongoStorage) else None
+
+
+async def start_rate_limit_storage(db) -> bool:
+    """Attaches the shared MongoDB counters; returns False when limits stay per process."""
+    storage = _batched_storage()
+    if storage is None:
+        return False
+    await storage.start(db)
+    return True
+
+
+async def stop_rate_limit_storage() -> None:
+    storage = _batched_storage()
+    if storage is not None:
+        await storage.stop()
+
+
+def rate_limit_storage_stats() -> Dict[str, Any]:
+    storage = _batched_storage()
+    return storage.stats() if storage is not None else {"backend": "memory"}
 
 
 def get_rate_limit_key(request: Request) -> str:
@@ -0,0 +1,323 @@
+"""
+Cluster-wide rate limit storage for slowapi / limits.
+
+slowapi's default `memory://` storage keeps counters per process, so with N uvicorn
+workers every limit is effectively N times looser and counters reset on restart.
+BatchedMongoStorage keeps the counters in MongoDB (one document per window key,
+atomic `$inc`, TTL index on `expireAt`) without putting a database round-trip on
+the request path:
+
+- Every hit is decided locally against `remote + inflight + pending`, where `remote`
+  is the cluster-wide count read back on the last flush and `pending` are this
+  process's hits not yet written.
+- A background task flushes pending deltas in one unordered bulk `$inc`, then reads
+  back the totals of every active window key so other workers' hits are seen.
+- Flushes run every RATE_LIMIT_FLUSH_INTERVAL_SECONDS, and immediately once a key
+  reaches half of its limit, so keys close to their limit sync promptly.
+
+Cluster-wide overshoot is therefore bounded by what other workers accept during one
+flush interval. Until start() attaches a database (or if MongoDB is unreachable)
+the storage behaves like the in-memory one.
+
+The storage registers the `mongo-batched://` scheme, implements the
+sliding-window-counter strategy and also supports fixed-window.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from math import floor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_COLLECTION = os.getenv("RATE_LIMIT_COLLECTION", "rate_limits")
+RATE_LIMIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+
+
+class _WindowCounter:
+    """Local view of one window key."""
+    __slots__ = ("remote", "inflight", "pending", "expires_at", "ttl")
+    
+    def __init__(self, ttl: int, now: float):
+        self.remote = 0     # cluster-wide count as of the last flush
+        self.inflight = 0   # local hits being written by the current flush
+        self.pending = 0    # local hits not yet written
+        self.ttl = ttl
+        self.expires_at = now + ttl
+    
+    @property
+    def count(self) -> int:
+        return self.remote + self.inflight + self.pending
+
+
+class BatchedMongoStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    limits storage with local counters and batched MongoDB flushes (see module docstring).
+    
+    The limits API is synchronous (slowapi calls it from the endpoint wrapper), so all
+    local state is guarded by a threading lock and never awaits; only the flush task
+    talks to MongoDB.
+    """
+    
+    STORAGE_SCHEME = ["mongo-batched"]
+    
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        wrap_exceptions: bool = False,
+        collection_name: str = RATE_LIMIT_COLLECTION,
+        flush_interval: float = RATE_LIMIT_FLUSH_INTERVAL_SECONDS,
+        **_: Any,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self._counters: Dict[str, _WindowCounter] = {}
+        self._cleared: Set[str] = set()
+        self._reset_requested = False
+        self._lock = threading.Lock()
+        self._collection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._healthy = True
+        self.flushes = 0
+        self.flush_errors = 0
+        self.keys_written = 0
+    
+    @property
+    def base_exceptions(self):
+        return ValueError
+    
+    # --- Lifecycle (called from the app lifespan) -------------------------------
+    
+    async def start(self, db) -> None:
+        """Attaches the Motor database, ensures the TTL index and starts the flush task."""
+        if self._task is not None and not self._task.done():
+            return
+        collection = db[self.collection_name]
+        await collection.create_index("expireAt", expireAfterSeconds=0)
+        self._collection = collection
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stops the flush task after a final flush of pending hits."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._collection is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Final rate limit flush failed: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(counter.pending for counter in self._counters.values())
+            keys = len(self._counters)
+        return {
+            "backend": "mongodb" if self._task is not None and not self._task.done() else "memory",
+            "healthy": self._healthy,
+            "keys": keys,
+            "pending_hits": pending,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "keys_written": self.keys_written,
+            "flush_interval_seconds": self.flush_interval,
+        }
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Rate limit flush to '{self.collection_name}' failed; keeping counts locally: {e}")
+    
+    async def flush(self) -> None:
+        """Writes pending deltas with one bulk $inc and refreshes cluster totals for active keys."""
+        collection = self._collection
+        if collection is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            reset, self._reset_requested = self._reset_requested, False
+            cleared, self._cleared = self._cleared, set()
+            batch: List[Tuple[str, int, int]] = []
+            for key, counter in self._counters.items():
+                if counter.pending:
+                    counter.inflight, counter.pending = counter.pending, 0
+                    batch.append((key, counter.inflight, counter.ttl))
+            active = list(self._counters)
+        
+        try:
+            if reset:
+                await collection.delete_many({})
+            elif cleared:
+                await collection.delete_many({"_id": {"$in": list(cleared)}})
+            if batch:
+                expire_base = datetime.now(timezone.utc)
+                await collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {"_id": key},
+                            {"$inc": {"count": amount}, "$setOnInsert": {"expireAt": expire_base + timedelta(seconds=ttl)}},
+                            upsert=True,
+                        )
+                        for key, amount, ttl in batch
+                    ],
+                    ordered=False,
+                )
+        except Exception:
+            with self._lock:
+                for key, _, _ in batch:
+                    counter = self._counters.get(key)
+                    if counter is not None:
+                        counter.pending += counter.inflight
+                        counter.inflight = 0
+                if reset:
+                    self._reset_requested = True
+                self._cleared |= cleared
+            self._healthy = False
+            self.flush_errors += 1
+            raise
+        
+        with self._lock:
+            # Written hits are now part of the cluster count, even if the read-back below fails
+            for key, _, _ in batch:
+                counter = self._counters.get(key)
+                if counter is not None:
+                    counter.remote += counter.inflight
+                    counter.inflight = 0
+        self.keys_written += len(batch)
+        
+        if active:
+            totals: Dict[str, int] = {}
+            async for doc in collection.find({"_id": {"$in": active}}, {"count": 1}):
+                totals[doc["_id"]] = doc.get("count", 0)
+            with self._lock:
+                for key in active:
+                    counter = self._counters.get(key)
+                    if counter is not None and not counter.inflight:
+                        counter.remote = totals.get(key, 0)
+        self._healthy = True
+        self.flushes += 1
+    
+    def _request_flush(self) -> None:
+        if self._wake is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+    
+    # --- Local counters (caller holds self._lock) -------------------------------
+    
+    def _prune(self, now: float) -> None:
+        expired = [key for key, counter in self._counters.items() if counter.expires_at <= now]
+        for key in expired:
+            del self._counters[key]
+    
+    def _live(self, key: str, now: float) -> Optional[_WindowCounter]:
+        counter = self._counters.get(key)
+        if counter is not None and counter.expires_at <= now:
+            del self._counters[key]
+            return None
+        return counter
+    
+    def _add(self, key: str, expiry: int, amount: int, now: float) -> int:
+        counter = self._live(key, now)
+        if counter is None:
+            counter = self._counters[key] = _WindowCounter(expiry, now)
+        counter.pending += amount
+        return counter.count
+    
+    def _window_info(self, previous_key: str, current_key: str, expiry: int, now: float) -> Tuple[int, float, int, float]:
+        previous = self._live(previous_key, now)
+        current = self._live(current_key, now)
+        previous_count = previous.count if previous else 0
+        current_count = current.count if current else 0
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+    
+    # --- limits Storage API -----------------------------------------------------
+    
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._lock:
+            return self._add(key, expiry, amount, time.time())
+    
+    def get(self, key: str) -> int:
+        with self._lock:
+            counter = self._live(key, time.time())
+            return counter.count if counter else 0
+    
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self._lock:
+            counter = self._live(key, now)
+            return counter.expires_at if counter else now
+    
+    def check(self) -> bool:
+        return self._healthy
+    
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            count = len(self._counters)
+            self._counters.clear()
+            self._cleared.clear()
+            self._reset_requested = True
+        return count
+    
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+            self._cleared.add(key)
+    
+    # --- Sliding window counter support ---------------------------------------
+    
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self._lock:
+            previous_count, previous_ttl, current_count, _ = self._window_info(previous_key, current_key, expiry, now)
+            used = floor(previous_count * previous_ttl / expiry + current_count) + amount
+            if used > limit:
+                return False
+            # The window document lives for two windows so it can serve as the "previous" one
+            self._add(current_key, 2 * expiry, amount, now)
+        if used * 2 >= limit:
+            self._request_flush()
+        return True
+    
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self._lock:
+            return self._window_info(previous_key, current_key, expiry, now)
+    
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -1,15 +1,15 @@
 """
-Request ID Middleware for tracing and debugging.
+Request ID helpers for tracing and debugging.
 
-Generates a unique request ID for each HTTP request and includes it in logs
-and response headers for better traceability.
+Each HTTP request gets a short unique ID, exposed in logs (via a contextvar),
+request.state.request_id and the X-Request-ID response header. The ID is
+assigned by middleware.PlatformMiddleware; RequestIDMiddleware remains for apps
+that only want request IDs.
 """
 import uuid
 import logging
 import contextvars
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +17,11 @@ logger = logging.getLogger(__name__)
 _request_id_context: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default=None)
 
 
+def generate_request_id() -> str:
+    """Short request ID for readability (first 8 chars of a UUID v4)."""
+    return uuid.uuid4().hex[:8]
+
+
 class RequestIDLoggingFilter(logging.Filter):
     """
     Logging filter that adds request ID to log records.
@@ -30,38 +35,35 @@ class RequestIDLoggingFilter(logging.Filter):
         return True
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
+class RequestIDMiddleware:
     """
-    Middleware that generates a unique request ID for each request.
-    
-    - Generates UUID v4 request ID
+    Pure-ASGI middleware that generates a unique request ID for each request.
+
+    - Generates a short UUID v4 request ID
     - Adds request ID to request.state for use in route handlers
     - Adds request ID to response headers (X-Request-ID)
     - Uses contextvars to make request ID available in logs
     """
-    
-    async def dispatch(self, request: Request, call_next: ASGIApp):
-        # Generate unique request ID (UUID v4)
-        request_id = str(uuid.uuid4())[:8]  # Use shorter ID for readability (first 8 chars)
-        
-        # Store in request.state for use in route handlers
-        request.state.request_id = request_id
-        
-        # Set context variable for logging
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = generate_request_id()
+        scope.setdefault("state", {})["request_id"] = request_id
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
         token = _request_id_context.set(request_id)
-        
         try:
-            # Process request
-            response = await call_next(request)
-            
-            # Add request ID to response headers
-            response.headers["X-Request-ID"] = request_id
-            
-            # Log request completion (use request ID from context)
-            logger.debug(f"[{request_id}] Request completed: {request.method} {request.url.path}")
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
         finally:
-            # Reset context variable
             _request_id_context.reset(token)
-
@@ -0,0 +1,198 @@
+"""
+Middleware stack benchmark (scripts/bench_middleware.py)
+================================================================================
+
+Compares the pure-ASGI PlatformMiddleware against the previous stack of one
+BaseHTTPMiddleware per concern (request ID, proxy awareness, experiment scope,
+principal context, HTTPS enforcement). Both stacks run the same per-request
+logic from middleware.py, so the difference is the middleware plumbing itself.
+
+It reports, per stack:
+- Requests/sec and p50/p99 latency for a small JSON endpoint under concurrency
+- Time to first byte of a streaming (SSE-style) endpoint, which shows whether
+  the stack lets chunks through as they are produced
+
+No server or database is needed: throughput runs through httpx's ASGI transport
+and the streaming probe drives the ASGI app directly.
+
+Usage:
+    python scripts/bench_middleware.py
+    python scripts/bench_middleware.py --requests 20000 --concurrency 64
+"""
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from middleware import (  # noqa: E402
+    PlatformMiddleware,
+    enforce_https_headers,
+    resolve_experiment_scope,
+    resolve_proxy,
+    _read_headers,
+)
+from principal_context import PrincipalContext  # noqa: E402
+from request_id_middleware import generate_request_id, _request_id_context  # noqa: E402
+
+HEADERS = {"X-Forwarded-Proto": "https", "X-Forwarded-Host": "labs.example.com", "Cookie": "token=abc"}
+STREAM_CHUNKS = 5
+STREAM_DELAY = 0.05
+
+
+# --- Previous stack: one BaseHTTPMiddleware per concern -----------------------
+
+class LegacyRequestID(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = generate_request_id()
+        request.state.request_id = request_id
+        token = _request_id_context.set(request_id)
+        try:
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            _request_id_context.reset(token)
+
+
+class LegacyProxy(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        for key, value in resolve_proxy(request.scope, _read_headers(request.scope), 10000, False).items():
+            setattr(request.state, key, value)
+        return await call_next(request)
+
+
+class LegacyScope(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request.state.slug_id, request.state.read_scopes = resolve_experiment_scope(request.scope)
+        return await call_next(request)
+
+
+class LegacyPrincipal(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request.state.principal = PrincipalContext(request.cookies.get("token"))
+        return await call_next(request)
+
+
+class LegacyHTTPS(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if getattr(request.state, "detected_scheme", None) == "https":
+            message = {"headers": response.raw_headers}
+            enforce_https_headers(message)
+            response.raw_headers[:] = message["headers"]
+        return response
+
+
+# --- App ------------------------------------------------------------------------
+
+async def ping(request):
+    return JSONResponse({"ok": True, "slug": request.state.slug_id, "rid": request.state.request_id})
+
+
+async def stream(request):
+    async def events():
+        for i in range(STREAM_CHUNKS):
+            yield f"data: {i}\n\n"
+            await asyncio.sleep(STREAM_DELAY)
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def build_app(stack: str) -> Starlette:
+    app = Starlette(routes=[
+        Route("/experiments/bench/ping", ping),
+        Route("/experiments/bench/stream", stream),
+    ])
+    app.state.experiments = {"bench": {"resolved_read_scopes": ["bench"]}}
+    if stack == "asgi":
+        app.add_middleware(PlatformMiddleware, enforce_https=True)
+    else:
+        # Same registration order main.py used (last added is outermost)
+        for cls in (LegacyRequestID, LegacyProxy, LegacyScope, LegacyPrincipal, LegacyHTTPS):
+            app.add_middleware(cls)
+    return app
+
+
+async def bench_throughput(app, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", headers=HEADERS) as client:
+        await client.get("/experiments/bench/ping")  # warm-up
+        queue = iter(range(total))
+
+        async def worker():
+            for _ in queue:
+                start = time.perf_counter()
+                response = await client.get("/experiments/bench/ping")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200 and "x-request-id" in response.headers
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def bench_first_byte(app):
+    """Drives the app directly over ASGI (httpx's transport buffers whole responses)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/experiments/bench/stream", "raw_path": b"/experiments/bench/stream",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in HEADERS.items()] + [(b"host", b"testserver")],
+    }
+    first_byte = asyncio.get_running_loop().create_future()
+    start = time.perf_counter()
+
+    async def receive():
+        await asyncio.sleep(3600)  # no request body; never disconnects during the stream
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body") and not first_byte.done():
+            first_byte.set_result((time.perf_counter() - start) * 1000)
+
+    task = asyncio.ensure_future(app(dict(scope), receive, send))
+    ttfb = await first_byte
+    await task
+    return ttfb
+
+
+async def run(total: int, concurrency: int):
+    print(f"\n== {total:,} requests, concurrency {concurrency} ==")
+    print(f"{'stack':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'stream TTFB ms':>17}")
+    results = {}
+    for stack, label in (("legacy", "BaseHTTPMiddleware x5"), ("asgi", "PlatformMiddleware")):
+        app = build_app(stack)
+        stats = await bench_throughput(app, total, concurrency)
+        stats["ttfb_ms"] = await bench_first_byte(app)
+        results[stack] = stats
+        print(f"{label:<22}{stats['rps']:>10.0f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['ttfb_ms']:>17.1f}")
+    print(f"\nthroughput: {results['asgi']['rps'] / results['legacy']['rps']:.2f}x, "
+          f"p99: {results['legacy']['p99_ms'] / results['asgi']['p99_ms']:.2f}x lower")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pure-ASGI vs BaseHTTPMiddleware stack benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Scope-filter micro-benchmark (scripts/bench_scope_filter.py)
+================================================================================
+
+Compares the legacy `$and`/`$in` scope injection against the compiled scope
+filter in `ScopedCollectionWrapper` for the find_one / find / count_documents /
+update_* / delete_* paths.
+
+It reports:
+- Filter-construction cost per call (no database required)
+- The filter shape each mode sends to the server
+- Optionally (`--explain`), the winning plan stage and index bounds for each
+  path, using a real MongoDB at MONGO_URI
+
+Usage:
+    python scripts/bench_scope_filter.py
+    python scripts/bench_scope_filter.py --scopes 3 --iterations 500000
+    MONGO_URI=mongodb://localhost:27017/ python scripts/bench_scope_filter.py --explain
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from async_mongo_wrapper import ScopedCollectionWrapper  # noqa: E402
+
+# Representative filters per wrapper path (what experiment code typically sends)
+PATH_FILTERS = {
+    "find_one": {"_id": "doc_123"},
+    "find": {"status": "active", "score": {"$gte": 10}},
+    "count_documents": {},
+    "update_one": {"game_id": "g_42", "status": "playing"},
+    "update_many": {"status": "stale"},
+    "delete_one": {"_id": "doc_123"},
+    "delete_many": {"created_at": {"$lt": 1700000000}},
+}
+
+
+def _make_wrappers(scopes):
+    write_scope = scopes[0]
+    legacy = ScopedCollectionWrapper(None, scopes, write_scope, auto_index=False, compiled_scope_filter=False)
+    compiled = ScopedCollectionWrapper(None, scopes, write_scope, auto_index=False, compiled_scope_filter=True)
+    return legacy, compiled
+
+
+def bench_construction(scopes, iterations: int):
+    legacy, compiled = _make_wrappers(scopes)
+    print(f"\n== Filter construction ({len(scopes)} read scope(s), {iterations:,} iterations) ==")
+    print(f"{'path':<18}{'legacy ns/op':>14}{'compiled ns/op':>16}{'speedup':>10}")
+    for path, user_filter in PATH_FILTERS.items():
+        t_legacy = timeit.timeit(lambda: legacy._inject_read_filter(user_filter), number=iterations)
+        t_compiled = timeit.timeit(lambda: compiled._inject_read_filter(user_filter), number=iterations)
+        ns_legacy = t_legacy / iterations * 1e9
+        ns_compiled = t_compiled / iterations * 1e9
+        print(f"{path:<18}{ns_legacy:>14.1f}{ns_compiled:>16.1f}{ns_legacy / ns_compiled:>9.2f}x")
+
+
+def show_shapes(scopes):
+    legacy, compiled = _make_wrappers(scopes)
+    print(f"\n== Filter shape sent to the server ({len(scopes)} read scope(s)) ==")
+    for path, user_filter in PATH_FILTERS.items():
+        print(f"{path}:")
+        print(f"  legacy:   {json.dumps(legacy._inject_read_filter(user_filter), default=str)}")
+        print(f"  compiled: {json.dumps(compiled._inject_read_filter(user_filter), default=str)}")
+
+
+def _summarize_plan(explain_doc):
+    """Extracts the winning plan's stages and experiment_id bounds from explain output."""
+    planner = explain_doc.get("queryPlanner") or {}
+    if not planner:
+        # aggregate() explain nests the planner under the first $cursor stage
+        for stage in explain_doc.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner") or {}
+            if planner:
+                break
+    stages, bounds = [], None
+    node = planner.get("winningPlan", {})
+    node = node.get("queryPlan", node)  # SBE wraps the classic plan
+    while node:
+        stages.append(node.get("stage", "?"))
+        if bounds is None and "indexBounds" in node:
+            bounds = node["indexBounds"].get("experiment_id")
+        node = node.get("inputStage")
+    return " <- ".join(stages), bounds
+
+
+def explain_paths(scopes, mongo_uri: str):
+    from pymongo import MongoClient, ASCENDING
+
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    coll = client["bench_scope_filter"]["docs"]
+    coll.drop()
+    coll.insert_many([
+        {"_id": f"doc_{i}", "experiment_id": scopes[i % len(scopes)], "status": "active",
+         "score": i % 50, "game_id": f"g_{i % 100}", "created_at": 1690000000 + i}
+        for i in range(2000)
+    ])
+    coll.create_index([("experiment_id", ASCENDING)], name="auto_experiment_id_asc")
+
+    legacy, compiled = _make_wrappers(scopes)
+    db = coll.database
+    print(f"\n== Winning plan per path ({len(scopes)} read scope(s)) ==")
+    try:
+        for path, user_filter in PATH_FILTERS.items():
+            for label, wrapper in (("legacy", legacy), ("compiled", compiled)):
+                q = wrapper._inject_read_filter(user_filter)
+                if path in ("find_one", "find"):
+                    cmd = {"find": coll.name, "filter": q}
+                elif path == "count_documents":
+                    cmd = {"aggregate": coll.name, "pipeline": [{"$match": q}, {"$count": "n"}], "cursor": {}}
+                elif path.startswith("update"):
+                    cmd = {"update": coll.name, "updates": [
+                        {"q": q, "u": {"$set": {"touched": True}}, "multi": path == "update_many"}]}
+                else:
+                    cmd = {"delete": coll.name, "deletes": [{"q": q, "limit": 1 if path == "delete_one" else 0}]}
+                plan, bounds = _summarize_plan(db.command("explain", cmd, verbosity="queryPlanner"))
+                print(f"{path:<16}{label:<10}{plan}  experiment_id bounds={bounds}")
+    finally:
+        client.drop_database("bench_scope_filter")
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scope-filter construction and plan-shape benchmark")
+    parser.add_argument("--scopes", type=int, default=1, help="Number of read scopes (1 = single-experiment)")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--explain", action="store_true", help="Run explain() against MONGO_URI")
+    args = parser.parse_args()
+
+    scopes = ["bench_exp"] + [f"shared_exp_{i}" for i in range(1, args.scopes)]
+    bench_construction(scopes, args.iterations)
+    show_shapes(scopes)
+    if args.explain:
+        explain_paths(scopes, os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,10 @@ import jwt
 import uuid
 import hashlib
 import logging
+import time
 import bcrypt
-from typing import Optional, Dict, Any, Mapping, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Mapping, List, Tuple
 from datetime import datetime, timedelta
 from fastapi import Request, HTTPException, status, Cookie
 from fastapi.responses import Response
@@ -27,6 +29,39 @@ except ImportError:
     SECRET_KEY = os.environ.get("FLASK_SECRET_KEY", "a_very_bad_dev_secret_key_12345")
     logger.warning("Could not import SECRET_KEY from core_deps, using environment variable")
 
+from principal_context import decode_token_cached, get_principal
+
+# Short TTL cache of sub-auth user documents so authenticated experiment requests
+# don't hit Mongo on every call. Key: (slug_id, collection_name, str(user_id)).
+# Sub-users are updated and deleted inside experiment actors, which this process
+# can't observe, so a deleted or demoted sub-user keeps its cached document (and
+# stays authenticated) for up to SUB_AUTH_USER_CACHE_TTL_SECONDS. Set it to 0 to
+# re-read the user on every request.
+SUB_USER_CACHE_TTL_SECONDS = int(os.getenv("SUB_AUTH_USER_CACHE_TTL_SECONDS", "30"))
+SUB_USER_CACHE_MAX_SIZE = int(os.getenv("SUB_AUTH_USER_CACHE_MAX_SIZE", "5000"))
+_sub_user_cache: "OrderedDict[Tuple[str, str, str], Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+
+def _get_cached_sub_user(key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+    entry = _sub_user_cache.get(key)
+    if entry is None:
+        return None
+    user, expires_at = entry
+    if expires_at <= time.monotonic():
+        _sub_user_cache.pop(key, None)
+        return None
+    _sub_user_cache.move_to_end(key)
+    return dict(user)
+
+
+def _cache_sub_user(key: Tuple[str, str, str], user: Dict[str, Any]) -> None:
+    if SUB_USER_CACHE_TTL_SECONDS <= 0:
+        return
+    _sub_user_cache[key] = (dict(user), time.monotonic() + SUB_USER_CACHE_TTL_SECONDS)
+    _sub_user_cache.move_to_end(key)
+    while len(_sub_user_cache) > SUB_USER_CACHE_MAX_SIZE:
+        _sub_user_cache.popitem(last=False)
+
 
 async def get_experiment_sub_user(
     request: Request,
@@ -92,9 +127,16 @@ async def get_experiment_sub_user(
             return await _try_demo_mode(request, slug_id, db, config)
         return None
     
+    # Per-request memo: several dependencies may resolve the same sub-user
+    principal = get_principal(request)
+    memo_key = (slug_id, session_token)
+    if memo_key in principal.sub_users:
+        memoized = principal.sub_users[memo_key]
+        return dict(memoized) if memoized else None
+    
     try:
-        # Decode session token (JWT)
-        payload = jwt.decode(session_token, SECRET_KEY, algorithms=["HS256"])
+        # Decode session token (JWT), cached briefly by token hash
+        payload = decode_token_cached(session_token, SECRET_KEY)
         
         # Verify it's for this experiment
         if payload.get("experiment_slug") != slug_id:
@@ -132,14 +174,20 @@ async def get_experiment_sub_user(
         # Fetch user from experiment-specific users collection
         # Use getattr for attribute access (works with both ExperimentDB and ScopedMongoWrapper)
         # ExperimentDB and ScopedMongoWrapper both support attribute access via getattr
-        collection = getattr(db, collection_name)
-        user = await collection.find_one({"_id": user_id})
-        if not user:
-            logger.warning(f"Experiment user {user_id} not found in collection {collection_name}")
-            return None
+        cache_key = (slug_id, collection_name, str(user_id))
+        user = _get_cached_sub_user(cache_key)
+        if user is None:
+            collection = getattr(db, collection_name)
+            user = await collection.find_one({"_id": user_id})
+            if not user:
+                logger.warning(f"Experiment user {user_id} not found in collection {collection_name}")
+                return None
+            
+            # Add experiment user ID to user dict
+            user["experiment_user_id"] = str(user["_id"])
+            _cache_sub_user(cache_key, user)
         
-        # Add experiment user ID to user dict
-        user["experiment_user_id"] = str(user["_id"])
+        principal.sub_users[memo_key] = dict(user)
         return user
         
     except jwt.ExpiredSignatureError:
@@ -0,0 +1,40 @@
+import asyncio
+
+from starlette.websockets import WebSocketState
+
+from ws_hub import ConnectionHub
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.application_state = WebSocketState.CONNECTED
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=None):
+        self.application_state = WebSocketState.DISCONNECTED
+        self.closed_with = code
+
+
+def test_rejoin_with_same_key_replaces_sole_member():
+    async def scenario():
+        hub = ConnectionHub(backend="local")
+        old_socket, new_socket = FakeWebSocket(), FakeWebSocket()
+        old = hub.connect(old_socket, key="player-1")
+        hub.join(old, "game:1")
+
+        new = hub.connect(new_socket, key="player-1")
+        hub.join(new, "game:1")
+
+        assert hub.rooms == {"game:1": {"player-1": new}}
+        assert old.closed
+        assert hub.publish("game:1", {"type": "state_update"}) == 1
+        await asyncio.sleep(0.05)
+        assert new_socket.sent == ['{"type":"state_update"}']
+        assert old_socket.closed_with == 1000
+        hub.disconnect(new)
+
+    asyncio.run(scenario())
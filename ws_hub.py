@@ -0,0 +1,353 @@
+"""
+Shared WebSocket connection hub for experiment rooms (game tables, signaling rooms).
+
+Awaiting `ws.send_json(...)` for each room member in turn lets one slow client stall
+everyone else in the room, and a module-level dict of sockets only sees the
+connections of one worker. ConnectionHub gives every accepted WebSocket:
+
+- A bounded send queue drained by its own writer task. Publishing never awaits a
+  socket, so the members of a room are written to concurrently.
+- Slow-consumer eviction. A connection whose queue is full, or whose socket does not
+  take a frame within WS_SEND_TIMEOUT_SECONDS, is closed (1013) instead of buffering
+  without bound.
+- Serialize-once delivery. A published message is JSON-encoded once, however many
+  members (and workers) receive it.
+
+Rooms span uvicorn workers through a pub/sub backend (WS_HUB_BACKEND):
+
+- "local" (default): rooms are per process.
+- "mongo": published messages are batched into the `ws_hub_events` collection
+  (TTL-expired) and every worker tails it with a change stream, delivering them to
+  its own members. Needs a replica set / Atlas; without change streams the hub
+  logs a warning and stays local.
+
+Usage:
+
+    connection = ws_hub.connect(websocket, key=player_id)   # after websocket.accept()
+    ws_hub.join(connection, f"game_portal:{game_id}")
+    connection.send({"type": "error", ...})                  # this socket only
+    ws_hub.publish(room, message)                            # every member of the room
+    ws_hub.publish(room, message, to=player_id)              # one member, on any worker
+    ws_hub.publish(room, message, exclude=connection.key)    # everyone else
+    ws_hub.disconnect(connection)                            # in the endpoint's finally
+"""
+import os
+import json
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from starlette.websockets import WebSocket, WebSocketState
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+# "local" (per process) or "mongo" (change stream fan-out across workers)
+WS_HUB_BACKEND = os.getenv("WS_HUB_BACKEND", "local").lower()
+WS_HUB_COLLECTION = os.getenv("WS_HUB_COLLECTION", "ws_hub_events")
+WS_HUB_EVENT_TTL_SECONDS = int(os.getenv("WS_HUB_EVENT_TTL_SECONDS", "60"))
+WS_HUB_PUBLISH_QUEUE_SIZE = 10000
+WS_HUB_PUBLISH_BATCH = 500
+
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def encode(message: Any) -> str:
+    """JSON text frame, encoded the same way as WebSocket.send_json."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class HubConnection:
+    """One accepted WebSocket with its bounded send queue and writer task."""
+    
+    def __init__(self, hub: "ConnectionHub", websocket: WebSocket, key: str):
+        self.hub = hub
+        self.websocket = websocket
+        self.key = key
+        self.room: Optional[str] = None
+        self.closed = False
+        self.sent = 0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self._writer = asyncio.create_task(self._write())
+    
+    def send(self, message: Any) -> bool:
+        """Queues a message for this socket only; False if the connection is closed or was evicted."""
+        return self.send_text(encode(message))
+    
+    def send_text(self, text: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.hub._evict(self, "send queue full")
+            return False
+        return True
+    
+    async def _write(self) -> None:
+        # Checked as well as cancelled: wait_for can swallow a cancellation (Python < 3.12)
+        while not self.closed:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.hub._evict(self, "send timed out")
+                return
+            except Exception as e:
+                # The socket is gone; the endpoint's receive loop will see the disconnect too
+                logger.debug(f"WebSocket send to '{self.key}' failed: {e}")
+                self.hub.disconnect(self)
+                return
+            self.sent += 1
+
+
+class ConnectionHub:
+    """Rooms of HubConnections in this process, joined to other workers by the backend."""
+    
+    def __init__(self, backend: str = WS_HUB_BACKEND):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.rooms: Dict[str, Dict[str, HubConnection]] = {}
+        self.backend: Optional[MongoChangeStreamBackend] = MongoChangeStreamBackend(self) if backend == "mongo" else None
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+    
+    # --- Lifecycle (called from the app lifespan) ---
+    
+    async def start(self, db) -> bool:
+        """Starts the cross-worker backend, if configured. Returns False when rooms stay local."""
+        if self.backend is None:
+            return False
+        await self.backend.start(db)
+        return True
+    
+    async def stop(self) -> None:
+        if self.backend is not None:
+            await self.backend.stop()
+    
+    @property
+    def spans_workers(self) -> bool:
+        """True when rooms reach members on other workers (cross-worker backend configured)."""
+        return self.backend is not None
+    
+    # --- Connections and rooms ---
+    
+    def connect(self, websocket: WebSocket, key: Optional[str] = None) -> HubConnection:
+        """Registers an accepted WebSocket. `key` identifies it within rooms (defaults to a random id)."""
+        self.connections += 1
+        return HubConnection(self, websocket, key or uuid.uuid4().hex)
+    
+    def join(self, connection: HubConnection, room: str) -> None:
+        """Moves the connection into `room`. An older connection with the same key is closed."""
+        if connection.room == room:
+            return
+        self._leave(connection)
+        previous = self.rooms.get(room, {}).get(connection.key)
+        if previous is not None and previous is not connection:
+            # Closing it leaves the room, which drops the room if it was the only member
+            self._close(previous, 1000, "Replaced by a new connection")
+        self.rooms.setdefault(room, {})[connection.key] = connection
+        connection.room = room
+    
+    def disconnect(self, connection: HubConnection) -> None:
+        """Leaves the room and stops the writer. Safe to call more than once."""
+        self._leave(connection)
+        if not connection.closed:
+            connection.closed = True
+            connection._writer.cancel()
+    
+    def _leave(self, connection: HubConnection) -> None:
+        room = connection.room
+        if room is None:
+            return
+        connection.room = None
+        members = self.rooms.get(room)
+        if members is not None and members.get(connection.key) is connection:
+            del members[connection.key]
+            if not members:
+                del self.rooms[room]
+    
+    def members(self, room: str) -> List[str]:
+        """Keys of the room's members connected to this worker."""
+        return list(self.rooms.get(room, ()))
+    
+    # --- Fan-out ---
+    
+    def publish(self, room: str, message: Any, exclude: Optional[str] = None, to: Optional[str] = None) -> int:
+        """
+        Queues `message` for the room's members (all, all but `exclude`, or only `to`),
+        here and on other workers. Returns the number of local connections it was queued for.
+        """
+        text = encode(message)
+        self.published += 1
+        delivered = self._deliver(room, text, exclude, to)
+        if self.backend is not None and not (to is not None and delivered):
+            self.backend.publish({"room": room, "data": text, "exclude": exclude, "to": to, "origin": self.origin})
+        return delivered
+    
+    def _deliver(self, room: str, text: str, exclude: Optional[str], to: Optional[str]) -> int:
+        members = self.rooms.get(room)
+        if not members:
+            return 0
+        if to is not None:
+            targets = [members[to]] if to in members else []
+        else:
+            targets = [connection for key, connection in members.items() if key != exclude]
+        delivered = sum(1 for connection in targets if connection.send_text(text))
+        self.delivered += delivered
+        return delivered
+    
+    def _evict(self, connection: HubConnection, reason: str) -> None:
+        if connection.closed:
+            return
+        self.evicted += 1
+        logger.warning(f"Evicting slow WebSocket consumer '{connection.key}' in room '{connection.room}': {reason}.")
+        self._close(connection, SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+    
+    def _close(self, connection: HubConnection, code: int, reason: str) -> None:
+        self.disconnect(connection)
+        asyncio.create_task(self._close_socket(connection.websocket, code, reason))
+    
+    @staticmethod
+    async def _close_socket(websocket: WebSocket, code: int, reason: str) -> None:
+        try:
+            if websocket.application_state == WebSocketState.CONNECTED:
+                await websocket.close(code=code, reason=reason)
+        except Exception as e:
+            logger.debug(f"Closing WebSocket failed: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.stats() if self.backend is not None else {"mode": "local"},
+            "rooms": len(self.rooms),
+            "members": sum(len(members) for members in self.rooms.values()),
+            "connections": self.connections,
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+            "send_queue_size": WS_SEND_QUEUE_SIZE,
+        }
+
+
+class MongoChangeStreamBackend:
+    """
+    Cross-worker fan-out through a MongoDB collection.
+    
+    Published envelopes are queued and written with one insert_many per batch (whatever
+    accumulated while the previous write was in flight). Each worker watches the
+    collection's inserts from other origins and delivers them to its local members.
+    """
+    
+    def __init__(self, hub: ConnectionHub, collection_name: str = WS_HUB_COLLECTION):
+        self.hub = hub
+        self.collection_name = collection_name
+        self.mode: Optional[str] = None  # "change_stream" | None
+        self._collection = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=WS_HUB_PUBLISH_QUEUE_SIZE)
+        self._tasks: List[asyncio.Task] = []
+        self.written = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.restarts = 0
+    
+    async def start(self, db) -> None:
+        if self._tasks:
+            return
+        collection = db[self.collection_name]
+        await collection.create_index("createdAt", expireAfterSeconds=WS_HUB_EVENT_TTL_SECONDS)
+        self._collection = collection
+        self._tasks = [asyncio.create_task(self._publish_loop()), asyncio.create_task(self._watch())]
+    
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        self._collection = None
+        self.mode = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    def publish(self, envelope: Dict[str, Any]) -> None:
+        if self._collection is None:
+            return
+        try:
+            self._queue.put_nowait(envelope)
+        except asyncio.QueueFull:
+            self.dropped += 1
+    
+    async def _publish_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < WS_HUB_PUBLISH_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            created_at = datetime.now(timezone.utc)
+            for envelope in batch:
+                envelope["createdAt"] = created_at
+            try:
+                await self._collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.dropped += len(batch)
+                logger.warning(f"ConnectionHub: could not publish {len(batch)} message(s) to '{self.collection_name}': {e}")
+    
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": self.hub.origin}}}]
+        resume_token = None
+        opened_once = False
+        while True:
+            try:
+                async with self._collection.watch(pipeline, resume_after=resume_token) as stream:
+                    if not opened_once:
+                        logger.info(f"ConnectionHub: sharing rooms across workers via '{self.collection_name}' change stream.")
+                    opened_once = True
+                    self.mode = "change_stream"
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        envelope = change["fullDocument"]
+                        self.received += 1
+                        self.hub._deliver(envelope["room"], envelope["data"], envelope.get("exclude"), envelope.get("to"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not opened_once:
+                    # Nobody would read the published messages; stop writing them
+                    logger.warning(f"ConnectionHub: change streams unavailable ({e}); rooms stay local to this worker.")
+                    self._collection = None
+                    for task in self._tasks:
+                        if task is not asyncio.current_task():
+                            task.cancel()
+                    return
+                self.mode = None
+                self.restarts += 1
+                logger.warning(f"ConnectionHub: change stream interrupted ({e}); reopening.")
+                await asyncio.sleep(1)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "collection": self.collection_name,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "received": self.received,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "restarts": self.restarts,
+        }
+
+
+ws_hub = ConnectionHub()